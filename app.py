@@ -1,7 +1,12 @@
 import os
+import sys
 import streamlit as st
-from utils.vector_store import VectorStoreManager
-from tools import HRToolManager
+from utils.conversation import Conversation
+from utils.warmup import Warmup
+from utils import metrics
+
+# Read the index files into the OS cache at startup (streamlit run app.py -- --warmup)
+WARMUP_INDEX = "--warmup" in sys.argv[1:] or os.getenv("HR_WARMUP", "0") == "1"
 
 # ----- Page Setup -----
 st.set_page_config(page_title="HR Chatbot Assistant", layout="wide", page_icon="🤖")
@@ -18,8 +23,9 @@ if "authenticated" not in st.session_state:
     st.session_state.authenticated = False
 if "username" not in st.session_state:
     st.session_state.username = ""
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+if "conversation" not in st.session_state:
+    # Bounded window + rolling summary, so reruns and prompts stay the same size
+    st.session_state.conversation = Conversation()
 
 # ----- Login Page -----
 def login_page():
@@ -37,15 +43,50 @@ def login_page():
             else:
                 st.error("❌ Invalid username or password")
 
-# ----- Load Vector DB & Tool Manager -----
+# ----- Metrics -----
 @st.cache_resource
-def initialize_tool_manager():
+def start_metrics_endpoint():
+    """Expose /metrics for Prometheus when HR_METRICS_PORT is set"""
+    port = os.getenv("HR_METRICS_PORT")
+    return metrics.start_metrics_server(int(port)) if port else None
+
+# ----- Load Vector DB & Tool Manager -----
+def load_tool_manager():
+    """Load the index, LLM clients and tools (runs on the warmup thread)"""
+    # Imported here so the login page renders without langchain, FAISS and the tools
+    from utils.vector_store import VectorStoreManager
+    from utils.answer_cache import AnswerCache
+    from tools import HRToolManager
+
     os.environ["GOOGLE_API_KEY"] = ""  # Replace with real key or use st.secrets
     vector_manager = VectorStoreManager()
     if not vector_manager.load_vector_store():
-        st.error("❌ Failed to load knowledge base. Please contact support.")
-        st.stop()
-    return HRToolManager(vector_manager.get_vector_db())
+        raise RuntimeError("Failed to load knowledge base. Please contact support.")
+    if WARMUP_INDEX:
+        print(f"✓ Read {vector_manager.warm_up() / 1e6:.1f} MB of index files into the page cache")
+    answer_cache = AnswerCache(
+        embeddings=vector_manager.embeddings,
+        index_version=vector_manager.index_version
+    )
+    tool_manager = HRToolManager(
+        vector_manager.get_vector_db(),
+        answer_cache=answer_cache,
+        partitions=vector_manager.partitions,
+        lexical_index=vector_manager.lexical_index,
+        holiday_calendar=vector_manager.holiday_calendar,
+        org_graph=vector_manager.org_graph
+    )
+    # Pick up indexes published by create_index.py without a restart
+    vector_manager.watch(
+        tool_manager.swap_index,
+        interval=float(os.getenv("HR_INDEX_RELOAD_SECONDS", "30"))
+    )
+    return tool_manager
+
+@st.cache_resource
+def start_warmup() -> Warmup:
+    """Start loading the tool manager in the background, once per process"""
+    return Warmup(load_tool_manager, name="tool-manager-warmup")
 
 # ----- Chat Interface -----
 def chatbot_page():
@@ -57,56 +98,70 @@ def chatbot_page():
         st.header("📌 Settings")
         st.markdown("**Ask questions like:**")
         st.markdown("- What is the leave policy?\n- Show holiday list\n- How to claim reimbursement?")
+        show_timings = st.checkbox("Show timing details", key="show_timings")
 
         # Show previous questions
         st.markdown("#### 🕘 Your Previous Questions:")
-        recent_user_prompts = [m["content"] for m in st.session_state.messages if m["role"] == "user"]
+        recent_user_prompts = st.session_state.conversation.recent_questions()
         if recent_user_prompts:
-            for i, q in enumerate(recent_user_prompts[-5:], 1):
+            for i, q in enumerate(recent_user_prompts, 1):
                 st.markdown(f"{i}. {q}")
         else:
             st.markdown("_No previous questions yet._")
 
         # Clear and logout buttons
         if st.button("🔁 Clear Chat"):
-            st.session_state.messages = []
+            st.session_state.conversation.clear()
             st.rerun()
         if st.button("🚪 Logout"):
             st.session_state.authenticated = False
             st.session_state.username = ""
-            st.session_state.messages = []
+            st.session_state.conversation.clear()
             st.rerun()
 
     # Load chatbot tools
     try:
-        tool_manager = initialize_tool_manager()
+        start_metrics_endpoint()
+        warmup = start_warmup()
+        if not warmup.done():
+            with st.spinner("Loading the HR knowledge base..."):
+                warmup.result()
+        tool_manager = warmup.result()
     except Exception as e:
+        start_warmup.clear()  # try again on the next rerun
         st.error(f"❌ Initialization failed: {str(e)}")
         return
 
-    # Display chat history
-    for message in st.session_state.messages:
+    # Display chat history (only the recent window; older turns live on in the summary)
+    conversation = st.session_state.conversation
+    if conversation.summarized:
+        st.caption(f"{conversation.summarized} earlier messages are summarized to keep the chat fast.")
+    for message in conversation.messages:
         with st.chat_message(message["role"]):
             st.markdown(message["content"])
 
     # Chat input box
     prompt = st.chat_input("💬 Type your HR question here...")
     if prompt:
-        st.session_state.messages.append({"role": "user", "content": prompt})
+        conversation.add("user", prompt)
         with st.chat_message("user"):
             st.markdown(prompt)
 
-        try:
-            response = tool_manager.process_query(prompt)
-        except Exception as e:
-            response = f"⚠️ Error: {str(e)}\nPlease contact HR or try again."
+        # Render tokens as they arrive instead of waiting for the full answer
+        with st.chat_message("assistant"), metrics.request_trace() as trace:
+            try:
+                response = st.write_stream(tool_manager.stream_query(prompt, conversation))
+            except Exception as e:
+                response = f"⚠️ Error: {str(e)}\nPlease contact HR or try again."
+                st.markdown(response)
+            if show_timings:
+                st.caption(trace.footer())
 
-        st.session_state.messages.append({"role": "assistant", "content": response})
-        with st.chat_message("assistant"):
-            st.markdown(response)
+        conversation.add("assistant", response)
 
 # ----- App Flow -----
 if not st.session_state.authenticated:
+    start_warmup()  # load the chat stack while the user logs in
     login_page()
 else:
     chatbot_page()
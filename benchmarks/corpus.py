@@ -0,0 +1,87 @@
+"""Synthetic HR corpus for offline benchmarks.
+
+Chunks mimic what create_index.py produces from the real docs/ folders:
+Excel rows flattened to "col: value | col: value" strings for the holiday
+calendar and org chart, and ~1000-character prose chunks for the Word
+policy, form and reimbursement documents.
+"""
+import random
+from typing import Iterator, List
+from langchain_core.documents import Document
+
+FOLDERS = {
+    "holiday": "docs/Holiday calendar (Excel)",
+    "forms": "docs/HR form (WORD)",
+    "policy": "docs/Hr policy (WORD)",
+    "org_chart": "docs/Organization chart",
+    "reimbursement": "docs/Reimbursement rules (WORD)",
+}
+
+_TOPICS = {
+    "policy": ["annual leave", "sick leave", "casual leave", "maternity leave",
+               "paternity leave", "leave balance", "carry forward", "notice period"],
+    "forms": ["leave application form", "expense claim form", "address change form",
+              "onboarding checklist", "exit interview form", "ID card request"],
+    "reimbursement": ["travel policy", "per diem", "mileage", "hotel stay",
+                      "meal allowance", "receipt requirements", "airfare class"],
+}
+_WORDS = ("employee manager approval days request policy company submit within "
+          "eligible month year portal HR payroll department maximum minimum").split()
+_FIRST = "Asha Ben Chen Dana Eli Farah Gopal Hana Ivan Jia Kofi Lena Mo Nia Omar Priya".split()
+_LAST = "Rao Cole Li Noor Park Khan Das Sato Petrov Wu Mensah Berg Ali Shah Diaz Iyer".split()
+_DEPARTMENTS = ["Engineering", "Finance", "Sales", "Human Resources", "Operations", "Legal"]
+_HOLIDAYS = ["New Year's Day", "Republic Day", "Holi", "Good Friday", "Eid", "Independence Day",
+             "Gandhi Jayanti", "Diwali", "Christmas"]
+
+
+def _prose(rng: random.Random, topic: str, length: int = 1000) -> str:
+    words = [topic.capitalize() + ":"]
+    size = len(words[0])
+    while size < length:
+        word = rng.choice(_WORDS) if rng.random() > 0.1 else topic
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)
+
+
+def generate_chunks(n_chunks: int, seed: int = 42, chunks_per_file: int = 50) -> Iterator[Document]:
+    """Yield ``n_chunks`` synthetic chunks spread across the five source folders"""
+    rng = random.Random(seed)
+    categories = list(FOLDERS)
+    for i in range(n_chunks):
+        category = categories[i % len(categories)]
+        file_no = i // (len(categories) * chunks_per_file)
+        if category == "holiday":
+            year = 2020 + file_no % 10
+            text = (f"Date: {year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} | "
+                    f"Holiday: {rng.choice(_HOLIDAYS)} | Type: Public")
+            source = f"{FOLDERS[category]}/holidays_{year}_{file_no}.xlsx"
+        elif category == "org_chart":
+            text = (f"Employee ID: {i} | Name: {rng.choice(_FIRST)} {rng.choice(_LAST)} | "
+                    f"Department: {rng.choice(_DEPARTMENTS)} | "
+                    f"Manager: {rng.choice(_FIRST)} {rng.choice(_LAST)}")
+            source = f"{FOLDERS[category]}/org_chart_{file_no}.xlsx"
+        else:
+            text = _prose(rng, rng.choice(_TOPICS[category]))
+            source = f"{FOLDERS[category]}/{category}_{file_no}.docx"
+        yield Document(page_content=text, metadata={"source": source, "category": category})
+
+
+def generate_queries(n_queries: int, seed: int = 7) -> List[str]:
+    """Realistic employee questions, cycling through every tool's topics"""
+    rng = random.Random(seed)
+    templates = [
+        "What is the {} policy?", "How many days of {} do I get?",
+        "Show the holiday list for {}", "Who is the manager of {}?",
+        "Where can I download the {}?", "How do I claim {}?",
+    ]
+    fills = [
+        ["leave", "sick leave", "maternity leave"], ["annual leave", "casual leave"],
+        ["2025", "March", "next month"], [f"{f} {l}" for f in _FIRST[:4] for l in _LAST[:4]],
+        _TOPICS["forms"], _TOPICS["reimbursement"],
+    ]
+    queries = []
+    for i in range(n_queries):
+        slot = i % len(templates)
+        queries.append(templates[slot].format(rng.choice(fills[slot])))
+    return queries
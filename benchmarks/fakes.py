@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional, Tuple
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+
+class FakeQuotaError(Exception):
+    """Raised by the fake services to mimic a 429 / quota exhausted response"""
+
+
+class FakeEmbeddings(Embeddings):
+    """Local stand-in for GoogleGenerativeAIEmbeddings.
+
+    Vectors are deterministic: each token is hashed into a fixed bucket, so
+    the same text always gets the same unit vector and texts sharing words
+    land close together. Latency, random failures and a per-second request
+    quota can be injected to exercise retry and rate-limit handling.
+    """
+
+    def __init__(self, dim: int = 768, latency: float = 0.0, failure_rate: float = 0.0,
+                 max_requests_per_second: Optional[float] = None, seed: int = 0,
+                 model: str = "fake-embedding"):
+        self.dim = dim
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.max_requests_per_second = max_requests_per_second
+        self.model = model
+        self.requests = 0
+        self.texts_embedded = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_requests = 0
+
+    def embed_vector(self, text: str) -> np.ndarray:
+        """Deterministic hashed bag-of-words vector for a text"""
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in text.lower().split():
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dim] += 1.0 if value & (1 << 63) else -1.0
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self._call(len(texts))
+        return [self.embed_vector(text).tolist() for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self._call(1)
+        return self.embed_vector(text).tolist()
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """One batched request, like PooledEmbeddings.embed_queries()"""
+        self._call(len(texts))
+        return [self.embed_vector(text).tolist() for text in texts]
+
+    def _call(self, n_texts: int) -> None:
+        with self._lock:
+            self.requests += 1
+            now = time.monotonic()
+            if now - self._window_start >= 1.0:
+                self._window_start = now
+                self._window_requests = 0
+            self._window_requests += 1
+            over_quota = (self.max_requests_per_second is not None
+                          and self._window_requests > self.max_requests_per_second)
+            fail = self._random.random() < self.failure_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if over_quota:
+            raise FakeQuotaError("429 Resource has been exhausted (fake quota)")
+        if fail:
+            raise ConnectionError("fake embedding service error")
+        with self._lock:
+            self.texts_embedded += n_texts
+
+
+class FakeChatModel:
+    """Local stand-in for ChatGoogleGenerativeAI (invoke/stream and async variants).
+
+    Each call waits ``latency`` seconds before the first token, then emits
+    ``completion_tokens`` tokens at ``tokens_per_second``. ``failure_rate``
+    injects errors and ``slow_rate`` adds ``slow_latency`` to some calls (a
+    latency tail), so fallback, retry and hedging paths can be exercised
+    offline. Set ``outage`` to make every call fail until it is cleared.
+    """
+
+    def __init__(self, latency: float = 0.2, tokens_per_second: float = 200.0,
+                 completion_tokens: int = 120, failure_rate: float = 0.0, seed: int = 0,
+                 slow_rate: float = 0.0, slow_latency: float = 0.0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.outage = False
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _start_call(self) -> Tuple[bool, float]:
+        """Whether this call fails, and its time to first token"""
+        with self._lock:
+            self.calls += 1
+            fail = self.outage or self._random.random() < self.failure_rate
+            slow = bool(self.slow_rate) and self._random.random() < self.slow_rate
+        return fail, self.latency + (self.slow_latency if slow else 0.0)
+
+    def _tokens(self, prompt: Any) -> List[str]:
+        seed = hashlib.blake2b(str(prompt).encode("utf-8"), digest_size=4).hexdigest()
+        words = ["Detected Use Case: ", "General HR Inquiry\n"] + [
+            f"word{seed}-{i} " for i in range(max(0, self.completion_tokens - 2))
+        ]
+        return words
+
+    def _usage(self, prompt: Any, n_tokens: int) -> dict:
+        prompt_tokens = len(str(prompt)) // 4
+        return {"input_tokens": prompt_tokens, "output_tokens": n_tokens,
+                "total_tokens": prompt_tokens + n_tokens}
+
+    def invoke(self, prompt: Any, **kwargs) -> AIMessage:
+        fail, latency = self._start_call()
+        tokens = self._tokens(prompt)
+        time.sleep(latency + len(tokens) / self.tokens_per_second)
+        if fail:
+            raise ConnectionError("fake LLM service error")
+        return AIMessage(content="".join(tokens), usage_metadata=self._usage(prompt, len(tokens)))
+
+    def stream(self, prompt: Any, **kwargs) -> Iterator[AIMessageChunk]:
+        fail, latency = self._start_call()
+        time.sleep(latency)
+        if fail:
+            raise ConnectionError("fake LLM service error")
+        tokens = self._tokens(prompt)
+        for i, token in enumerate(tokens):
+            time.sleep(1.0 / self.tokens_per_second)
+            usage = self._usage(prompt, len(tokens)) if i == len(tokens) - 1 else None
+            yield AIMessageChunk(content=token, usage_metadata=usage)
+
+    async def ainvoke(self, prompt: Any, **kwargs) -> AIMessage:
+        fail, latency = self._start_call()
+        tokens = self._tokens(prompt)
+        await asyncio.sleep(latency + len(tokens) / self.tokens_per_second)
+        if fail:
+            raise ConnectionError("fake LLM service error")
+        return AIMessage(content="".join(tokens), usage_metadata=self._usage(prompt, len(tokens)))
+
+    async def astream(self, prompt: Any, **kwargs) -> AsyncIterator[AIMessageChunk]:
+        fail, latency = self._start_call()
+        await asyncio.sleep(latency)
+        if fail:
+            raise ConnectionError("fake LLM service error")
+        tokens = self._tokens(prompt)
+        for i, token in enumerate(tokens):
+            await asyncio.sleep(1.0 / self.tokens_per_second)
+            usage = self._usage(prompt, len(tokens)) if i == len(tokens) - 1 else None
+            yield AIMessageChunk(content=token, usage_metadata=usage)
@@ -0,0 +1,173 @@
+"""Labeled routing check: the embedding router against keyword routing.
+
+Usage (from the repository root):
+
+    python -m benchmarks.routing                # Gemini embeddings (needs GOOGLE_API_KEY)
+    python -m benchmarks.routing --fake         # offline, with the hashed fake embedder
+
+Every labeled question is routed by the keyword matcher alone, by
+ToolRouter alone, and the way HRToolManager routes (the router when it
+clears ``min_score``, else the keyword matcher) at each candidate
+threshold. Questions labeled None belong to no tool and should fall
+through to the general answer. The threshold that scores best is the
+value to set as HR_ROUTER_MIN_SCORE for that embedding model.
+"""
+import os
+import sys
+import json
+import argparse
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings  # noqa: E402
+from tools.hr_forms_tool import HRFormsTool  # noqa: E402
+from tools.holiday_calendar_tool import HolidayCalendarTool  # noqa: E402
+from tools.leave_policy_tool import LeavePolicyTool  # noqa: E402
+from tools.org_chart_tool import OrgChartTool  # noqa: E402
+from tools.reimbursement_tool import ReimbursementTool  # noqa: E402
+from tools.router import ToolRouter, default_min_score  # noqa: E402
+from utils.gemini_client import GeminiClient  # noqa: E402
+from utils.keyword_matcher import KeywordMatcher  # noqa: E402
+
+# Questions phrased unlike the exemplars, with the tool that should answer them
+LABELED_QUERIES: List[Tuple[str, Optional[str]]] = [
+    ("How many vacation days do new joiners get?", "leave_policy_tool"),
+    ("Am I entitled to paid time off when my child is born?", "leave_policy_tool"),
+    ("What happens to leave I have not used by December?", "leave_policy_tool"),
+    ("Do I need a doctor's note if I am unwell for two days?", "leave_policy_tool"),
+    ("Can I take half a day off tomorrow?", "leave_policy_tool"),
+    ("What is the notice period for applying for annual leave?", "leave_policy_tool"),
+    ("Is bereavement leave paid?", "leave_policy_tool"),
+    ("How long is paternity leave?", "leave_policy_tool"),
+    ("Is the office closed on Christmas?", "holiday_calendar_tool"),
+    ("When is the next public holiday?", "holiday_calendar_tool"),
+    ("Which festivals do we get off this year?", "holiday_calendar_tool"),
+    ("Is 15 August a holiday?", "holiday_calendar_tool"),
+    ("Show me the list of company holidays", "holiday_calendar_tool"),
+    ("Do we have a day off for New Year?", "holiday_calendar_tool"),
+    ("How much can I spend on a hotel during a business trip?", "reimbursement_tool"),
+    ("Will the company pay for my taxi to the airport?", "reimbursement_tool"),
+    ("How long does it take to get my expenses refunded?", "reimbursement_tool"),
+    ("Is there a daily food allowance when travelling?", "reimbursement_tool"),
+    ("Can I claim the cost of my internet bill?", "reimbursement_tool"),
+    ("Do I need original bills to get money back for travel?", "reimbursement_tool"),
+    ("Who is the head of the finance department?", "org_chart_tool"),
+    ("Who does the engineering manager report to?", "org_chart_tool"),
+    ("Who are the team leads in sales?", "org_chart_tool"),
+    ("Show me the reporting structure of HR", "org_chart_tool"),
+    ("Who is my skip-level manager?", "org_chart_tool"),
+    ("How many people report to the CTO?", "org_chart_tool"),
+    ("Where do I get the form to update my bank details?", "hr_forms_tool"),
+    ("Is there a template for the resignation letter?", "hr_forms_tool"),
+    ("How do I request a salary certificate?", "hr_forms_tool"),
+    ("Where can I download the relocation request form?", "hr_forms_tool"),
+    ("What paperwork is needed to change my address?", "hr_forms_tool"),
+    ("Which document do I submit for a name change?", "hr_forms_tool"),
+    ("What is the capital of France?", None),
+    ("Tell me a joke", None),
+    ("How do I reset my laptop password?", None),
+    ("What is the weather like today?", None),
+    ("Can you write a poem about spring?", None),
+    ("What's the score of last night's match?", None),
+]
+
+DEFAULT_THRESHOLDS = tuple(round(0.30 + 0.05 * i, 2) for i in range(13))  # 0.30 .. 0.90
+
+
+def build_tools() -> Dict[str, Any]:
+    """The app's tools, as HRToolManager builds them (no index is needed to route)"""
+    client = GeminiClient(FakeChatModel())
+    return {
+        "leave_policy": LeavePolicyTool(None, client),
+        "holiday_calendar": HolidayCalendarTool(None, client),
+        "reimbursement": ReimbursementTool(None, client),
+        "org_chart": OrgChartTool(None, client),
+        "hr_forms": HRFormsTool(None, client),
+    }
+
+
+def evaluate(tools: Dict[str, Any], embeddings: Any,
+             labeled: Sequence[Tuple[str, Optional[str]]] = LABELED_QUERIES,
+             thresholds: Sequence[float] = DEFAULT_THRESHOLDS) -> Dict[str, Any]:
+    """Accuracy of keyword routing, of the router alone and of both combined, per threshold"""
+    router = ToolRouter.from_tools(tools, embeddings)
+    if router is None:
+        raise RuntimeError("could not embed the router exemplars")
+    names = [tool.tool_name for tool in tools.values()]
+    matcher = KeywordMatcher({tool.tool_name: tool.keywords for tool in tools.values()}, plural=names)
+    queries = [query for query, _ in labeled]
+    expected = [tool_name for _, tool_name in labeled]
+
+    keyword = []
+    for query in queries:
+        ranked = matcher.rank(query, names)
+        keyword.append(ranked[0] if ranked else None)
+
+    vectors = (embeddings.embed_queries(queries) if hasattr(embeddings, "embed_queries")
+               else [embeddings.embed_query(query) for query in queries])
+    best = []
+    for vector in vectors:
+        scores = router.scores(vector)
+        name = max(scores, key=scores.get)
+        best.append((name, scores[name]))
+
+    def accuracy(predicted: Sequence[Optional[str]]) -> float:
+        return sum(p == e for p, e in zip(predicted, expected)) / len(expected)
+
+    def routed(threshold: float, fallback: Sequence[Optional[str]]) -> List[Optional[str]]:
+        return [name if score >= threshold else other for (name, score), other in zip(best, fallback)]
+
+    no_tool = [None] * len(queries)
+    router_only = {threshold: accuracy(routed(threshold, no_tool)) for threshold in thresholds}
+    hybrid = {threshold: accuracy(routed(threshold, keyword)) for threshold in thresholds}
+    best_threshold = max(hybrid, key=lambda threshold: (hybrid[threshold], -threshold))
+    current = default_min_score()
+    predicted = routed(current, keyword)
+    return {
+        "queries": len(labeled),
+        "keyword_accuracy": accuracy(keyword),
+        "router_only_accuracy": router_only,
+        "routing_accuracy": hybrid,
+        "best_min_score": best_threshold,
+        "current_min_score": current,
+        "current_accuracy": accuracy(predicted),
+        "current_errors": [
+            {"query": q, "expected": e, "routed": r, "score": round(s, 3)}
+            for q, e, r, (_, s) in zip(queries, expected, predicted, best) if r != e
+        ],
+    }
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Labeled routing accuracy: router vs keywords")
+    parser.add_argument("--fake", action="store_true", help="use the offline hashed fake embedder")
+    parser.add_argument("--output", default=None, help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.fake:
+        embeddings = FakeEmbeddings(dim=768)
+    else:
+        from utils.clients import get_embeddings
+        embeddings = get_embeddings()
+    report = evaluate(build_tools(), embeddings)
+
+    print(f"{report['queries']} labeled queries")
+    print(f"keywords only: {report['keyword_accuracy']:.1%}")
+    print("min_score  router only  router, else keywords")
+    for threshold, value in report["routing_accuracy"].items():
+        marker = "  <- best" if threshold == report["best_min_score"] else ""
+        print(f"{threshold:9.2f}  {report['router_only_accuracy'][threshold]:11.1%}  {value:21.1%}{marker}")
+    print(f"current min_score {report['current_min_score']:.2f}: {report['current_accuracy']:.1%}")
+    for error in report["current_errors"]:
+        print(f"  ✗ {error['query']!r}: expected {error['expected']}, "
+              f"routed {error['routed']} (score {error['score']})")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
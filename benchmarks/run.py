@@ -0,0 +1,287 @@
+"""Offline benchmark suite: no Google API calls, results written as JSON.
+
+Usage (from the repository root):
+
+    python -m benchmarks.run --chunks 100000 --output bench.json
+    python -m benchmarks.run --scenarios build,load,retrieval --chunks 20000
+
+Embeddings come from benchmarks.fakes.FakeEmbeddings (deterministic hashed
+vectors) and generation from benchmarks.fakes.FakeChatModel (fixed latency and
+token rate), so numbers are comparable between releases on the same host.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import generate_chunks, generate_queries  # noqa: E402
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings  # noqa: E402
+from benchmarks.startup import PROFILES, profile_startup  # noqa: E402
+from create_index import build_faiss_index  # noqa: E402
+from tools import HRToolManager  # noqa: E402
+from utils.clients import PooledLLM  # noqa: E402
+from utils.gemini_client import GeminiClient  # noqa: E402
+from utils.resilient_llm import CircuitBreaker, ResilientLLM  # noqa: E402
+from utils.vector_store import VectorStoreManager  # noqa: E402
+
+ALL_SCENARIOS = ("build", "load", "retrieval", "e2e", "resilience", "startup")
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 and mean of a list of seconds, in milliseconds"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return {
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+    }
+
+
+def peak_rss_mb() -> float:
+    """Process memory high-water mark so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def bench_build(args, embeddings, index_path) -> Dict:
+    """Time a full index build from the synthetic corpus"""
+    def batches():
+        batch = []
+        for doc in generate_chunks(args.chunks, seed=args.seed):
+            batch.append(doc)
+            if len(batch) >= 1000:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    start = time.perf_counter()
+    db = build_faiss_index(batches(), index_path, embeddings, cache_path=None)
+    elapsed = time.perf_counter() - start
+    if db is None:
+        raise RuntimeError("index build failed")
+    return {
+        "chunks": args.chunks,
+        "seconds": elapsed,
+        "chunks_per_second": args.chunks / elapsed if elapsed else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def bench_load(args, embeddings, index_path) -> Dict:
+    """Time FAISS.load_local through VectorStoreManager"""
+    samples = []
+    for _ in range(args.load_repeats):
+        manager = VectorStoreManager(index_path, embeddings=embeddings)
+        start = time.perf_counter()
+        if not manager.load_vector_store():
+            raise RuntimeError("index load failed")
+        samples.append(time.perf_counter() - start)
+    return {**percentiles(samples), "repeats": args.load_repeats, "peak_rss_mb": peak_rss_mb()}
+
+
+def load_tool_manager(embeddings, index_path, gemini_client):
+    vector_manager = VectorStoreManager(index_path, embeddings=embeddings)
+    if not vector_manager.load_vector_store():
+        raise RuntimeError("index load failed")
+    return HRToolManager(
+        vector_manager.get_vector_db(),
+        gemini_client,
+        partitions=vector_manager.partitions,
+        lexical_index=vector_manager.lexical_index,
+        holiday_calendar=vector_manager.holiday_calendar,
+        org_graph=vector_manager.org_graph
+    )
+
+
+def bench_retrieval(args, embeddings, index_path) -> Dict:
+    """Queries per second through BaseHRTool.retrieve_documents"""
+    tool = load_tool_manager(embeddings, index_path, GeminiClient(FakeChatModel())).tools["leave_policy"]
+    queries = generate_queries(args.queries, seed=args.seed)
+    results = {}
+    for threads in args.concurrency:
+        def timed(query):
+            start = time.perf_counter()
+            tool.retrieve_documents(query)
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            samples = list(pool.map(timed, queries))
+        elapsed = time.perf_counter() - start
+        results[f"threads_{threads}"] = {
+            **percentiles(samples),
+            "qps": len(queries) / elapsed,
+        }
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def bench_e2e(args, embeddings, index_path) -> Dict:
+    """process_query latency under concurrent users with a fake Gemini"""
+    llm = FakeChatModel(
+        latency=args.llm_latency,
+        tokens_per_second=args.llm_tokens_per_second,
+        completion_tokens=args.llm_completion_tokens
+    )
+    manager = load_tool_manager(embeddings, index_path, GeminiClient(PooledLLM(llm, max(args.concurrency))))
+    queries = generate_queries(args.e2e_queries, seed=args.seed)
+    results = {}
+    for users in args.concurrency:
+        def timed(query):
+            start = time.perf_counter()
+            manager.process_query(query)
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=users) as pool:
+            samples = list(pool.map(timed, queries))
+        elapsed = time.perf_counter() - start
+        results[f"users_{users}"] = {
+            **percentiles(samples),
+            "queries_per_second": len(queries) / elapsed,
+        }
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def bench_resilience(args, embeddings, index_path) -> Dict:
+    """Gemini call latency and fallback rate with injected errors and a slow tail.
+
+    Compares the bare fake LLM with ResilientLLM (retries plus hedging),
+    then simulates an outage to time fail-fast calls with the breaker open.
+    """
+    def run(client, calls):
+        def timed(i):
+            start = time.perf_counter()
+            answer = client.generate_hr_response("context", f"question {i}", "General HR Inquiry")
+            return time.perf_counter() - start, GeminiClient.is_fallback_response(answer)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            outcomes = list(pool.map(timed, range(calls)))
+        return {
+            **percentiles([seconds for seconds, _ in outcomes]),
+            "fallback_rate": sum(fallback for _, fallback in outcomes) / len(outcomes),
+        }
+
+    def fake_llm():
+        return FakeChatModel(
+            latency=args.llm_latency / 10, tokens_per_second=1e6, completion_tokens=10,
+            failure_rate=0.05, slow_rate=0.03, slow_latency=args.llm_latency * 5, seed=args.seed
+        )
+
+    calls = args.e2e_queries
+    results = {"bare": run(GeminiClient(fake_llm()), calls)}
+    llm = fake_llm()
+    resilient = ResilientLLM(llm, timeout=args.llm_latency * 10, base_delay=0.01, max_delay=0.05,
+                             hedge=True, breaker=CircuitBreaker(failure_threshold=5, reset_timeout=60))
+    run(GeminiClient(resilient), resilient.hedge_min_samples * 2)  # fill the latency window used for hedging
+    resilient.retries = resilient.hedges = 0
+    results["resilient"] = {**run(GeminiClient(resilient), calls),
+                            "retries": resilient.retries, "hedges": resilient.hedges}
+    llm.outage = True
+    results["outage"] = {**run(GeminiClient(resilient), calls),
+                         "upstream_calls": llm.calls, "rejected": resilient.rejected}
+    return results
+
+
+def bench_startup(args, embeddings, index_path) -> Dict:
+    """Import time of the login page and of the chat stack, in fresh interpreters"""
+    results = profile_startup(PROFILES)
+    manager = VectorStoreManager(index_path, embeddings=embeddings)
+    start = time.perf_counter()
+    size = manager.warm_up()
+    results["index_warmup"] = {"seconds": time.perf_counter() - start, "mb_read": size / 1e6}
+    return results
+
+
+SCENARIOS = {
+    "build": bench_build,
+    "load": bench_load,
+    "retrieval": bench_retrieval,
+    "e2e": bench_e2e,
+    "resilience": bench_resilience,
+    "startup": bench_startup,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline HR chatbot benchmarks")
+    parser.add_argument("--scenarios", default=",".join(ALL_SCENARIOS),
+                        help=f"comma-separated subset of {', '.join(ALL_SCENARIOS)}")
+    parser.add_argument("--chunks", type=int, default=20000, help="synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=768, help="embedding dimension")
+    parser.add_argument("--queries", type=int, default=2000, help="queries for the retrieval scenario")
+    parser.add_argument("--e2e-queries", type=int, default=200, help="queries for the e2e scenario")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated thread/user counts")
+    parser.add_argument("--load-repeats", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="fake LLM time to first token (s)")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=400.0)
+    parser.add_argument("--llm-completion-tokens", type=int, default=150)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--index-path", default=None, help="reuse/keep the index here instead of a temp dir")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args(argv)
+    args.concurrency = [int(n) for n in args.concurrency.split(",")]
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    embeddings = FakeEmbeddings(dim=args.dim)
+    index_path = args.index_path or tempfile.mkdtemp(prefix="hr_bench_index_")
+    if "build" not in scenarios and not os.path.exists(index_path):
+        scenarios.insert(0, "build")
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": {k: v for k, v in vars(args).items() if k != "output"},
+        },
+        "results": {},
+    }
+    try:
+        for name in scenarios:
+            print(f"\n=== {name} ===")
+            report["results"][name] = SCENARIOS[name](args, embeddings, index_path)
+            print(json.dumps(report["results"][name], indent=2))
+    finally:
+        if args.index_path is None:
+            shutil.rmtree(index_path, ignore_errors=True)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Results written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
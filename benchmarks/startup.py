@@ -0,0 +1,89 @@
+"""Import-time profile of the app's cold start.
+
+Usage (from the repository root):
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --modules tools,utils.vector_store --top 15
+
+Each module set is imported in a fresh interpreter under ``python -X
+importtime``; the report gives the wall time of the import and the
+packages that account for most of it (own time summed per top-level package).
+The "login" set is what app.py imports before the login page renders; the
+"chat" set is what the background warmup loads while the user logs in.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from typing import Dict, List, Sequence
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILES = {
+    "login": ("streamlit", "utils.metrics", "utils.conversation", "utils.warmup"),
+    "chat": ("tools", "utils.vector_store", "utils.answer_cache"),
+}
+
+
+def import_profile(modules: Sequence[str], top: int = 10) -> Dict:
+    """Import ``modules`` in a fresh interpreter and break the time down by package"""
+    code = "; ".join(f"import {module}" for module in modules)
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {', '.join(modules)} failed:\n{result.stderr[-2000:]}")
+
+    # Lines look like "import time:   self [us] | cumulative | imported package";
+    # self times are summed per top-level package so utils.* does not hide langchain
+    packages: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        own, _, name = line[len("import time:"):].split("|", 2)
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(own)
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    return {
+        "modules": list(modules),
+        "wall_s": wall,
+        "import_s": sum(packages.values()) / 1e6,
+        "top_packages_ms": {name: us / 1000 for name, us in ranked[:top]},
+    }
+
+
+def profile_startup(profiles: Dict[str, Sequence[str]], top: int = 10) -> Dict[str, Dict]:
+    return {name: import_profile(modules, top) for name, modules in profiles.items()}
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Import-time breakdown of the app's cold start")
+    parser.add_argument("--modules", default=None,
+                        help="comma-separated modules to profile instead of the login/chat sets")
+    parser.add_argument("--top", type=int, default=10, help="packages listed per profile")
+    parser.add_argument("--output", default=None, help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    profiles = PROFILES
+    if args.modules:
+        profiles = {"custom": [m.strip() for m in args.modules.split(",") if m.strip()]}
+    report = profile_startup(profiles, args.top)
+    for name, profile in report.items():
+        print(f"\n=== {name}: {', '.join(profile['modules'])} ===")
+        print(f"wall {profile['wall_s']:.2f}s, imports {profile['import_s']:.2f}s")
+        for package, ms in profile["top_packages_ms"].items():
+            print(f"  {ms:9.1f} ms  {package}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -1,83 +1,502 @@
 import os
 import glob
+import hashlib
+import argparse
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import faiss
+import numpy as np
 import pandas as pd
 from langchain_core.documents import Document
 from langchain_community.document_loaders import Docx2txtLoader
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from utils.ann import INDEX_KINDS, IndexSpec
+from utils.bm25 import BM25Index
+from utils.clients import get_embeddings
+from utils.embedding_cache import CachedEmbeddings, EmbeddingCache
+from utils.embedding_scheduler import EmbeddingScheduler
+from utils.holiday_calendar import HolidayCalendar
+from utils.org_graph import OrgGraph
+from utils.index_store import StoreWriter, has_exact_vectors, has_store, load_index_spec, load_store
+from utils.index_versions import (
+    index_name_for, load_manifest, next_version, publish_version, read_current_version,
+    save_manifest
+)
+from utils.partitions import category_for_source
 
 
 def load_excel_as_documents(excel_path):
     """Load Excel rows as structured documents"""
     df = pd.read_excel(excel_path)
-    docs = []
 
-    for _, row in df.iterrows():
-        row_text = " | ".join(f"{col}: {row[col]}" for col in df.columns if pd.notna(row[col]))
-        doc = Document(page_content=row_text, metadata={"source": excel_path})
-        docs.append(doc)
+    # Build every "col: value | col: value" row string column by column
+    # instead of iterating rows in Python
+    row_text = pd.Series("", index=df.index, dtype=object)
+    for col in df.columns:
+        present = df[col].notna()
+        piece = f"{col}: " + df[col].astype(str)
+        separator = row_text.str.len().gt(0).map({True: " | ", False: ""})
+        row_text = row_text.where(~present, row_text + separator + piece)
 
-    return docs
+    return [Document(page_content=text, metadata={"source": excel_path}) for text in row_text]
 
 
-def load_documents(doc_paths):
-    """Load and process documents from specified paths"""
-    documents = []
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+HOLIDAY_DATE_COLUMNS = ("date",)
+HOLIDAY_NAME_COLUMNS = ("holiday", "occasion", "festival", "event", "name", "description", "particulars")
+HOLIDAY_SKIP_COLUMNS = ("day", "weekday", "s.no", "sno", "sl.no", "no", "#")
 
-    for folder_name, folder_path in doc_paths.items():
-        print(f"\nProcessing: {folder_name}")
-        
+
+def _find_column(columns, hints):
+    for hint in hints:
+        for col in columns:
+            if hint in str(col).strip().lower():
+                return col
+    return None
+
+
+def load_holiday_rows(excel_path):
+    """Typed (date, name, details, source) rows of one holiday calendar sheet"""
+    df = pd.read_excel(excel_path)
+    date_col = _find_column(df.columns, HOLIDAY_DATE_COLUMNS)
+    if date_col is None:
+        # No "Date" header: take the first column that mostly parses as dates
+        for col in df.columns:
+            if pd.to_datetime(df[col], errors="coerce").notna().mean() >= 0.5:
+                date_col = col
+                break
+    name_col = _find_column([c for c in df.columns if c != date_col], HOLIDAY_NAME_COLUMNS)
+    if date_col is None or name_col is None:
+        print(f"⚠️ No date/holiday columns in {os.path.basename(excel_path)}; skipped for the calendar")
+        return []
+
+    dates = pd.to_datetime(df[date_col], errors="coerce")
+    detail_cols = [c for c in df.columns if c not in (date_col, name_col)
+                   and str(c).strip().lower() not in HOLIDAY_SKIP_COLUMNS]
+    rows = []
+    for i, date in enumerate(dates):
+        name = df[name_col].iloc[i]
+        if pd.isna(date) or pd.isna(name):
+            continue
+        details = {str(c): str(df[c].iloc[i]) for c in detail_cols if pd.notna(df[c].iloc[i])}
+        rows.append((date.date(), str(name).strip(), details, excel_path))
+    skipped = len(df) - len(rows)
+    if skipped:
+        print(f"⚠️ {skipped} rows without a valid date or name in {os.path.basename(excel_path)}")
+    return rows
+
+
+def build_holiday_calendar(source_paths):
+    """Structured calendar from every holiday Excel file, or None if there are none"""
+    paths = [path for path in source_paths
+             if category_for_source(path) == "holiday" and path.lower().endswith((".xlsx", ".xls"))]
+    if not paths:
+        return None
+    rows = []
+    for path in sorted(paths):
         try:
-            # Process Excel files
-            if "excel" in folder_name.lower() or "chart" in folder_name.lower():
-                for excel_file in glob.glob(os.path.join(folder_path, "*.xlsx")) + glob.glob(os.path.join(folder_path, "*.xls")):
-                    try:
-                        docs = load_excel_as_documents(excel_file)
-                        split_docs = text_splitter.split_documents(docs)
-                        documents.extend(split_docs)
-                        print(f"✓ Loaded Excel: {os.path.basename(excel_file)}")
-                    except Exception as e:
-                        print(f"× Failed Excel: {os.path.basename(excel_file)} - {str(e)}")
-
-            # Process Word files
-            elif "word" in folder_name.lower() or "form" in folder_name.lower() or "policy" in folder_name.lower():
-                for doc_file in glob.glob(os.path.join(folder_path, "*.docx")) + glob.glob(os.path.join(folder_path, "*.doc")):
-                    try:
-                        loader = Docx2txtLoader(doc_file)
-                        docs = loader.load()
-                        split_docs = text_splitter.split_documents(docs)
-                        documents.extend(split_docs)
-                        print(f"✓ Loaded Word: {os.path.basename(doc_file)}")
-                    except Exception as e:
-                        print(f"× Failed Word: {os.path.basename(doc_file)} - {str(e)}")
+            rows.extend(load_holiday_rows(path))
+        except Exception as e:
+            print(f"× Failed holiday calendar: {os.path.basename(path)} - {e}")
+    print(f"✓ Holiday calendar: {len(rows)} dates")
+    return HolidayCalendar.from_rows(rows)
+
+
+ORG_ID_COLUMNS = ("employee id", "emp id", "employee no", "employee code", "emp code", "id")
+ORG_MANAGER_COLUMNS = ("manager", "reports to", "reporting to", "supervisor", "reporting")
+ORG_NAME_COLUMNS = ("employee name", "full name", "name", "employee")
+ORG_DESIGNATION_COLUMNS = ("designation", "title", "role", "position")
+ORG_DEPARTMENT_COLUMNS = ("department", "dept", "function", "division", "team")
+
 
+def load_org_rows(excel_path):
+    """(employee id, name, designation, department, manager) rows of one org chart sheet"""
+    df = pd.read_excel(excel_path, dtype=str).fillna("")
+    manager_col = _find_column(df.columns, ORG_MANAGER_COLUMNS)
+    others = [c for c in df.columns if c != manager_col]
+    name_col = _find_column(others, ORG_NAME_COLUMNS)
+    if manager_col is None or name_col is None:
+        print(f"⚠️ No name/manager columns in {os.path.basename(excel_path)}; skipped for the org graph")
+        return []
+    others = [c for c in others if c != name_col]
+    columns = [_find_column(others, ORG_ID_COLUMNS), name_col,
+               _find_column(others, ORG_DESIGNATION_COLUMNS),
+               _find_column(others, ORG_DEPARTMENT_COLUMNS), manager_col]
+    values = [df[col].str.strip() if col is not None else pd.Series("", index=df.index)
+              for col in columns]
+    return [row for row in zip(*values) if row[1]]
+
+
+def build_org_graph(source_paths):
+    """Reporting-line graph from every org chart Excel file, or None if there are none"""
+    paths = [path for path in source_paths
+             if category_for_source(path) == "org_chart" and path.lower().endswith((".xlsx", ".xls"))]
+    if not paths:
+        return None
+    rows = []
+    for path in sorted(paths):
+        try:
+            rows.extend(load_org_rows(path))
         except Exception as e:
-            print(f"! Folder error: {folder_name} - {str(e)}")
+            print(f"× Failed org chart graph: {os.path.basename(path)} - {e}")
+    print(f"✓ Org chart graph: {len(rows)} employees")
+    return OrgGraph.from_rows(rows)
+
+
+def list_source_files(doc_paths):
+    """Yield (folder_name, file_path, kind) for every loadable file"""
+    for folder_name, folder_path in doc_paths.items():
+        name = folder_name.lower()
+        if "excel" in name or "chart" in name:
+            kind, patterns = "excel", ("*.xlsx", "*.xls")
+        elif "word" in name or "form" in name or "policy" in name:
+            kind, patterns = "word", ("*.docx", "*.doc")
+        else:
+            continue
+        for pattern in patterns:
+            for file_path in sorted(glob.glob(os.path.join(folder_path, pattern))):
+                yield folder_name, file_path, kind
+
+
+def load_file(file_path, kind, text_splitter):
+    """Load one Excel or Word file and split it into chunks"""
+    if kind == "excel":
+        docs = load_excel_as_documents(file_path)
+    else:
+        docs = Docx2txtLoader(file_path).load()
+    # Tag chunks by source folder so each tool can search only its partition
+    category = category_for_source(file_path)
+    if category:
+        for doc in docs:
+            doc.metadata["category"] = category
+    return text_splitter.split_documents(docs)
+
+
+_TEXT_SPLITTER = None
+
+
+def get_text_splitter():
+    """Chunking settings shared by every build path (one instance per process)"""
+    global _TEXT_SPLITTER
+    if _TEXT_SPLITTER is None:
+        _TEXT_SPLITTER = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    return _TEXT_SPLITTER
+
+
+def _parse_file(file_path, kind):
+    """Process-pool entry point: load and split one file"""
+    try:
+        return file_path, kind, load_file(file_path, kind, get_text_splitter()), None
+    except Exception as e:
+        return file_path, kind, [], str(e)
+
+
+def iter_document_batches(files, batch_size=256, workers=None, max_pending=None):
+    """Parse (file_path, kind) pairs in a process pool and yield chunk batches.
+
+    At most ``max_pending`` files are parsed ahead of the consumer, so a slow
+    embedding stage throttles parsing instead of letting chunks pile up.
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 2
+    files = iter(files)
+    batch = []
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+
+        def top_up():
+            for file_path, kind in files:
+                pending.add(pool.submit(_parse_file, file_path, kind))
+                if len(pending) >= max_pending:
+                    break
+
+        top_up()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                file_path, kind, docs, error = future.result()
+                label = "Excel" if kind == "excel" else "Word"
+                if error:
+                    print(f"× Failed {label}: {os.path.basename(file_path)} - {error}")
+                    continue
+                print(f"✓ Loaded {label}: {os.path.basename(file_path)}")
+                for doc in docs:
+                    batch.append(doc)
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+            top_up()
 
-    return documents
+    if batch:
+        yield batch
 
 
-def create_faiss_index(documents, index_name="faiss_index"):
-    """Create and save FAISS index"""
+def load_documents(doc_paths):
+    """Load and process documents from specified paths"""
+    files = [(file_path, kind) for _, file_path, kind in list_source_files(doc_paths)]
+    return [doc for batch in iter_document_batches(files) for doc in batch]
+
+
+def file_sha256(path):
+    """SHA-256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def assign_chunk_ids(documents, counters=None):
+    """Give every chunk a stable docstore id of the form '<source>#<n>'
+
+    Pass the same ``counters`` dict across batches so numbering continues
+    when one file's chunks are split over several batches.
+    """
+    counters = {} if counters is None else counters
+    ids = []
+    for doc in documents:
+        source = doc.metadata.get("source", "")
+        n = counters.get(source, 0)
+        counters[source] = n + 1
+        ids.append(f"{source}#{n}")
+    return ids
+
+
+def manifest_entry(path, ids):
+    """Manifest record for one source file"""
+    return {"mtime": os.path.getmtime(path), "sha256": file_sha256(path), "ids": ids}
+
+
+def _embeddings_for_build(embeddings, cache_path):
+    embeddings = embeddings or get_embeddings()
+    if cache_path:
+        embeddings = CachedEmbeddings(embeddings, EmbeddingCache(cache_path))
+    return embeddings
+
+
+def _report_cache(embeddings):
+    if isinstance(embeddings, CachedEmbeddings):
+        print(f"✓ Embeddings: {embeddings.cached_count} cached, "
+              f"{embeddings.embedded_count} newly embedded")
+        embeddings.cache.close()
+
+
+def _restore_exact_vectors(db, embeddings, batch_size=1000):
+    """Replace PQ-decoded vectors with exact ones, embedded again (cache hits when cached)"""
+    print("⚠️ The current index is IVF-PQ without saved exact vectors; "
+          "re-reading them through the embedding cache")
+    flat = faiss.IndexFlat(db.index.d, db.index.metric_type)
+    for start in range(0, db.index.ntotal, batch_size):
+        positions = range(start, min(start + batch_size, db.index.ntotal))
+        texts = [db.docstore.search(db.index_to_docstore_id[i]).page_content for i in positions]
+        flat.add(np.asarray(embeddings.embed_documents(texts), dtype=np.float32))
+    db.index = flat
+
+
+def build_faiss_index(batches, index_name="faiss_index", embeddings=None,
+                      cache_path="embedding_cache.db", index_spec=None):
+    """Create and save a FAISS index from a stream of chunk batches
+
+    Chunks are indexed exactly; ``index_spec`` (an IndexSpec) converts the
+    result to an IVF/PQ/HNSW index when it is published. Each batch is
+    written to the new version's chunk table as soon as it is embedded, so
+    only the vectors (and the BM25 postings) grow with the corpus. Returns
+    the published store, memory-mapped.
+    """
+    writer = None
     try:
         print("\nCreating embeddings...")
-        embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+        embeddings = embeddings or get_embeddings()
+        build_embeddings = _embeddings_for_build(embeddings, cache_path)
+        version = next_version(index_name)
+        writer = StoreWriter(index_name, index_name_for(version))
+
+        counters = {}
+        files = {}
+        total = 0
+        for batch in batches:
+            ids = assign_chunk_ids(batch, counters)
+            writer.add(batch, ids, build_embeddings.embed_documents([doc.page_content for doc in batch]))
+            for doc, doc_id in zip(batch, ids):
+                files.setdefault(doc.metadata.get("source", ""), []).append(doc_id)
+            total += len(batch)
+            print(f"  ...{total} chunks indexed")
+        _report_cache(build_embeddings)
+
+        if not len(writer):
+            print("× No chunks to index")
+            writer.close()
+            return None
 
-        print("Building FAISS index...")
-        db = FAISS.from_documents(documents, embeddings)
+        manifest = {"files": {
+            path: manifest_entry(path, file_ids)
+            for path, file_ids in files.items() if os.path.exists(path)
+        }}
 
         print(f"Saving index to '{index_name}'...")
-        db.save_local(index_name)
-        print("✓ Index created successfully!")
+        writer.finish(index_spec)
+        lexical_index = BM25Index.from_documents((doc.id, doc) for doc in writer.iter_documents())
+        publish_version(index_name, None, manifest, version=version, lexical_index=lexical_index,
+                        holiday_calendar=build_holiday_calendar(manifest["files"]),
+                        org_graph=build_org_graph(manifest["files"]))
+        print(f"✓ Index created successfully! (version {version})")
+        db, _ = load_store(index_name, index_name_for(version), embeddings)
         return db
     except Exception as e:
+        if writer is not None:
+            writer.close()
         print(f"× Index creation failed: {str(e)}")
+        if cache_path:
+            print(f"  Embedded chunks are checkpointed in '{cache_path}'; rerun to resume.")
+        return None
+
+
+def create_faiss_index(documents, index_name="faiss_index", embeddings=None,
+                       cache_path="embedding_cache.db", index_spec=None):
+    """Create and save FAISS index, reusing cached embeddings for unchanged chunks"""
+    return build_faiss_index([documents], index_name, embeddings, cache_path, index_spec)
+
+
+def update_faiss_index(doc_paths, index_name="faiss_index", embeddings=None,
+                       cache_path="embedding_cache.db", index_spec=None):
+    """Apply only added, changed and deleted source files to the current index
+
+    The index is rebuilt with ``index_spec``, or else with the spec the
+    current version was built with.
+    """
+    version = read_current_version(index_name)
+    manifest = load_manifest(index_name, version)
+    if not version or "files" not in manifest:
+        print("No versioned index with a manifest found; running a full build.")
+        files = [(file_path, kind) for _, file_path, kind in list_source_files(doc_paths)]
+        return build_faiss_index(iter_document_batches(files), index_name, embeddings, cache_path,
+                                 index_spec)
+
+    try:
+        embeddings = _embeddings_for_build(embeddings, cache_path)
+        exact = True
+        if has_store(index_name, index_name_for(version)):
+            db, _ = load_store(index_name, index_name_for(version), embeddings, mmap=False)
+            index_spec = index_spec or load_index_spec(index_name, index_name_for(version))
+            exact = has_exact_vectors(index_name, index_name_for(version))
+        else:
+            db = FAISS.load_local(
+                index_name,
+                embeddings,
+                index_name=index_name_for(version),
+                allow_dangerous_deserialization=True
+            )
+
+        files = manifest["files"]
+        current = {path: kind for _, path, kind in list_source_files(doc_paths)}
+        deleted = [path for path in files if path not in current]
+        changed, added = [], []
+        touched = 0
+        for path in current:
+            entry = files.get(path)
+            mtime = os.path.getmtime(path)
+            if entry and entry["mtime"] == mtime:
+                continue
+            sha = file_sha256(path)
+            if entry and entry["sha256"] == sha:
+                entry["mtime"] = mtime  # touched but identical
+                touched += 1
+                continue
+            (changed if entry else added).append(path)
+
+        print(f"\nAdded: {len(added)}, changed: {len(changed)}, deleted: {len(deleted)}")
+        if not (added or changed or deleted):
+            if touched:
+                # Keep the refreshed mtimes so the next run does not hash these files again
+                save_manifest(index_name, version, manifest)
+            print("✓ Index is up to date.")
+            _report_cache(embeddings)
+            return db
+
+        if not exact:
+            _restore_exact_vectors(db, embeddings)
+        stale_ids = [doc_id for path in deleted + changed for doc_id in files[path]["ids"]]
+        if stale_ids:
+            db.delete(stale_ids)
+        for path in deleted:
+            del files[path]
+
+        to_index = added + changed
+        new_ids = {}
+        counters = {}
+        for batch in iter_document_batches((path, current[path]) for path in to_index):
+            ids = assign_chunk_ids(batch, counters)
+            db.add_documents(batch, ids=ids)
+            for doc, doc_id in zip(batch, ids):
+                new_ids.setdefault(doc.metadata.get("source", ""), []).append(doc_id)
+        for path in to_index:
+            if path in new_ids:
+                files[path] = manifest_entry(path, new_ids[path])
+            else:
+                # Failed or empty: leave it out so the next run retries it
+                files.pop(path, None)
+        _report_cache(embeddings)
+
+        lexical_index = BM25Index.from_vector_store(db)
+        new_version = publish_version(index_name, db, manifest, lexical_index=lexical_index,
+                                      index_spec=index_spec,
+                                      holiday_calendar=build_holiday_calendar(files),
+                                      org_graph=build_org_graph(files))
+        print(f"✓ Index updated to version {new_version}")
+        return db
+    except Exception as e:
+        print(f"× Index update failed: {str(e)}")
+        if cache_path:
+            print(f"  Embedded chunks are checkpointed in '{cache_path}'; rerun to resume.")
         return None
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the HR document FAISS index")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only embed added/changed files and drop deleted ones")
+    parser.add_argument("--batch-size", type=int, default=100,
+                        help="texts per embedding request")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="embedding requests in flight at once")
+    parser.add_argument("--rpm", type=float, default=None,
+                        help="maximum embedding requests per minute")
+    parser.add_argument("--max-retries", type=int, default=5,
+                        help="retries per failed embedding request")
+    parser.add_argument("--index-type", choices=INDEX_KINDS, default=None,
+                        help="FAISS index type (default: flat, or the current index's type "
+                             "with --incremental)")
+    parser.add_argument("--nlist", type=int, default=None,
+                        help="IVF cells (default: 4*sqrt(N))")
+    parser.add_argument("--pq-m", type=int, default=None,
+                        help="PQ sub-quantizers for ivf-pq (must divide the dimension)")
+    parser.add_argument("--hnsw-m", type=int, default=32, help="HNSW neighbours per node")
+    parser.add_argument("--nprobe", type=int, default=None,
+                        help="IVF cells searched per query (default: tuned to --target-recall)")
+    parser.add_argument("--ef-search", type=int, default=None,
+                        help="HNSW search depth (default: tuned to --target-recall)")
+    parser.add_argument("--train-sample", type=int, default=100000,
+                        help="vectors sampled to train IVF/PQ")
+    parser.add_argument("--target-recall", type=float, default=0.95,
+                        help="recall@k against exact search that tuning aims for")
+    parser.add_argument("--min-ann-size", type=int, default=10000,
+                        help="indexes smaller than this stay exact")
+    args = parser.parse_args()
+
+    index_spec = None
+    if args.index_type:
+        index_spec = IndexSpec(
+            args.index_type,
+            nlist=args.nlist,
+            pq_m=args.pq_m,
+            hnsw_m=args.hnsw_m,
+            nprobe=args.nprobe,
+            ef_search=args.ef_search,
+            train_sample=args.train_sample,
+            target_recall=args.target_recall,
+            min_size=args.min_ann_size
+        )
+
     os.environ["GOOGLE_API_KEY"] = "# enter the API key here" # enter the API key here
 
     base_path = os.path.abspath("docs")
@@ -97,14 +516,32 @@ if __name__ == "__main__":
             print(f"✓ Path exists: {path}")
 
     # ========== EXECUTION ========== #
-    print("\nStarting document processing...")
-    all_documents = load_documents(doc_paths)
+    scheduler = EmbeddingScheduler(
+        get_embeddings(),
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        requests_per_minute=args.rpm,
+        max_retries=args.max_retries
+    )
+    # Stream large enough batches that every concurrent request has work
+    stream_batch = args.batch_size * args.concurrency
 
-    if all_documents:
-        print(f"\nTotal documents processed: {len(all_documents)}")
-        vector_db = create_faiss_index(all_documents)
+    if args.incremental:
+        print("\nStarting incremental update...")
+        vector_db = update_faiss_index(doc_paths, embeddings=scheduler, index_spec=index_spec)
     else:
-        print("\nNo documents were loaded. Please check:")
-        print("- All paths above should show as existing")
-        print("- Files should have correct extensions (.xlsx, .docx, etc.)")
-        print("- You have read permissions for all files")
+        print("\nStarting document processing...")
+        source_files = [(file_path, kind) for _, file_path, kind in list_source_files(doc_paths)]
+
+        if source_files:
+            print(f"\nSource files found: {len(source_files)}")
+            vector_db = build_faiss_index(
+                iter_document_batches(source_files, batch_size=stream_batch),
+                embeddings=scheduler,
+                index_spec=index_spec
+            )
+        else:
+            print("\nNo documents were loaded. Please check:")
+            print("- All paths above should show as existing")
+            print("- Files should have correct extensions (.xlsx, .docx, etc.)")
+            print("- You have read permissions for all files")
@@ -1,23 +1,26 @@
 import os
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_community.vectorstores import FAISS
+import csv
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import faiss
+import numpy as np
+from utils.embedding_cache import EmbeddingCache, text_hash
+from utils.vector_store import VectorStoreManager
 
-def load_faiss_index(index_path="faiss_index"):
+QUERY_FIELDS = ("query", "question")
+EXPECTED_FIELDS = ("expected_sources", "expected_source", "expected", "sources", "source")
+
+def load_faiss_index(index_path="faiss_index", embeddings=None):
     """
-    Load existing FAISS index with safe deserialization
+    Load the published index (memory-mapped, no pickle for current builds)
     """
-    try:
-        embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-        db = FAISS.load_local(
-            index_path, 
-            embeddings,
-            allow_dangerous_deserialization=True  
-        )
-        print("FAISS index loaded successfully!")
-        return db
-    except Exception as e:
-        print(f"Error loading index: {str(e)}")
+    manager = VectorStoreManager(index_path, embeddings=embeddings)
+    if not manager.load_vector_store():
         return None
+    print("FAISS index loaded successfully!")
+    return manager.get_vector_db()
 
 def query_index(db, query, k=3):
     """
@@ -55,14 +58,235 @@ def interactive_query(db):
             break
         query_index(db, query)
 
+def _expected_list(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        # CSV cells hold several sources separated by "|" or ";"
+        value = value.replace(";", "|").split("|")
+    return [str(v).strip() for v in value if str(v).strip()]
+
+def load_queries(path):
+    """
+    Read evaluation queries from a .jsonl or .csv file
+
+    Each record needs a "query" (or "question") and may list the source
+    documents that should be retrieved for it under "expected_sources".
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            records = [{k.strip().lower(): v for k, v in row.items() if k} for row in csv.DictReader(f)]
+    else:
+        with open(path, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+
+    queries = []
+    for record in records:
+        query = next((record[k] for k in QUERY_FIELDS if record.get(k)), None)
+        if not query:
+            continue
+        expected = next((record[k] for k in EXPECTED_FIELDS if record.get(k)), None)
+        queries.append({"query": str(query).strip(), "expected": _expected_list(expected)})
+    return queries
+
+def embed_queries(embeddings, texts, batch_size=100, concurrency=4, cache=None):
+    """
+    Embed many queries as a float32 matrix
+
+    Texts go out ``batch_size`` per request with ``concurrency`` requests
+    in flight. With an EmbeddingCache, repeated runs (e.g. the same
+    regression set against a new index) only embed questions not seen before.
+    """
+    model = getattr(embeddings, "model", type(embeddings).__name__) + ":query"
+    hashes = [text_hash(text) for text in texts]
+    found = cache.get_many(model, list(set(hashes))) if cache is not None else {}
+    missing = list({key: text for key, text in zip(hashes, texts) if key not in found}.items())
+
+    def embed(batch):
+        texts = [text for _, text in batch]
+        if hasattr(embeddings, "embed_queries"):
+            return embeddings.embed_queries(texts)
+        return [embeddings.embed_query(text) for text in texts]
+
+    batches = [missing[i:i + batch_size] for i in range(0, len(missing), batch_size)]
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        for batch, vectors in zip(batches, executor.map(embed, batches)):
+            new_items = {key: vector for (key, _), vector in zip(batch, vectors)}
+            if cache is not None:
+                cache.put_many(model, new_items)
+            found.update(new_items)
+    return np.asarray([found[key] for key in hashes], dtype=np.float32), len(missing)
+
+def search_batch(db, vectors, k=5):
+    """
+    Top-k chunks for every query vector with one FAISS search call
+
+    Returns, per query, a list of (chunk id, Document, distance).
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if db._normalize_L2:
+        faiss.normalize_L2(vectors)
+    distances, positions = db.index.search(vectors, k)
+
+    # Popular chunks come back for many queries; read each from the docstore once
+    documents = {}
+    results = []
+    for row_distances, row_positions in zip(distances, positions):
+        hits = []
+        for distance, position in zip(row_distances, row_positions):
+            if position == -1:
+                continue
+            if position not in documents:
+                doc_id = db.index_to_docstore_id[int(position)]
+                doc = db.docstore.search(doc_id)
+                # Docstores return an error string for a missing id
+                documents[position] = (doc_id, doc if hasattr(doc, "metadata") else None)
+            doc_id, doc = documents[position]
+            hits.append((doc_id, doc, float(distance)))
+        results.append(hits)
+    return results
+
+def _matches(source, expected):
+    """
+    True if a retrieved source is the expected document (full path or file name)
+    """
+    source = source.replace("\\", "/").lower()
+    expected = expected.replace("\\", "/").lower()
+    return source == expected or source.endswith("/" + expected.lstrip("/"))
+
+def score_results(queries, results, k_values):
+    """
+    recall@k for each k and MRR over the queries that list expected sources
+    """
+    recall = {k: 0.0 for k in k_values}
+    reciprocal_rank = 0.0
+    judged = 0
+    for item, hits in zip(queries, results):
+        expected = item["expected"]
+        if not expected:
+            item["first_relevant_rank"] = None
+            continue
+        judged += 1
+        sources = [doc.metadata.get("source", "") if doc else "" for _, doc, _ in hits]
+        first = next((rank for rank, source in enumerate(sources, 1)
+                      if any(_matches(source, e) for e in expected)), None)
+        item["first_relevant_rank"] = first
+        if first:
+            reciprocal_rank += 1.0 / first
+        for k in k_values:
+            found = sum(any(_matches(source, e) for source in sources[:k]) for e in expected)
+            recall[k] += found / len(expected)
+    if not judged:
+        return {"judged": 0}
+    return {
+        "judged": judged,
+        "recall": {k: recall[k] / judged for k in k_values},
+        "mrr": reciprocal_rank / judged
+    }
+
+def write_results(path, queries, results):
+    """
+    Write one JSON line per query with its ranked results
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        for item, hits in zip(queries, results):
+            record = dict(item)
+            record["results"] = [
+                {
+                    "rank": rank,
+                    "id": doc_id,
+                    "source": doc.metadata.get("source", "") if doc else "",
+                    "distance": distance,
+                    "content": doc.page_content[:300] if doc else ""
+                }
+                for rank, (doc_id, doc, distance) in enumerate(hits, 1)
+            ]
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+def batch_query(db, input_path, output_path, k=5, batch_size=100, concurrency=4, cache_path=None):
+    """
+    Run every query in a file against the index and report retrieval quality
+
+    Queries are embedded in batches, searched with a single FAISS call and
+    written to ``output_path`` as JSONL; recall@k, MRR and throughput are
+    printed and returned.
+    """
+    if not db:
+        print("No database loaded. Please check the index path.")
+        return None
+
+    queries = load_queries(input_path)
+    if not queries:
+        print(f"No queries found in {input_path}")
+        return None
+    print(f"\nQueries: {len(queries)} from {input_path}")
+    cache = EmbeddingCache(cache_path) if cache_path else None
+
+    try:
+        started = time.perf_counter()
+        vectors, embedded = embed_queries(db.embeddings, [item["query"] for item in queries],
+                                          batch_size=batch_size, concurrency=concurrency, cache=cache)
+        embedded_at = time.perf_counter()
+        results = search_batch(db, vectors, k=k)
+        searched_at = time.perf_counter()
+    except Exception as e:
+        print(f"Error running batch queries: {str(e)}")
+        return None
+    finally:
+        if cache is not None:
+            cache.close()
+
+    k_values = sorted({v for v in (1, 3, 5, 10, k) if v <= k})
+    report = score_results(queries, results, k_values)
+    write_results(output_path, queries, results)
+
+    embed_seconds = embedded_at - started
+    search_seconds = searched_at - embedded_at
+    report.update({
+        "queries": len(queries),
+        "embedded": embedded,
+        "embed_seconds": embed_seconds,
+        "search_seconds": search_seconds,
+        "queries_per_second": len(queries) / max(searched_at - started, 1e-9)
+    })
+
+    print(f"Embedded {embedded} queries ({len(queries) - embedded} cached or repeated) "
+          f"in {embed_seconds:.2f}s")
+    print(f"Searched {len(queries)} queries in {search_seconds * 1000:.1f}ms "
+          f"({len(queries) / max(search_seconds, 1e-9):,.0f} queries/s)")
+    print(f"Throughput: {report['queries_per_second']:,.0f} queries/s end to end")
+    if report["judged"]:
+        recall = "  ".join(f"recall@{k}={value:.3f}" for k, value in report["recall"].items())
+        print(f"{recall}  MRR={report['mrr']:.3f}  ({report['judged']} queries with expected sources)")
+    print(f"Results written to {output_path}")
+    return report
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the HR document FAISS index")
+    parser.add_argument("--batch", metavar="QUERIES",
+                        help="JSONL/CSV file of queries (optionally with expected_sources) to run "
+                             "instead of the interactive prompt")
+    parser.add_argument("--output", default="query_results.jsonl",
+                        help="ranked results of --batch, one JSON line per query")
+    parser.add_argument("-k", type=int, default=5, help="results per query")
+    parser.add_argument("--index-path", default="faiss_index")
+    parser.add_argument("--batch-size", type=int, default=100,
+                        help="queries per embedding request")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="embedding requests in flight at once")
+    parser.add_argument("--cache", default="embedding_cache.db",
+                        help="reuse query embeddings across runs ('' to disable)")
+    args = parser.parse_args()
 
     os.environ["GOOGLE_API_KEY"] = ""  # enter the API key here
     
     print("Loading FAISS index...")
-    vector_db = load_faiss_index()
+    vector_db = load_faiss_index(args.index_path)
     
-    if vector_db:
+    if vector_db and args.batch:
+        batch_query(vector_db, args.batch, args.output, k=args.k, batch_size=args.batch_size,
+                    concurrency=args.concurrency, cache_path=args.cache or None)
+    elif vector_db:
         interactive_query(vector_db)
     else:
         print("Failed to load index. Please ensure:")
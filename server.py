@@ -0,0 +1,217 @@
+import os
+import json
+import asyncio
+import argparse
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web
+from utils.vector_store import VectorStoreManager
+from utils.answer_cache import AnswerCache
+from utils.conversation import ConversationStore
+from tools import HRToolManager
+from utils import metrics
+
+MAX_QUERY_LENGTH = 2000
+MAX_SESSION_ID_LENGTH = 128
+
+
+async def on_startup(app):
+    """Load the index and tool manager once per process"""
+    config = app["config"]
+    vector_manager = VectorStoreManager(config.index_path)
+    loop = asyncio.get_running_loop()
+    if not await loop.run_in_executor(None, vector_manager.load_vector_store):
+        raise RuntimeError(f"Failed to load index from '{config.index_path}'")
+    if config.warmup:
+        size = await loop.run_in_executor(None, vector_manager.warm_up)
+        print(f"✓ Read {size / 1e6:.1f} MB of index files into the page cache")
+    answer_cache = AnswerCache(
+        embeddings=vector_manager.embeddings,
+        index_version=vector_manager.index_version
+    )
+    app["vector_manager"] = vector_manager
+    # Follow-up questions see their own session's bounded history
+    app["conversations"] = ConversationStore(max_sessions=config.max_sessions)
+    app["tool_manager"] = HRToolManager(
+        vector_manager.get_vector_db(),
+        answer_cache=answer_cache,
+        partitions=vector_manager.partitions,
+        lexical_index=vector_manager.lexical_index,
+        holiday_calendar=vector_manager.holiday_calendar,
+        org_graph=vector_manager.org_graph
+    )
+    # Hot-swap indexes published by create_index.py; running requests finish on the old one
+    vector_manager.watch(app["tool_manager"].swap_index, interval=config.reload_interval)
+    # Bounded pool for FAISS search and other blocking calls
+    app["executor"] = ThreadPoolExecutor(
+        max_workers=config.search_workers, thread_name_prefix="hr-search"
+    )
+    print(f"✓ HR chatbot API ready on http://{config.host}:{config.port}")
+
+
+async def on_cleanup(app):
+    """Let queued searches finish, then release the worker pool"""
+    vector_manager = app.get("vector_manager")
+    if vector_manager is not None:
+        vector_manager.stop_watching()
+    executor = app.get("executor")
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+async def read_query(request):
+    """Extract and validate the 'query' and optional 'session_id' fields from a JSON body"""
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "Body must be JSON"}),
+                                 content_type="application/json")
+    query = body.get("query") if isinstance(body, dict) else None
+    if not isinstance(query, str) or not query.strip():
+        raise web.HTTPBadRequest(text=json.dumps({"error": "'query' must be a non-empty string"}),
+                                 content_type="application/json")
+    if len(query) > MAX_QUERY_LENGTH:
+        raise web.HTTPRequestEntityTooLarge(MAX_QUERY_LENGTH, len(query))
+    session_id = body.get("session_id")
+    if session_id is not None and (not isinstance(session_id, str)
+                                   or not 0 < len(session_id) <= MAX_SESSION_ID_LENGTH):
+        raise web.HTTPBadRequest(
+            text=json.dumps({"error": f"'session_id' must be a string of 1-{MAX_SESSION_ID_LENGTH} characters"}),
+            content_type="application/json"
+        )
+    return query.strip(), session_id
+
+
+def log_failure(request, trace):
+    """Print the traceback of a failed request and count it per tool"""
+    print(f"× {request.method} {request.path} failed (tool: {trace.tool}):")
+    traceback.print_exc()
+    metrics.get_metrics().increment("failed_requests", 1, trace.tool)
+
+
+def conversation_for(app, session_id):
+    """The session's conversation, or None for one-off requests"""
+    return app["conversations"].get(session_id) if session_id else None
+
+
+async def handle_query(request):
+    """POST /query -> {"answer": "..."}"""
+    app = request.app
+    query, session_id = await read_query(request)
+    conversation = conversation_for(app, session_id)
+    with metrics.request_trace() as trace:
+        try:
+            async with asyncio.timeout(app["config"].timeout):
+                answer = await app["tool_manager"].aprocess_query(query, app["executor"], conversation)
+        except TimeoutError:
+            return web.json_response({"error": "Request timed out"}, status=504)
+        except Exception:
+            log_failure(request, trace)
+            return web.json_response({"error": "Internal error while answering the query"}, status=500)
+    if conversation is not None:
+        conversation.add("user", query)
+        conversation.add("assistant", answer)
+    body = {"answer": answer}
+    if request.query.get("debug") == "1":
+        body["debug"] = trace.footer()
+    return web.json_response(body)
+
+
+async def handle_query_stream(request):
+    """POST /query/stream -> text/event-stream of {"delta": "..."} events"""
+    app = request.app
+    query, session_id = await read_query(request)
+    conversation = conversation_for(app, session_id)
+
+    response = web.StreamResponse(headers={
+        "Content-Type": "text/event-stream",
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+    await response.prepare(request)
+
+    async def send(event, data):
+        payload = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        await response.write(payload.encode("utf-8"))
+
+    with metrics.request_trace() as trace:
+        try:
+            chunks = []
+            async with asyncio.timeout(app["config"].timeout):
+                async for chunk in app["tool_manager"].astream_query(query, app["executor"], conversation):
+                    chunks.append(chunk)
+                    await send("delta", {"delta": chunk})
+            if conversation is not None:
+                conversation.add("user", query)
+                conversation.add("assistant", "".join(chunks))
+            done = {"debug": trace.footer()} if request.query.get("debug") == "1" else {}
+            await send("done", done)
+        except TimeoutError:
+            await send("error", {"error": "Request timed out"})
+        except ConnectionResetError:
+            pass  # client went away
+        except Exception:
+            # Headers are already sent, so the failure has to travel as an event
+            log_failure(request, trace)
+            try:
+                await send("error", {"error": "Internal error while answering the query"})
+            except ConnectionResetError:
+                pass
+    return response
+
+
+async def handle_health(request):
+    """GET /healthz -> index version, for load balancer checks"""
+    return web.json_response({
+        "status": "ok",
+        "index_version": request.app["vector_manager"].index_version,
+    })
+
+
+async def handle_metrics(request):
+    """GET /metrics -> per-stage latency quantiles in Prometheus text format"""
+    return web.Response(text=metrics.get_metrics().render_prometheus(), content_type="text/plain")
+
+
+def create_app(config):
+    """Build the aiohttp application"""
+    app = web.Application(client_max_size=64 * 1024)
+    app["config"] = config
+    app.on_startup.append(on_startup)
+    app.on_cleanup.append(on_cleanup)
+    app.router.add_post("/query", handle_query)
+    app.router.add_post("/query/stream", handle_query_stream)
+    app.router.add_get("/healthz", handle_health)
+    app.router.add_get("/metrics", handle_metrics)
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless HR chatbot HTTP/SSE server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--index-path", default="faiss_index")
+    parser.add_argument("--search-workers", type=int, default=4,
+                        help="threads for FAISS search and other blocking work")
+    parser.add_argument("--timeout", type=float, default=60.0,
+                        help="per-request deadline in seconds")
+    parser.add_argument("--shutdown-timeout", type=float, default=30.0,
+                        help="seconds to let in-flight requests finish on SIGTERM")
+    parser.add_argument("--reload-interval", type=float, default=30.0,
+                        help="seconds between checks for a new index version (0 disables)")
+    parser.add_argument("--max-sessions", type=int, default=10000,
+                        help="conversations kept for follow-up questions (least recently used dropped)")
+    parser.add_argument("--warmup", action="store_true",
+                        help="read the index files into the OS page cache before serving")
+    config = parser.parse_args()
+
+    if not os.getenv("GOOGLE_API_KEY"):
+        print("⚠️ GOOGLE_API_KEY is not set")
+
+    # run_app handles SIGINT/SIGTERM: stop accepting, drain, then run on_cleanup
+    web.run_app(
+        create_app(config),
+        host=config.host,
+        port=config.port,
+        shutdown_timeout=config.shutdown_timeout
+    )
@@ -0,0 +1,51 @@
+import os
+import sys
+
+# Tests import the app's modules the same way the scripts do, from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+from langchain_community.vectorstores import FAISS  # noqa: E402
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings  # noqa: E402
+from utils.gemini_client import GeminiClient  # noqa: E402
+
+# A few chunks per category, in the shape create_index.py produces
+CHUNKS = {
+    "leave": [
+        "Employees get 20 days of annual leave per calendar year.",
+        "Sick leave requires a medical certificate after three consecutive days.",
+        "Maternity leave is 26 weeks of paid leave.",
+        "Unused annual leave can be carried over to next year up to 10 days.",
+    ],
+    "reimbursement": [
+        "Travel expenses are reimbursed within 30 days of submitting the claim.",
+        "The travel reimbursement limit is 5000 per trip for all employees.",
+        "Reimbursement claims are approved by the reporting manager.",
+    ],
+    "hr_forms": [
+        "Use the expense claim form to claim travel expenses.",
+        "The leave application form is submitted through the HR portal.",
+    ],
+    "holiday": ["Holiday calendar: Diwali, Christmas and New Year are company holidays."],
+    "org_chart": ["The organization chart lists every employee and their manager."],
+}
+
+
+@pytest.fixture
+def embeddings():
+    return FakeEmbeddings(dim=64)
+
+
+@pytest.fixture
+def vector_db(embeddings):
+    texts, metadatas = [], []
+    for category, chunks in CHUNKS.items():
+        for text in chunks:
+            texts.append(text)
+            metadatas.append({"source": f"{category}/doc.docx", "category": category})
+    return FAISS.from_texts(texts, embeddings, metadatas=metadatas)
+
+
+@pytest.fixture
+def gemini_client():
+    return GeminiClient(FakeChatModel(latency=0.0, tokens_per_second=1e6, completion_tokens=8))
@@ -0,0 +1,33 @@
+import pytest
+
+from tools import HRToolManager
+from utils.conversation import Conversation
+
+
+def conversation_after(question: str) -> Conversation:
+    conversation = Conversation()
+    conversation.add("user", question)
+    conversation.add("assistant", "Detected Use Case: Leave Policy\nEmployees get 20 days of annual leave.")
+    return conversation
+
+
+@pytest.mark.parametrize("query", [
+    "Is there a form for travel claims?",
+    "How many holidays are there in 2025?",
+    "Why do I need a medical certificate for sick leave?",
+    "What is that policy on WFH?",
+])
+def test_standalone_questions_are_not_follow_ups(query):
+    assert not conversation_after("How many days of annual leave do I get?").is_follow_up(query)
+
+
+@pytest.mark.parametrize("query", ["Who approves it?", "And for contractors?", "Does the same apply to interns?"])
+def test_questions_leaning_on_the_previous_turn_are_follow_ups(query):
+    assert conversation_after("How many days of annual leave do I get?").is_follow_up(query)
+
+
+def test_query_with_its_own_topic_keywords_is_standalone(vector_db, gemini_client):
+    manager = HRToolManager(vector_db, gemini_client)
+    conversation = conversation_after("How many days of annual leave do I get?")
+    assert manager._follow_up("What about sick leave?", conversation) is None
+    assert manager._follow_up("Who approves it?", conversation) is not None
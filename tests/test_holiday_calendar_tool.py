@@ -0,0 +1,48 @@
+import datetime as dt
+
+import pytest
+
+from tools.holiday_calendar_tool import HolidayCalendarTool
+from utils.holiday_calendar import HolidayCalendar
+
+TODAY = dt.date(2025, 3, 1)
+
+
+@pytest.fixture
+def tool(gemini_client):
+    tool = HolidayCalendarTool(None, gemini_client)
+    tool.calendar = HolidayCalendar.from_rows([
+        (dt.date(2025, 1, 26), "Republic Day", {}, "holidays.csv"),
+        (dt.date(2025, 3, 14), "Holi", {}, "holidays.csv"),
+        (dt.date(2025, 8, 15), "Independence Day", {}, "holidays.csv"),
+        (dt.date(2025, 12, 25), "Christmas", {}, "holidays.csv"),
+    ])
+    return tool
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("When is the next holiday?", "The next company holiday is in 13 days"),
+    ("What are the next two public holidays?", "The next 2 company holidays"),
+    ("Which holidays are coming up?", "The next company holiday"),
+    ("Show me the holiday list", "Company holidays for 2025 (4 in total)"),
+    ("Give me the company holiday calendar", "Company holidays for 2025"),
+    ("Is 15 August a holiday?", "Yes, Friday, 15 August 2025 is a company holiday"),
+    ("Is 16 August a holiday?", "No, Saturday, 16 August 2025 is not a company holiday"),
+    ("What holidays do we have in December?", "Company holidays in December 2025"),
+    ("Is Christmas a company holiday?", "Christmas is on the company holiday calendar"),
+])
+def test_answers_calendar_lookups(tool, query, expected):
+    assert expected in tool.direct_answer(query, TODAY)
+
+
+@pytest.mark.parametrize("query", [
+    "Can I carry leave over to next year if a holiday falls on a weekend?",
+    "How many sick days can I take around a holiday?",
+    "Do I get comp-off for working on a public holiday?",
+    "Can I apply for leave on the day after Holi?",
+    "Is travel on a holiday reimbursed?",
+    "What is the policy when a holiday falls during my annual leave?",
+    "Does the next appraisal cycle consider holidays?",
+])
+def test_leaves_policy_questions_about_holidays_to_retrieval(tool, query):
+    assert tool.direct_answer(query, TODAY) is None
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+import create_index
+from benchmarks.fakes import FakeEmbeddings
+from utils.ann import IndexSpec
+from utils.index_store import load_store
+from utils.index_versions import index_name_for, read_current_version
+
+
+def write_sheet(path, prefix, rows):
+    pd.DataFrame({"Item": [f"{prefix} item {i}" for i in range(rows)],
+                  "Detail": [f"detail {prefix} {i * 7 % 13} code {i}" for i in range(rows)]}).to_excel(path, index=False)
+
+
+def test_incremental_runs_keep_unchanged_vectors_exact(tmp_path):
+    sources = tmp_path / "excel_files"
+    sources.mkdir()
+    index_path = str(tmp_path / "index")
+    doc_paths = {"excel_files": str(sources)}
+    embeddings = FakeEmbeddings(dim=32)
+    spec = IndexSpec(kind="ivf-pq", nlist=4, pq_m=1, min_size=100, train_sample=1000, eval_queries=20)
+
+    def run():
+        return create_index.update_faiss_index(doc_paths, index_path, embeddings=embeddings,
+                                               cache_path=str(tmp_path / "cache.db"), index_spec=spec)
+
+    write_sheet(sources / "base.xlsx", "base", 400)
+    assert run() is not None
+    # As if built before exact vectors were saved: the next run recovers them from the cache
+    saved = list((tmp_path / "index").glob("*.vectors.npy"))
+    assert len(saved) == 1
+    saved[0].unlink()
+    for extra in ("first", "second"):
+        write_sheet(sources / f"{extra}.xlsx", extra, 20)
+        assert run() is not None
+
+    version = read_current_version(index_path)
+    assert version == "3"
+    db, _ = load_store(index_path, index_name_for(version), embeddings, mmap=False)
+    assert db.index.ntotal == 440
+    base = 0
+    for position, doc_id in db.index_to_docstore_id.items():
+        doc = db.docstore.search(doc_id)
+        if doc.metadata["source"].endswith("base.xlsx"):
+            base += 1
+            expected = embeddings.embed_vector(doc.page_content)
+            assert np.array_equal(db.index.reconstruct(position), expected)
+    assert base == 400
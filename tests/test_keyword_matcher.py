@@ -0,0 +1,32 @@
+import pytest
+
+from tools import HRToolManager
+from utils.gemini_client import GeminiClient
+from utils.keyword_matcher import KeywordMatcher
+
+
+@pytest.mark.parametrize("query", [
+    "Who is his manager?",
+    "How do I file his reimbursement claim?",
+    "Is this covered by the travel policy?",
+    "I hit my leave quota already",
+])
+def test_greeting_words_do_not_match_inside_other_words(vector_db, gemini_client, query):
+    manager = HRToolManager(vector_db, gemini_client)
+    assert not manager.keyword_matcher.contains(query, "greeting")
+    assert not gemini_client._is_greeting(query)  # the manager's shared matcher
+    assert not GeminiClient(gemini_client.llm)._is_greeting(query)  # the client's own
+
+
+def test_greetings_still_match(gemini_client):
+    client = GeminiClient(gemini_client.llm)
+    assert client._is_greeting("Hi there")
+    assert client._is_greeting("hello!")
+
+
+def test_plural_suffix_only_for_opted_in_groups():
+    matcher = KeywordMatcher({"forms": ["form", "expense"], "greeting": ["hi"]}, plural=["forms"])
+    assert matcher.labels("Where are the forms for expenses?") == {"forms"}
+    assert matcher.match("Where are the forms for expenses?")["forms"] == {"form", "expense"}
+    assert matcher.labels("his") == set()
+    assert matcher.labels("hi") == {"greeting"}
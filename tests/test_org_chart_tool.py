@@ -0,0 +1,44 @@
+import pytest
+
+from tools.org_chart_tool import OrgChartTool
+from utils.org_graph import OrgGraph
+
+
+@pytest.fixture
+def tool(gemini_client):
+    tool = OrgChartTool(None, gemini_client)
+    tool.graph = OrgGraph.from_rows([
+        ("E1", "Alice Stone", "CEO", "Management", ""),
+        ("E2", "Eve Black", "CFO", "Finance", "E1"),
+        ("E3", "Carol White", "CTO", "Engineering", "E1"),
+        ("E4", "Dan Brown", "Engineer", "Engineering", "E3"),
+        ("E5", "Frank Green", "Accountant", "Finance", "E2"),
+    ])
+    return tool
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("Who is Dan Brown's manager?", "Dan Brown's manager is Carol White (CTO, Engineering)."),
+    ("Who does the CFO report to?", "Eve Black's manager is Alice Stone (CEO, Management)."),
+    ("Who reports to Carol White?", "Direct reports of Carol White (CTO, Engineering) (1):"),
+    ("Who is the CFO?", "Eve Black\n- Designation: CFO"),
+    ("Who is the head of the Engineering department?", "Engineering is headed by Carol White"),
+    ("Who is the manager of the Finance department?", "Finance is headed by Eve Black"),
+    ("Who manages Engineering?", "Engineering is headed by Carol White"),
+    ("Who are the members of the Finance department?", "Members of Finance, most senior first (2):"),
+    ("Does Frank Green report to Alice Stone?", "Yes, Frank Green (Accountant, Finance) reports indirectly"),
+])
+def test_answers_org_structure_questions(tool, query, expected):
+    assert expected in tool.direct_answer(query)
+
+
+@pytest.mark.parametrize("query", [
+    "What is the travel reimbursement limit for an Engineer?",
+    "Does the accountant need a form to claim travel expenses?",
+    "Is the CFO allowed to approve reimbursement claims?",
+    "What is the maternity leave policy for employees in the Engineering department?",
+    "What is Dan Brown's leave balance?",
+    "How do employees in Finance book a meeting room?",
+])
+def test_leaves_policy_questions_naming_people_to_retrieval(tool, query):
+    assert tool.direct_answer(query) is None
@@ -0,0 +1,126 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmarks.fakes import FakeChatModel
+from utils.clients import PooledLLM
+from utils.resilient_llm import CircuitBreaker, CircuitOpenError, DeadlineExceeded, ResilientLLM
+
+
+class ScriptedChatModel(FakeChatModel):
+    """FakeChatModel whose n-th call fails or stalls as scripted"""
+
+    def __init__(self, failures: int = 0, slow_calls: int = 0, slow_latency: float = 2.0):
+        super().__init__(latency=0.0, tokens_per_second=1e6, completion_tokens=4)
+        self.failures = failures
+        self.slow_calls = slow_calls
+        self.slow_latency = slow_latency
+
+    def _start_call(self):
+        fail, latency = super()._start_call()
+        if self.calls <= self.slow_calls:
+            latency = self.slow_latency
+        return fail or self.calls <= self.failures, latency
+
+
+def resilient(llm, **kwargs) -> ResilientLLM:
+    kwargs.setdefault("base_delay", 0.01)
+    kwargs.setdefault("executor", ThreadPoolExecutor(max_workers=4))
+    return ResilientLLM(llm, **kwargs)
+
+
+def free_slots(pooled: PooledLLM) -> int:
+    taken = 0
+    while pooled._slots.acquire(blocking=False):
+        taken += 1
+    for _ in range(taken):
+        pooled._slots.release()
+    return taken
+
+
+def test_retries_a_failed_attempt():
+    llm = ScriptedChatModel(failures=1)
+    client = resilient(llm, max_retries=2)
+    assert client.invoke("hello").content
+    assert llm.calls == 2
+    assert client.retries == 1
+
+
+def test_gives_up_after_max_retries():
+    llm = ScriptedChatModel()
+    llm.outage = True
+    client = resilient(llm, max_retries=2, breaker=CircuitBreaker(failure_threshold=10))
+    with pytest.raises(ConnectionError):
+        client.invoke("hello")
+    assert llm.calls == 3
+
+
+def test_stream_retries_before_the_first_chunk():
+    llm = ScriptedChatModel(failures=1)
+    client = resilient(llm, max_retries=1)
+    chunks = list(client.stream("hello"))
+    assert "".join(chunk.content for chunk in chunks) == client.invoke("hello").content
+    assert client.retries == 1
+
+
+def test_hedge_answers_and_frees_the_slow_attempts_slot():
+    llm = ScriptedChatModel(slow_calls=1, slow_latency=2.0)
+    pooled = PooledLLM(llm, max_concurrency=2)
+    client = resilient(pooled, hedge=True, hedge_min_samples=5)
+    for _ in range(5):
+        client.latencies.add(0.05)
+
+    started = time.monotonic()
+    assert client.invoke("hello").content
+    assert time.monotonic() - started < 1.0
+    assert client.hedges == 1
+    assert llm.calls == 2
+    # The first attempt is still sleeping upstream but no longer holds a slot
+    assert free_slots(pooled) == 2
+
+
+def test_deadline_abandons_the_attempt_and_its_slot():
+    llm = ScriptedChatModel(slow_calls=1, slow_latency=2.0)
+    pooled = PooledLLM(llm, max_concurrency=1)
+    client = resilient(pooled, timeout=0.2, max_retries=2)
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        client.invoke("hello")
+    assert time.monotonic() - started < 1.0
+    assert free_slots(pooled) == 1
+    # The next call gets the slot without waiting for the abandoned one
+    assert client.invoke("hello").content
+
+
+def test_attempt_queued_past_its_deadline_never_reaches_the_upstream():
+    llm = ScriptedChatModel(slow_calls=1, slow_latency=0.5)
+    client = resilient(llm, timeout=0.1, max_retries=0, executor=ThreadPoolExecutor(max_workers=1))
+    with pytest.raises(DeadlineExceeded):
+        client.invoke("first")  # occupies the only worker for 0.5s
+    with pytest.raises(DeadlineExceeded):
+        client.invoke("second")  # queued behind it, then cancelled
+    time.sleep(0.6)
+    assert llm.calls == 1
+
+
+def test_breaker_opens_then_closes_after_a_successful_probe():
+    llm = ScriptedChatModel()
+    llm.outage = True
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.1)
+    client = resilient(llm, max_retries=0, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            client.invoke("hello")
+    assert breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        client.invoke("hello")
+    assert llm.calls == 2
+    assert client.rejected == 1
+
+    time.sleep(0.15)
+    llm.outage = False
+    assert client.invoke("hello").content
+    assert breaker.state == "closed"
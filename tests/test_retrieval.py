@@ -0,0 +1,17 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from tools.leave_policy_tool import LeavePolicyTool
+from utils import metrics
+from utils.bm25 import BM25Index
+
+
+def test_async_retrieval_records_lexical_span_in_request_trace(vector_db, gemini_client):
+    tool = LeavePolicyTool(vector_db, gemini_client)
+    tool.category = "leave"
+    tool.lexical_index = BM25Index.from_vector_store(vector_db)
+    with ThreadPoolExecutor(max_workers=2) as executor, metrics.request_trace() as trace:
+        documents = asyncio.run(tool.aretrieve_documents("medical certificate sick leave", 2, executor))
+    assert documents
+    stages = [stage for stage, _ in trace.spans]
+    assert "lexical_search" in stages
+    assert "retrieve" in stages
@@ -0,0 +1,36 @@
+from benchmarks.fakes import FakeEmbeddings
+from benchmarks.routing import LABELED_QUERIES, build_tools, evaluate
+from tools import HRToolManager
+from tools.router import ToolRouter
+
+
+class QueryOnlyEmbeddings(FakeEmbeddings):
+    """Fails if anything is embedded with the document task type"""
+
+    def embed_documents(self, texts):
+        raise AssertionError("router exemplars must be embedded as queries")
+
+
+def test_exemplars_are_embedded_as_queries():
+    embeddings = QueryOnlyEmbeddings(dim=64)
+    router = ToolRouter.from_tools(build_tools(), embeddings)
+    assert router is not None
+    # An exemplar routes to its own tool with a perfect score
+    tool = build_tools()["reimbursement"]
+    scores = router.scores(embeddings.embed_query(tool.exemplars[0]))
+    assert scores[tool.tool_name] > 0.999
+
+
+def test_calibrated_routing_is_no_worse_than_keywords_and_matches_the_app(vector_db, embeddings,
+                                                                           gemini_client):
+    report = evaluate(build_tools(), embeddings)
+    best = report["best_min_score"]
+    assert report["routing_accuracy"][best] >= report["keyword_accuracy"]
+
+    manager = HRToolManager(vector_db, gemini_client)
+    manager.router.min_score = best
+    correct = 0
+    for query, expected in LABELED_QUERIES:
+        tool = manager.get_tool_for_query(query, embeddings.embed_query(query))
+        correct += (tool.tool_name if tool else None) == expected
+    assert correct / len(LABELED_QUERIES) == report["routing_accuracy"][best]
@@ -0,0 +1,55 @@
+import asyncio
+import json
+from argparse import Namespace
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+import server
+from utils.conversation import ConversationStore
+
+
+class FailingToolManager:
+    """Streams one chunk, then fails the way an LLM or embedding outage would"""
+
+    async def aprocess_query(self, query, executor=None, conversation=None):
+        raise ConnectionError("embedding backend unavailable")
+
+    async def astream_query(self, query, executor=None, conversation=None):
+        yield "partial "
+        raise ConnectionError("LLM backend unavailable")
+
+
+def make_app():
+    app = web.Application()
+    app["config"] = Namespace(timeout=5.0)
+    app["tool_manager"] = FailingToolManager()
+    app["conversations"] = ConversationStore()
+    app["executor"] = None
+    app.router.add_post("/query", server.handle_query)
+    app.router.add_post("/query/stream", server.handle_query_stream)
+    return app
+
+
+def run(check):
+    async def main():
+        async with TestClient(TestServer(make_app())) as client:
+            await check(client)
+    asyncio.run(main())
+
+
+def test_query_failure_returns_json_500():
+    async def check(client):
+        response = await client.post("/query", json={"query": "How many leave days do I get?"})
+        assert response.status == 500
+        assert "error" in await response.json()
+    run(check)
+
+
+def test_stream_failure_ends_with_error_event():
+    async def check(client):
+        response = await client.post("/query/stream", json={"query": "How many leave days do I get?"})
+        assert response.status == 200
+        events = [block.split("\n") for block in (await response.text()).strip().split("\n\n")]
+        names = [lines[0][len("event: "):] for lines in events]
+        assert names == ["delta", "error"]
+        assert "error" in json.loads(events[-1][1][len("data: "):])
+    run(check)
@@ -0,0 +1,66 @@
+import asyncio
+import datetime as dt
+
+from tools import HRToolManager
+from utils.answer_cache import AnswerCache
+from utils.holiday_calendar import HolidayCalendar
+
+
+def test_embedding_outage_degrades_to_exact_cache_only(vector_db, embeddings, gemini_client):
+    cache = AnswerCache(embeddings=embeddings)
+    manager = HRToolManager(vector_db, gemini_client, answer_cache=cache)
+    manager.process_query("How many days of annual leave do I get?")  # cache is not empty
+    assert cache.stats()["entries"] == 1
+
+    embeddings.failure_rate = 1.0
+    answer = manager.process_query("qwerty zxcv plugh")
+    assert answer
+    # Stored for exact matches only, without another embedding attempt
+    assert cache.stats()["entries"] == 2
+    assert manager.process_query("Qwerty zxcv plugh!") == answer
+
+
+def test_only_the_routed_tool_answers_directly(vector_db, gemini_client):
+    calendar = HolidayCalendar.from_rows([(dt.date(2099, 12, 25), "Christmas", {}, "holidays.csv")])
+    manager = HRToolManager(vector_db, gemini_client, holiday_calendar=calendar)
+    asked = []
+
+    def org_direct_answer(query):
+        asked.append(query)
+        return "Detected Use Case: Org Chart\nsomeone's profile"
+
+    manager.tools["org_chart"].direct_answer = org_direct_answer
+
+    answer = manager.process_query("How many days of annual leave do I get?")
+    assert "Org Chart" not in answer
+    assert asked == []
+    assert "Christmas" in manager.process_query("When is the next holiday?")
+    assert "Christmas" in "".join(manager.stream_query("When is the next holiday?"))
+    assert "Christmas" in asyncio.run(manager.aprocess_query("When is the next holiday?"))
+    assert asked == []
+
+
+def test_calendar_lookup_makes_no_embedding_call(vector_db, embeddings, gemini_client):
+    calendar = HolidayCalendar.from_rows([(dt.date(2099, 12, 25), "Christmas", {}, "holidays.csv")])
+    manager = HRToolManager(vector_db, gemini_client, holiday_calendar=calendar)
+    requests = embeddings.requests
+
+    assert "Christmas" in manager.process_query("When is the next holiday?")
+    assert "Christmas" in "".join(manager.stream_query("Is Christmas a company holiday?"))
+    assert "Christmas" in asyncio.run(manager.aprocess_query("Show me the holiday list for 2099"))
+    assert embeddings.requests == requests
+
+
+def test_lexically_routed_queries_count_against_the_hit_rate(vector_db, embeddings, gemini_client):
+    cache = AnswerCache(embeddings=embeddings)
+    manager = HRToolManager(vector_db, gemini_client, answer_cache=cache)
+    query = "What is the travel reimbursement limit?"
+    assert manager.lexical_category(query) == "reimbursement"
+
+    manager.process_query(query)
+    "".join(manager.stream_query("What is the travel reimbursement limit per trip?"))
+    asyncio.run(manager.aprocess_query("What is the travel reimbursement limit for a trip?"))
+    manager.process_query(query)
+    stats = cache.stats()
+    assert (stats["skipped"], stats["misses"], stats["exact_hits"]) == (3, 0, 1)
+    assert stats["hit_rate"] == 0.25
@@ -1,52 +1,452 @@
-from typing import Dict, Any
+import asyncio
+import contextvars
+from concurrent.futures import Executor
+from typing import Dict, Any, AsyncIterator, Iterator, List, Optional, Tuple
 from .leave_policy_tool import LeavePolicyTool
 from .holiday_calendar_tool import HolidayCalendarTool
 from .reimbursement_tool import ReimbursementTool
 from .org_chart_tool import OrgChartTool
 from .hr_forms_tool import HRFormsTool
+from .router import ToolRouter
 from utils.gemini_client import GeminiClient
+from utils.answer_cache import AnswerCache
+from utils.bm25 import BM25Index
+from utils.conversation import Conversation
+from utils.holiday_calendar import HolidayCalendar
+from utils.keyword_matcher import KeywordMatcher
+from utils.org_graph import OrgGraph
+from utils.partitions import build_partitions
+from utils.single_flight import SingleFlight
+from utils import metrics
 
 class HRToolManager:
     """Manages all HR tools and routes queries to the appropriate one"""
-    
-    def __init__(self, vector_db):
-        self.tools = {
-            "leave_policy": LeavePolicyTool(vector_db),
-            "holiday_calendar": HolidayCalendarTool(vector_db),
-            "reimbursement": ReimbursementTool(vector_db),
-            "org_chart": OrgChartTool(vector_db),
-            "hr_forms": HRFormsTool(vector_db)
+
+    def __init__(self, vector_db, gemini_client: GeminiClient = None,
+                 answer_cache: Optional[AnswerCache] = None,
+                 router: Optional[ToolRouter] = None,
+                 partitions: Optional[Dict[str, Any]] = None,
+                 lexical_index: Optional[BM25Index] = None,
+                 single_flight: Optional[SingleFlight] = None,
+                 holiday_calendar: Optional[HolidayCalendar] = None,
+                 org_graph: Optional[OrgGraph] = None):
+        # One Gemini client (and so one pooled LLM connection) shared by every tool
+        self.gemini_client = gemini_client if gemini_client is not None else GeminiClient()
+        # Each tool searches a sub-index holding only its own category's chunks
+        self.partitions = partitions if partitions is not None else build_partitions(vector_db)
+        # BM25 index for hybrid retrieval; a decisive lexical hit skips the embedding call
+        self.lexical_index = (lexical_index if lexical_index is not None
+                              else BM25Index.from_vector_store(vector_db))
+        # Typed holiday store written by create_index.py; answers date questions without Gemini
+        self.holiday_calendar = holiday_calendar
+        # Reporting-line graph of the org chart; answers manager/report questions directly
+        self.org_graph = org_graph
+        self.tools = self._build_tools(vector_db, self.partitions, self.lexical_index)
+        # Every tool's keywords plus the greeting phrases in one compiled matcher,
+        # so keyword routing and greeting detection share a single scan
+        self.keyword_matcher = KeywordMatcher({
+            **{tool.tool_name: tool.keywords for tool in self.tools.values()},
+            "greeting": GeminiClient.GREETING_PHRASES
+        }, plural=[tool.tool_name for tool in self.tools.values()])
+        for tool in self.tools.values():
+            tool.keyword_matcher = self.keyword_matcher
+        self.gemini_client.keyword_matcher = self.keyword_matcher
+        self.answer_cache = answer_cache
+        if answer_cache is not None:
+            # When Gemini fails or its circuit is open, serve a close cached answer instead
+            self.gemini_client.cached_answer = answer_cache.lookup_fallback
+        self.embeddings = vector_db.embeddings
+        # The query is embedded once; the same vector drives the semantic
+        # cache, routing and retrieval
+        self.router = router if router is not None else ToolRouter.from_tools(self.tools, self.embeddings)
+        # Identical questions asked at the same moment share one answer
+        self.single_flight = single_flight if single_flight is not None else SingleFlight()
+
+    def _build_tools(self, vector_db, partitions: Dict[str, Any],
+                     lexical_index: Optional[BM25Index]) -> Dict[str, Any]:
+        tools = {
+            "leave_policy": LeavePolicyTool(vector_db, self.gemini_client),
+            "holiday_calendar": HolidayCalendarTool(vector_db, self.gemini_client),
+            "reimbursement": ReimbursementTool(vector_db, self.gemini_client),
+            "org_chart": OrgChartTool(vector_db, self.gemini_client),
+            "hr_forms": HRFormsTool(vector_db, self.gemini_client)
         }
-        self.gemini_client = GeminiClient()  # Initialize Gemini client here
-    
-    def get_tool_for_query(self, query: str) -> Any:
+        for tool in tools.values():
+            tool.keyword_matcher = getattr(self, "keyword_matcher", None)
+            tool.partition_db = partitions.get(tool.category)
+            tool.lexical_index = lexical_index
+        tools["holiday_calendar"].calendar = self.holiday_calendar
+        tools["org_chart"].graph = self.org_graph
+        return tools
+
+    def swap_index(self, vector_db, partitions: Optional[Dict[str, Any]] = None,
+                   lexical_index: Optional[BM25Index] = None,
+                   index_version: Optional[str] = None,
+                   holiday_calendar: Optional[HolidayCalendar] = None,
+                   org_graph: Optional[OrgGraph] = None) -> None:
+        """Switch to a newly loaded index without interrupting running requests.
+
+        New tool objects are bound to the new index and published with one
+        reference assignment; a request that already picked a tool keeps
+        using the old one (and so the old index) until it finishes. Cached
+        answers from the old index are dropped.
+        """
+        partitions = partitions if partitions is not None else build_partitions(vector_db)
+        if lexical_index is None:
+            lexical_index = BM25Index.from_vector_store(vector_db)
+        self.holiday_calendar = holiday_calendar
+        self.org_graph = org_graph
+        tools = self._build_tools(vector_db, partitions, lexical_index)
+        router = self.router.with_tools(tools) if self.router is not None else None
+        self.partitions = partitions
+        self.lexical_index = lexical_index
+        self.router = router
+        self.tools = tools
+        if self.answer_cache is not None:
+            self.answer_cache.set_index_version(index_version)
+
+    def get_tool_for_query(self, query: str, query_vector: Optional[List[float]] = None,
+                           category: Optional[str] = None) -> Any:
         """Find the most appropriate tool for the given query"""
-        relevant_tools = []
-        
-        for tool_name, tool in self.tools.items():
-            if tool.is_relevant_query(query):
-                relevant_tools.append((tool_name, tool))
-        
-        if not relevant_tools:
-            return None
-
-        def count_matches(tool_pair):
-            tool_name, tool = tool_pair
-            return sum(keyword in query.lower() for keyword in tool.keywords)
-        
-        relevant_tools.sort(key=count_matches, reverse=True)
-        return relevant_tools[0][1]
-    
-    def process_query(self, query: str) -> str:
-        """Process the query using the most appropriate tool"""
-        tool = self.get_tool_for_query(query)
-        
+        tool = self._category_tool(category)
+        if tool is None and self.router is not None and query_vector is not None:
+            tool = self.router.route(query_vector)
+        if tool is None:
+            # No embedding, or not close enough to any exemplar: an explicit keyword decides
+            with metrics.span("route"):
+                tool = self._keyword_route(query)
+        metrics.set_tool(tool.tool_name if tool else "general")
+        return tool
+
+    def _category_tool(self, category: Optional[str]) -> Any:
+        return next((tool for tool in self.tools.values() if category and tool.category == category), None)
+
+    def _keyword_tools(self, query: str) -> List[Any]:
+        """Tools with the most keyword hits, in registration order (several on a tie)"""
+        found = self.keyword_matcher.match(query)
+        counts = [(tool, len(found.get(tool.tool_name, ()))) for tool in self.tools.values()]
+        best = max((count for _, count in counts), default=0)
+        return [tool for tool, count in counts if best and count == best]
+
+    def _has_topic(self, query: str) -> bool:
+        """True if the query names a tool's topic itself (so it is not a follow-up)"""
+        return bool(self._keyword_tools(query))
+
+    def _keyword_route(self, query: str) -> Any:
+        """Fallback routing when no query embedding is available"""
+        tools = self._keyword_tools(query)
+        return tools[0] if tools else None
+
+    def lexical_category(self, query: str) -> Optional[str]:
+        """Category of a decisive BM25 match, in which case the query is not embedded"""
+        if self.lexical_index is None:
+            return None
+        with metrics.span("lexical_search"):
+            return self.lexical_index.decisive_category(query)
+
+    def embed_query(self, query: str) -> Optional[List[float]]:
+        """Embed the query once for cache, routing and retrieval (None on failure)"""
+        if self.embeddings is None:
+            return None
+        try:
+            with metrics.span("embed_query"):
+                return self.embeddings.embed_query(query)
+        except Exception as e:
+            print(f"Error embedding query: {str(e)}")
+            return None
+
+    async def aembed_query(self, query: str) -> Optional[List[float]]:
+        """Async version of embed_query()"""
+        if self.embeddings is None:
+            return None
+        try:
+            with metrics.span("embed_query"):
+                return await self.embeddings.aembed_query(query)
+        except Exception as e:
+            print(f"Error embedding query: {str(e)}")
+            return None
+
+    def _direct_answer(self, tool: Any, query: str) -> Optional[str]:
+        """Answer from the routed tool's structured data (no search or Gemini) when it can.
+
+        These answers depend on today's date, so they are never cached.
+        """
+        if tool is None:
+            return None
+        with metrics.span("direct_answer"):
+            answer = tool.direct_answer(query)
+        if answer is not None:
+            metrics.set_tool(tool.tool_name)
+        return answer
+
+    def _direct_answer_first(self, query: str, search: str,
+                             category: Optional[str]) -> Tuple[List[Any], Optional[str]]:
+        """(tools picked without an embedding, the first direct answer among them or None).
+
+        Calendar and org chart lookups are answered here, before the query
+        is embedded; the query is embedded only when none of these tools
+        has an answer. Keyword ties ("holiday" is a leave keyword too) all
+        get asked.
+        """
+        tool = self._category_tool(category)
+        if tool is not None:
+            tools = [tool]
+        else:
+            with metrics.span("route"):
+                tools = self._keyword_tools(search)
+        for tool in tools:
+            answer = self._direct_answer(tool, query)
+            if answer is not None:
+                return tools, answer
+        return tools, None
+
+    def _cached_exact(self, query: str) -> Optional[str]:
+        if self.answer_cache is None:
+            return None
+        with metrics.span("cache_lookup"):
+            cached = self.answer_cache.lookup_exact(query)
+        if cached is not None:
+            metrics.set_tool("cache")
+        return cached
+
+    def _cached_similar(self, query: str, query_vector: Optional[List[float]]) -> Optional[str]:
+        if self.answer_cache is None:
+            return None
+        with metrics.span("cache_lookup"):
+            if query_vector is None:
+                # Embedding the query just failed; do not let the cache try (and raise) again
+                cached = self.answer_cache.lookup_exact(query)
+            else:
+                cached = self.answer_cache.lookup_similar(query, query_vector)
+        if cached is not None:
+            metrics.set_tool("cache")
+        return cached
+
+    def _skip_similar(self) -> None:
+        # A decisive lexical match is not embedded, so the semantic tier is not
+        # asked; count it so the hit rate still covers every exact-tier miss
+        if self.answer_cache is not None:
+            self.answer_cache.record_skip()
+
+    def _cache_version(self) -> Optional[str]:
+        # Captured when a request starts so an answer built from an index
+        # that has since been swapped out is not cached under the new one
+        return self.answer_cache.index_version if self.answer_cache is not None else None
+
+    def _store(self, query: str, response: str, query_vector: Optional[List[float]],
+               index_version: Optional[str] = None) -> None:
+        # Never embeds here: without a vector (decisive lexical match, or the
+        # embedding call failed) the answer is cached for exact matches only
+        if self.answer_cache is not None and not GeminiClient.is_fallback_response(response):
+            self.answer_cache.put(query, response, query_vector, embed=False,
+                                  index_version=index_version)
+
+    def _follow_up(self, query: str, conversation: Optional[Conversation]) -> Optional[Tuple[str, str]]:
+        """(retrieval text, history) if the query depends on earlier turns, else None.
+
+        Follow-ups are answered with the conversation in the prompt and are
+        neither cached nor coalesced, since the same words mean different
+        things in different sessions. Standalone questions go the usual way.
+        """
+        if conversation is None or not conversation.is_follow_up(query, self._has_topic):
+            return None
+        metrics.get_metrics().increment("follow_up_queries", 1, "follow_up")
+        return (conversation.retrieval_query(query),
+                conversation.history(query, self.gemini_client.max_history_tokens))
+
+    def process_query(self, query: str, conversation: Optional[Conversation] = None) -> str:
+        """Process the query, answering repeat questions from the cache.
+
+        ``conversation`` holds the session's earlier turns, used to answer
+        follow-up questions.
+        """
+        follow_up = self._follow_up(query, conversation)
+        if follow_up is not None:
+            return self._process_uncached(query, None, *follow_up)
+        index_version = self._cache_version()
+        cached = self._cached_exact(query)
+        if cached is not None:
+            return cached
+        return "".join(self.single_flight.stream(
+            self._flight_key(query, index_version),
+            lambda: iter([self._process_uncached(query, index_version)])
+        ))
+
+    def _flight_key(self, query: str, index_version: Optional[str]) -> tuple:
+        # Routing is a function of the query for a given index, so this key
+        # also pins the tool, and coalescing before routing shares the embedding call
+        return AnswerCache.normalize(query), index_version
+
+    def _process_uncached(self, query: str, index_version: Optional[str],
+                          search_query: Optional[str] = None, history: str = "") -> str:
+        # A follow-up (search_query set) is routed and retrieved on the
+        # combined text and bypasses the answer cache both ways
+        search = search_query or query
+        category = self.lexical_category(search)
+        tried, direct = self._direct_answer_first(query, search, category)
+        if direct is not None:
+            return direct
+        query_vector = self.embed_query(search) if category is None else None
+        tool = self.get_tool_for_query(search, query_vector, category)
+        direct = self._direct_answer(tool, query) if tool not in tried else None
+        if direct is not None:
+            return direct
+        if category is None and search_query is None:
+            cached = self._cached_similar(query, query_vector)
+            if cached is not None:
+                return cached
+        elif search_query is None:
+            self._skip_similar()
+
+        response = self._answer(query, tool, history, query_vector, search_query)
+        if search_query is None:
+            self._store(query, response, query_vector, index_version)
+        return response
+
+    def _answer(self, query: str, tool: Any, history: str = "",
+                query_vector: Optional[List[float]] = None,
+                search_query: Optional[str] = None) -> str:
+        """Process the query with the routed tool, or Gemini alone if there is none"""
         if not tool:
             # Handle unrecognized queries with Gemini
             return self.gemini_client.generate_hr_response(
                 context="No specific HR documents matched this query",
                 query=query,
-                use_case="General HR Inquiry"
+                use_case="General HR Inquiry",
+                history=history
+            )
+
+        return tool.respond(query, query_vector, history, search_query)
+
+    def stream_query(self, query: str, conversation: Optional[Conversation] = None) -> Iterator[str]:
+        """Streaming version of process_query(); yields answer chunks"""
+        index_version = self._cache_version()
+        follow_up = self._follow_up(query, conversation)
+        if follow_up is not None:
+            yield from self._stream_uncached(query, None, *follow_up)
+            return
+        cached = self._cached_exact(query)
+        if cached is not None:
+            yield cached
+            return
+        yield from self.single_flight.stream(
+            self._flight_key(query, index_version),
+            lambda: self._stream_uncached(query, index_version)
+        )
+
+    def _stream_uncached(self, query: str, index_version: Optional[str],
+                         search_query: Optional[str] = None, history: str = "") -> Iterator[str]:
+        search = search_query or query
+        category = self.lexical_category(search)
+        tried, direct = self._direct_answer_first(query, search, category)
+        if direct is not None:
+            yield direct
+            return
+        query_vector = self.embed_query(search) if category is None else None
+        tool = self.get_tool_for_query(search, query_vector, category)
+        direct = self._direct_answer(tool, query) if tool not in tried else None
+        if direct is not None:
+            yield direct
+            return
+        if category is None and search_query is None:
+            cached = self._cached_similar(query, query_vector)
+            if cached is not None:
+                yield cached
+                return
+        elif search_query is None:
+            self._skip_similar()
+
+        chunks = []
+        for chunk in self._stream_answer(query, tool, history, query_vector, search_query):
+            chunks.append(chunk)
+            yield chunk
+
+        if search_query is None:
+            self._store(query, "".join(chunks), query_vector, index_version)
+
+    def _stream_answer(self, query: str, tool: Any, history: str = "",
+                       query_vector: Optional[List[float]] = None,
+                       search_query: Optional[str] = None) -> Iterator[str]:
+        """Stream the answer from the routed tool, or Gemini alone if there is none"""
+        if not tool:
+            yield from self.gemini_client.stream_hr_response(
+                context="No specific HR documents matched this query",
+                query=query,
+                use_case="General HR Inquiry",
+                history=history
+            )
+            return
+
+        yield from tool.respond_stream(query, query_vector, history, search_query)
+
+    async def aprocess_query(self, query: str, executor: Optional[Executor] = None,
+                             conversation: Optional[Conversation] = None) -> str:
+        """Async version of process_query(); blocking work runs on ``executor``"""
+        return "".join([chunk async for chunk in self.astream_query(query, executor, conversation)])
+
+    async def astream_query(self, query: str, executor: Optional[Executor] = None,
+                            conversation: Optional[Conversation] = None) -> AsyncIterator[str]:
+        """Async version of stream_query()"""
+        index_version = self._cache_version()
+        follow_up = self._follow_up(query, conversation)
+        if follow_up is not None:
+            async for chunk in self._astream_uncached(query, executor, None, *follow_up):
+                yield chunk
+            return
+        cached = self._cached_exact(query)
+        if cached is not None:
+            yield cached
+            return
+        async for chunk in self.single_flight.astream(
+            self._flight_key(query, index_version),
+            lambda: self._astream_uncached(query, executor, index_version)
+        ):
+            yield chunk
+
+    async def _astream_uncached(self, query: str, executor: Optional[Executor],
+                                index_version: Optional[str], search_query: Optional[str] = None,
+                                history: str = "") -> AsyncIterator[str]:
+        loop = asyncio.get_running_loop()
+        search = search_query or query
+        category = await loop.run_in_executor(
+            executor, contextvars.copy_context().run, self.lexical_category, search
+        )
+        tried, direct = self._direct_answer_first(query, search, category)
+        if direct is not None:
+            yield direct
+            return
+        query_vector = await self.aembed_query(search) if category is None else None
+        tool = self.get_tool_for_query(search, query_vector, category)
+        direct = self._direct_answer(tool, query) if tool not in tried else None
+        if direct is not None:
+            yield direct
+            return
+        if category is None and search_query is None:
+            cached = await loop.run_in_executor(
+                executor, contextvars.copy_context().run, self._cached_similar, query, query_vector
+            )
+            if cached is not None:
+                yield cached
+                return
+        elif search_query is None:
+            self._skip_similar()
+
+        chunks = []
+        if not tool:
+            stream = self.gemini_client.astream_hr_response(
+                context="No specific HR documents matched this query",
+                query=query,
+                use_case="General HR Inquiry",
+                history=history
+            )
+        else:
+            stream = tool.arespond_stream(query, query_vector, executor, history, search_query)
+        async for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+
+        if search_query is None:
+            await loop.run_in_executor(
+                executor, contextvars.copy_context().run, self._store,
+                query, "".join(chunks), query_vector, index_version
             )
-        
-        return tool.run(query)
\ No newline at end of file
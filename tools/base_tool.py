@@ -1,62 +1,250 @@
+import asyncio
+import contextvars
 from abc import ABC, abstractmethod
-from typing import List
+from concurrent.futures import Executor
+from typing import AsyncIterator, Iterable, Iterator, List, Optional, Sequence, Tuple
 import re  # For cleaning unwanted text
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
+from utils.bm25 import BM25Index, reciprocal_rank_fusion
+from utils.context_builder import ContextBuilder
 from utils.gemini_client import GeminiClient
+from utils.keyword_matcher import KeywordMatcher
+from utils.streaming import SourceRefFilter
+from utils import metrics
+
+_SOURCE_REF = re.compile(r"\(Source:.*?\)")  # hallucinated (Source: ...) refs
 
 class BaseHRTool(ABC):
     """Base class for all HR tools with common functionality"""
     
-    def __init__(self, vector_db: FAISS):
+    def __init__(self, vector_db: FAISS, gemini_client: Optional[GeminiClient] = None):
         self.vector_db = vector_db
         self.tool_name = "base_hr_tool"
         self.description = "Base HR tool for document retrieval"
-        self.gemini_client = GeminiClient()  
+        self.gemini_client = gemini_client if gemini_client is not None else GeminiClient()
         self.use_case = "General HR Inquiry"
+        self.exemplars: List[str] = []  # example questions used by the embedding router
+        self.keywords: List[str] = []
+        self.keyword_matcher: Optional[KeywordMatcher] = None  # shared one set by HRToolManager
+        self.category: Optional[str] = None  # chunk category this tool answers from
+        self.partition_db: Optional[FAISS] = None  # sub-index of that category, if built
+        self.lexical_index: Optional[BM25Index] = None  # shared BM25 index set by HRToolManager
+        self.context_builder = ContextBuilder()
     
     @abstractmethod
     def is_relevant_query(self, query: str) -> bool:
         """Determine if this tool should handle the query"""
         pass
+
+    def direct_answer(self, query: str) -> Optional[str]:
+        """Answer from structured data without retrieval or Gemini, or None if not possible"""
+        return None
+
+    def matches_keywords(self, query: str) -> bool:
+        """True if any of this tool's keywords occurs in the query as a whole word"""
+        if self.keyword_matcher is None:
+            self.keyword_matcher = KeywordMatcher({self.tool_name: self.keywords}, plural=[self.tool_name])
+        return self.keyword_matcher.contains(query, self.tool_name)
     
-    def retrieve_documents(self, query: str, k: int = 3) -> List[Document]:
-        """Retrieve relevant documents from the vector store"""
-        return self.vector_db.similarity_search(query, k=k)
+    def retrieve_documents(self, query: str, k: int = 3,
+                           query_vector: Optional[Sequence[float]] = None) -> List[Document]:
+        """Hybrid BM25 + vector retrieval, reusing ``query_vector`` when the caller has it.
+
+        A decisive lexical match (an employee name, a form title) is returned
+        straight away without embedding the query; otherwise both rankings
+        are merged with reciprocal-rank fusion.
+        """
+        with metrics.span("retrieve"):
+            lexical = self._lexical_search(query, k)
+            if query_vector is None and BM25Index.is_decisive(lexical):
+                return self._lookup(doc_id for doc_id, _ in lexical[:k])
+            vector = query_vector
+            if vector is None:
+                with metrics.span("embed_query"):
+                    vector = self.vector_db.embeddings.embed_query(query)
+            with metrics.span("faiss_search"):
+                dense = self._search(vector, self._fetch_k(k))
+            return self._fuse(dense, lexical, k)
+
+    async def aretrieve_documents(self, query: str, k: int = 3,
+                                  executor: Optional[Executor] = None,
+                                  query_vector: Optional[Sequence[float]] = None) -> List[Document]:
+        """Async version of retrieve_documents(); searches run on ``executor``"""
+        with metrics.span("retrieve"):
+            loop = asyncio.get_running_loop()
+            # Run on the worker inside a copy of this context so its spans land in the request trace
+            lexical = await loop.run_in_executor(
+                executor, contextvars.copy_context().run, self._lexical_search, query, k
+            )
+            if query_vector is None and BM25Index.is_decisive(lexical):
+                return self._lookup(doc_id for doc_id, _ in lexical[:k])
+            vector = query_vector
+            if vector is None:
+                with metrics.span("embed_query"):
+                    vector = await self.vector_db.embeddings.aembed_query(query)
+            with metrics.span("faiss_search"):
+                dense = await loop.run_in_executor(
+                    executor, contextvars.copy_context().run, self._search, vector, self._fetch_k(k)
+                )
+            return self._fuse(dense, lexical, k)
+
+    def _fetch_k(self, k: int) -> int:
+        # Fetch a deeper list from each ranker than we return so fusion has room to reorder
+        return k * 2 if self.lexical_index is not None else k
+
+    def _search(self, vector: Sequence[float], k: int) -> List[Document]:
+        """Search this tool's partition, falling back to the global index"""
+        if self.partition_db is not None:
+            documents = self.partition_db.similarity_search_by_vector(vector, k=k)
+            if documents:
+                return documents
+        return self.vector_db.similarity_search_by_vector(vector, k=k)
+
+    def _lexical_search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """BM25 hits in this tool's category, falling back to the whole corpus"""
+        if self.lexical_index is None:
+            return []
+        with metrics.span("lexical_search"):
+            hits = self.lexical_index.search(query, self._fetch_k(k), self.category)
+            if not hits and self.category is not None:
+                hits = self.lexical_index.search(query, self._fetch_k(k))
+            return hits
+
+    def _lookup(self, doc_ids: Iterable[str]) -> List[Document]:
+        documents = (self.vector_db.docstore.search(doc_id) for doc_id in doc_ids)
+        return [doc for doc in documents if isinstance(doc, Document)]
+
+    def _fuse(self, dense: List[Document], lexical: List[Tuple[str, float]],
+              k: int) -> List[Document]:
+        if not lexical or not all(doc.id for doc in dense):
+            return dense[:k]
+        by_id = {doc.id: doc for doc in dense}
+        ranking = reciprocal_rank_fusion([list(by_id), [doc_id for doc_id, _ in lexical]])[:k]
+        missing = [doc_id for doc_id in ranking if doc_id not in by_id]
+        by_id.update((doc.id, doc) for doc in self._lookup(missing))
+        return [by_id[doc_id] for doc_id in ranking if doc_id in by_id]
     
     def format_context(self, documents: List[Document]) -> str:
         """Format documents into context string for Gemini"""
+        with metrics.span("format_context"):
+            return self._format_context(documents)
+
+    def _format_context(self, documents: List[Document]) -> str:
         if not documents:
             return "No relevant documents found in company records."
-        
-        context = []
-        for doc in documents:
-            # Remove bracketed or parenthetical section references
-            cleaned_content = re.sub(r"\[(.*?)\]", "", doc.page_content)  # Removes [Section titles]
-            cleaned_content = re.sub(r"\((.*?)\)", "", cleaned_content)   # Removes (section refs)
-            context.append(cleaned_content.strip())
-        return "\n".join(context)
+        # Merges overlapping chunks, drops repeated text and packs to the token budget
+        return self.context_builder.build(documents)
     
-    def generate_response(self, query: str, documents: List[Document]) -> str:
+    def generate_response(self, query: str, documents: List[Document], history: str = "") -> str:
         """Generate response using Gemini API"""
         context = self.format_context(documents)
         raw_response = self.gemini_client.generate_hr_response(
             context=context,
             query=query,
-            use_case=self.use_case
+            use_case=self.use_case,
+            history=history
         )
         # Remove hallucinated (Source: ...) refs from model output
-        cleaned_response = re.sub(r"\(Source:.*?\)", "", raw_response).strip()
+        cleaned_response = _SOURCE_REF.sub("", raw_response).strip()
         return cleaned_response
+
+    def stream_response(self, query: str, documents: List[Document],
+                        history: str = "") -> Iterator[str]:
+        """Stream the Gemini response, dropping (Source: ...) refs on the fly"""
+        context = self.format_context(documents)
+        source_filter = SourceRefFilter()
+        for chunk in self.gemini_client.stream_hr_response(
+            context=context,
+            query=query,
+            use_case=self.use_case,
+            history=history
+        ):
+            text = source_filter.feed(chunk)
+            if text:
+                yield text
+        tail = source_filter.flush()
+        if tail:
+            yield tail
+
+    def out_of_scope_response(self) -> str:
+        """Reply for queries this tool should not answer"""
+        return (
+            "I'm here to assist only with HR and company-related questions. "
+            "Topics like food, entertainment, or general inquiries are outside my scope. "
+            "Please ask about leave policy, reimbursements, holidays, org charts, or HR forms."
+        )
+    
+    def respond(self, query: str, query_vector: Optional[Sequence[float]] = None,
+                history: str = "", search_query: Optional[str] = None) -> str:
+        """Answer a query already routed to this tool.
+
+        For a follow-up, ``search_query`` (retrieval text that includes the
+        earlier question) and ``history`` (the conversation so far) are passed
+        by HRToolManager; ``query_vector`` is then the embedding of ``search_query``.
+        """
+        documents = self.retrieve_documents(search_query or query, query_vector=query_vector)
+        return self.generate_response(query, documents, history)
+
+    def respond_stream(self, query: str, query_vector: Optional[Sequence[float]] = None,
+                       history: str = "", search_query: Optional[str] = None) -> Iterator[str]:
+        """Streaming version of respond()"""
+        documents = self.retrieve_documents(search_query or query, query_vector=query_vector)
+        yield from self.stream_response(query, documents, history)
+
+    async def arespond_stream(self, query: str, query_vector: Optional[Sequence[float]] = None,
+                              executor: Optional[Executor] = None, history: str = "",
+                              search_query: Optional[str] = None) -> AsyncIterator[str]:
+        """Async streaming version of respond()"""
+        documents = await self.aretrieve_documents(
+            search_query or query, executor=executor, query_vector=query_vector
+        )
+        context = self.format_context(documents)
+        source_filter = SourceRefFilter()
+        async for chunk in self.gemini_client.astream_hr_response(
+            context=context,
+            query=query,
+            use_case=self.use_case,
+            history=history
+        ):
+            text = source_filter.feed(chunk)
+            if text:
+                yield text
+        tail = source_filter.flush()
+        if tail:
+            yield tail
     
     def run(self, query: str) -> str:
         """Main method to handle the query"""
         if not self.is_relevant_query(query):
-            return (
-                "I'm here to assist only with HR and company-related questions. "
-                "Topics like food, entertainment, or general inquiries are outside my scope. "
-                "Please ask about leave policy, reimbursements, holidays, org charts, or HR forms."
-            )
-        
-        documents = self.retrieve_documents(query)
-        return self.generate_response(query, documents)
+            return self.out_of_scope_response()
+
+        direct = self.direct_answer(query)
+        if direct is not None:
+            return direct
+        return self.respond(query)
+
+    def run_stream(self, query: str) -> Iterator[str]:
+        """Streaming version of run()"""
+        if not self.is_relevant_query(query):
+            yield self.out_of_scope_response()
+            return
+
+        direct = self.direct_answer(query)
+        if direct is not None:
+            yield direct
+            return
+        yield from self.respond_stream(query)
+
+    async def arun_stream(self, query: str, executor: Optional[Executor] = None) -> AsyncIterator[str]:
+        """Async streaming version of run()"""
+        if not self.is_relevant_query(query):
+            yield self.out_of_scope_response()
+            return
+
+        direct = self.direct_answer(query)
+        if direct is not None:
+            yield direct
+            return
+        async for chunk in self.arespond_stream(query, executor=executor):
+            yield chunk
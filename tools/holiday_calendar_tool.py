@@ -1,21 +1,214 @@
-from typing import List
-from langchain_core.documents import Document
+import calendar
+import datetime as dt
+import re
+from typing import List, Optional, Tuple
+from utils.holiday_calendar import Holiday, HolidayCalendar
 from .base_tool import BaseHRTool
 
+_MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+_MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+_MONTHS["sept"] = 9
+_MONTH = "(" + "|".join(sorted(_MONTHS, key=len, reverse=True)) + ")"
+_WEEKDAYS = {name.lower(): i for i, name in enumerate(calendar.day_name)}
+_NUMBERS = {"two": 2, "three": 3, "four": 4, "five": 5}
+
+
 class HolidayCalendarTool(BaseHRTool):
     """Tool for handling holiday calendar queries"""
-    
-    def __init__(self, vector_db):
-        super().__init__(vector_db)
+
+    ISO_DATE = re.compile(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b")
+    NUMERIC_DATE = re.compile(r"\b(\d{1,2})[/.](\d{1,2})[/.](\d{4})\b")  # day first
+    DAY_MONTH = re.compile(rf"\b(\d{{1,2}})(?:st|nd|rd|th)?\s+(?:of\s+)?{_MONTH}\b(?:,?\s+(\d{{4}}))?")
+    MONTH_DAY = re.compile(rf"\b{_MONTH}\s+(\d{{1,2}})(?:st|nd|rd|th)?\b(?:,?\s+(\d{{4}}))?")
+    MONTH = re.compile(rf"\b(in|of|for|during)?\s*{_MONTH}\b(?:\s+(\d{{4}}))?")
+    RELATIVE_DAY = re.compile(r"\b(today|tomorrow)\b|\b(?:is|on|this|next|coming)\s+(" + "|".join(_WEEKDAYS) + r")\b")
+    RELATIVE_MONTH = re.compile(r"\b(this|next)\s+month\b")
+    _KIND = r"(?:(?:public|company|bank|national|office)\s+)?"
+    NEXT = re.compile(
+        r"\b(?:next|upcoming|coming)\s+(?:(\d+|two|three|four|five)\s+)?" + _KIND + r"(?:holidays?|days?\s+off)\b"
+        r"|\bholidays?\s+(?:are\s+|is\s+)?(?:coming\s+up|upcoming)\b"
+    )
+    LIST = re.compile(
+        r"\bholiday\s+(?:list|calendar|schedule)\b"
+        r"|\b(?:list|calendar|schedule)\s+of\s+(?:\w+\s+){0,2}holidays\b"
+        r"|\b(?:all|full|entire|complete|show(?:\s+me)?|how\s+many|which|what)\s+(?:(?:the|our|of|company|public|bank)\s+)*holidays\b"
+    )
+    # Leave and policy questions that merely mention a holiday belong to retrieval
+    POLICY = re.compile(
+        r"\b(?:leaves?|sick|carry|carried|encash\w*|claim\w*|reimburs\w*|polic(?:y|ies)|allowance"
+        r"|salary|overtime|compensat\w*|comp[- ]off|apply|approv\w*|entitle\w*|eligib\w*)\b"
+    )
+    YEAR = re.compile(r"\b(20\d{2})\b")
+
+    HEADER = "Detected Use Case: Holiday Calendar\n"
+    LINE = "- {name}: {date}{details}"
+    SOURCE = "\nSource: {sources}"
+
+    def __init__(self, vector_db, gemini_client=None):
+        super().__init__(vector_db, gemini_client)
         self.tool_name = "holiday_calendar_tool"
         self.description = "Handles queries about company holidays and calendar"
+        self.category = "holiday"
         self.use_case = "Holiday Calendar"
         self.keywords = [
             "holiday", "calendar", "public holiday", "company holiday",
             "day off", "holiday schedule", "holiday list", "festival"
         ]
-    
+        self.exemplars = [
+            "Show me the holiday list for this year",
+            "When is the next public holiday?",
+            "Is Diwali a company holiday?",
+            "Which days is the office closed in December?",
+            "What holidays do we have in March?",
+            "Give me the company holiday calendar",
+            "Is Friday a holiday?"
+        ]
+        self.calendar: Optional[HolidayCalendar] = None  # structured store set by HRToolManager
+
     def is_relevant_query(self, query: str) -> bool:
         """Check if query is about holidays"""
-        query_lower = query.lower()
-        return any(keyword in query_lower for keyword in self.keywords)
\ No newline at end of file
+        return self.matches_keywords(query)
+
+    def direct_answer(self, query: str, today: Optional[dt.date] = None) -> Optional[str]:
+        """Answer date, month, "next" and list questions from the calendar store.
+
+        Returns None (so the query goes through retrieval and Gemini) when
+        there is no calendar, the question is not one of those lookups, or
+        it is a leave/policy question that only mentions a holiday.
+        """
+        if self.calendar is None or not len(self.calendar):
+            return None
+        named = self.calendar.named_in(query)
+        if not named and not self.matches_keywords(query):
+            return None
+        today = today or dt.date.today()
+        text = query.lower()
+        if self.POLICY.search(text):
+            return None
+
+        day = self._parse_day(text, today)
+        if day is not None:
+            return self._answer_day(day)
+        if named:
+            return self._answer_named(named, today)
+        month = self._parse_month(text, today)
+        if month is not None:
+            return self._answer_month(*month)
+        upcoming = self.NEXT.search(text)
+        if upcoming:
+            count = upcoming.group(1)
+            count = int(_NUMBERS.get(count, count)) if count else 1
+            return self._answer_upcoming(today, count)
+        listing = self.LIST.search(text)
+        year = self.YEAR.search(text)
+        if listing or (year and "holidays" in text):
+            return self._answer_year(int(year.group(1)) if year else self.calendar.default_year(today))
+        return None
+
+    def _parse_day(self, text: str, today: dt.date) -> Optional[dt.date]:
+        """A single date named in the question, if any"""
+        try:
+            match = self.ISO_DATE.search(text)
+            if match:
+                return dt.date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+            match = self.NUMERIC_DATE.search(text)
+            if match:
+                return dt.date(int(match.group(3)), int(match.group(2)), int(match.group(1)))
+            match = self.DAY_MONTH.search(text)
+            if match:
+                return self._date(match.group(3), _MONTHS[match.group(2)], match.group(1), today)
+            match = self.MONTH_DAY.search(text)
+            if match:
+                return self._date(match.group(3), _MONTHS[match.group(1)], match.group(2), today)
+        except ValueError:
+            return None  # e.g. 31 February
+        match = self.RELATIVE_DAY.search(text)
+        if match:
+            word = match.group(1) or match.group(2)
+            if word == "today":
+                return today
+            if word == "tomorrow":
+                return today + dt.timedelta(days=1)
+            return today + dt.timedelta(days=(_WEEKDAYS[word] - today.weekday()) % 7)
+        return None
+
+    def _date(self, year: Optional[str], month: int, day: str, today: dt.date) -> dt.date:
+        return dt.date(int(year) if year else self.calendar.default_year(today), month, int(day))
+
+    def _parse_month(self, text: str, today: dt.date) -> Optional[Tuple[int, int]]:
+        """(year, month) the question asks about, if any"""
+        match = self.RELATIVE_MONTH.search(text)
+        if match:
+            if match.group(1) == "this":
+                return today.year, today.month
+            return today.year + today.month // 12, today.month % 12 + 1
+        for match in self.MONTH.finditer(text):
+            preposition, name, year = match.groups()
+            # "may" is only a month when it reads like one ("in May", "May 2025")
+            if name == "may" and not (preposition or year):
+                continue
+            if year is None:
+                other = self.YEAR.search(text)
+                year = other.group(1) if other else None
+            return int(year) if year else self.calendar.default_year(today), _MONTHS[name]
+        return None
+
+    def _format(self, holidays: List[Holiday]) -> str:
+        lines = []
+        for holiday in holidays:
+            details = ", ".join(f"{column}: {value}" for column, value in holiday.details.items())
+            lines.append(self.LINE.format(
+                name=holiday.name,
+                date=self._day_label(holiday.date),
+                details=f" ({details})" if details else ""
+            ))
+        return "\n".join(lines)
+
+    @staticmethod
+    def _day_label(day: dt.date) -> str:
+        return f"{day:%A}, {day.day} {day:%B %Y}"
+
+    def _reply(self, text: str, holidays: List[Holiday]) -> str:
+        sources = HolidayCalendar.source_names(holidays)
+        return self.HEADER + text + (self.SOURCE.format(sources=sources) if sources else "")
+
+    def _answer_day(self, day: dt.date) -> str:
+        found = self.calendar.on(day)
+        if found:
+            return self._reply(f"Yes, {self._day_label(day)} is a company holiday:\n{self._format(found)}", found)
+        text = f"No, {self._day_label(day)} is not a company holiday."
+        following = self.calendar.upcoming(day + dt.timedelta(days=1))
+        if following:
+            text += f"\nThe next holiday after that is:\n{self._format(following)}"
+        return self._reply(text, following)
+
+    def _answer_named(self, holidays: List[Holiday], today: dt.date) -> str:
+        # Prefer upcoming occurrences when the calendar spans several years
+        upcoming = [h for h in holidays if h.date >= today] or holidays
+        names = " and ".join(sorted({h.name for h in upcoming}))
+        return self._reply(f"{names} is on the company holiday calendar:\n{self._format(upcoming)}", upcoming)
+
+    def _answer_month(self, year: int, month: int) -> str:
+        found = self.calendar.in_month(year, month)
+        label = f"{calendar.month_name[month]} {year}"
+        if not found:
+            return self._reply(f"There are no company holidays in {label}.", found)
+        return self._reply(f"Company holidays in {label}:\n{self._format(found)}", found)
+
+    def _answer_upcoming(self, today: dt.date, count: int) -> str:
+        found = self.calendar.upcoming(today, count)
+        if not found:
+            return self._reply(f"There are no more company holidays in the calendar after "
+                               f"{self._day_label(today)}.", found)
+        if len(found) == 1:
+            days = (found[0].date - today).days
+            when = "today" if days == 0 else "tomorrow" if days == 1 else f"in {days} days"
+            return self._reply(f"The next company holiday is {when}:\n{self._format(found)}", found)
+        return self._reply(f"The next {len(found)} company holidays are:\n{self._format(found)}", found)
+
+    def _answer_year(self, year: int) -> str:
+        found = self.calendar.in_year(year)
+        if not found:
+            return self._reply(f"The holiday calendar has no entries for {year}.", found)
+        return self._reply(f"Company holidays for {year} ({len(found)} in total):\n"
+                           f"{self._format(found)}", found)
@@ -1,33 +1,209 @@
-from typing import List
-from langchain_core.documents import Document
+import re
+from typing import List, Optional
+from utils.org_graph import OrgGraph
 from .base_tool import BaseHRTool
 
 class OrgChartTool(BaseHRTool):
     """Tool for handling organization structure queries"""
-    
-    def __init__(self, vector_db):
-        super().__init__(vector_db)
+
+    # Reporting-line questions answered from the org graph; anything else
+    # (e.g. "summarize the structure of sales") still goes to Gemini
+    SUMMARY = re.compile(r"\b(?:summar\w*|describe|explain|overview|why)\b")
+    SKIP_LEVEL = re.compile(r"\bskip[\s-]*level\b")
+    CHAIN = re.compile(r"\b(?:chain of command|reporting (?:line|chain)|management chain|up the chain|hierarchy above)\b")
+    ALL_REPORTS = re.compile(r"\b(?:everyone|everybody|all|entire|whole|total|indirect\w*|how many)\b")
+    REPORTS = re.compile(r"\b(?:direct reports?|reportees|subordinates|team|reports|under|below|manages|managed by|leads)\b")
+    MANAGER = re.compile(r"\b(?:manager|boss|supervisor|line manager|report(?:s|ing)? (?:in)?to)\b")
+    REPORTS_TO_NAME = re.compile(r"\b(?:report(?:s|ing)? (?:in)?to|under|below|managed by|working for|work for)\s*$")
+    HEAD = re.compile(r"\b(?:head|heads|headed|leads?|in charge|runs|manages)\b")
+    ROSTER = re.compile(
+        r"\b(?:who (?:works?|is|are)|members? of|roster|(?:all|everyone|everybody) in"
+        r"|list (?:all |the )?(?:employees|people|members|staff)"
+        r"|how many (?:people|employees|staff|members))\b"
+    )
+    WHO = re.compile(r"\b(?:who(?:'s| is| are| was)|tell me about|list|show)\b")
+    PROFILE = re.compile(r"\b(?:who(?:'s| is| was)|tell me about|designation|role|position|title|employee id|profile)\b")
+    # Policy questions that happen to name a person, role or department
+    # ("the travel limit for an Engineer") belong to retrieval
+    POLICY = re.compile(
+        r"\b(?:leaves?|maternity|paternity|sick|holidays?|travel|reimburs\w*|claims?|expenses?"
+        r"|allowances?|limits?|forms?|polic(?:y|ies)|salary|payroll|bonus\w*|benefits?|insurance"
+        r"|approv\w*|allowed|eligib\w*|entitle\w*|apply|submit\w*)\b"
+    )
+
+    HEADER = "Detected Use Case: Org Chart\n"
+    MAX_LISTED = 50
+
+    def __init__(self, vector_db, gemini_client=None):
+        super().__init__(vector_db, gemini_client)
         self.tool_name = "org_chart_tool"
         self.description = "Handles queries about organizational structure and reporting"
+        self.category = "org_chart"
+        self.use_case = "Org Chart"
         self.keywords = [
             "org chart", "organization", "structure", "reporting",
             "manager", "team lead", "department", "hierarchy",
             "who reports to", "reporting structure", "organization chart"
         ]
-    
+        self.exemplars = [
+            "Who is my manager?",
+            "Who reports to the head of engineering?",
+            "Show me the organization chart",
+            "Who is the head of the finance department?",
+            "What is the reporting structure of the sales team?",
+            "Who are the team leads in HR?"
+        ]
+        self.graph: Optional[OrgGraph] = None  # reporting-line graph set by HRToolManager
+
     def is_relevant_query(self, query: str) -> bool:
         """Check if query is about org structure"""
-        query_lower = query.lower()
-        return any(keyword in query_lower for keyword in self.keywords)
-    
-    def process_query(self, query: str, documents: List[Document]) -> str:
-        """Process org chart queries"""
-        response = "Here's information about our organizational structure:\n\n"
-        
-        # Handle specific position queries
-        if "who is" in query.lower() or "who's the" in query.lower():
-            response = "Regarding specific positions:\n\n"
-        elif "report" in query.lower() or "reporting" in query.lower():
-            response = "Regarding reporting structure:\n\n"
-        
-        return response + self.format_response(documents)
\ No newline at end of file
+        return self.matches_keywords(query)
+
+    def direct_answer(self, query: str) -> Optional[str]:
+        """Answer manager, report, skip-level, chain and roster questions from the graph.
+
+        Returns None (so the query goes through retrieval and Gemini) when
+        there is no graph, the question asks for a summary or is about a
+        policy, or it does not ask about a person or the org structure the
+        graph knows.
+        """
+        if self.graph is None or not len(self.graph):
+            return None
+        text = " ".join(query.lower().split())
+        if self.SUMMARY.search(text) or self.POLICY.search(text):
+            return None
+        people, designations, departments = self.graph.find(query)
+        # Employee names and designations are specific enough on their own; a
+        # department name ("Finance") is not, unless the question is org-shaped
+        if not (people or designations or self.matches_keywords(query) or self.HEAD.search(text)):
+            return None
+        if not people and designations:
+            # "Who does the CEO report to?" - a unique designation names a person
+            holders = self.graph.with_designation(designations[0])
+            if len(holders) == 1 and (self.MANAGER.search(text) or self.REPORTS.search(text)
+                                      or self.SKIP_LEVEL.search(text) or self.CHAIN.search(text)):
+                people = [holders]
+        if people:
+            answer = self._answer_person(text, people)
+        elif designations:
+            answer = self._answer_designation(text, designations[0], departments)
+        elif departments:
+            answer = self._answer_department(text, departments[0])
+        else:
+            return None
+        return None if answer is None else self.HEADER + answer
+
+    def _answer_person(self, text: str, people: List[List[int]]) -> Optional[str]:
+        graph = self.graph
+        if len(people) >= 2 and "report" in text:
+            employee, manager = people[0][0], people[1][0]
+            if graph.reports_to(employee, manager):
+                line = "directly" if graph.manager(employee) == manager else "indirectly"
+                return f"Yes, {self._label(employee)} reports {line} to {self._label(manager)}."
+            if graph.reports_to(manager, employee):
+                return (f"No, it is the other way round: {self._label(manager)} "
+                        f"reports to {self._label(employee)}.")
+            return f"No, {self._label(employee)} does not report to {self._label(manager)}."
+
+        answers = []
+        for i in people[0]:
+            answer = self._answer_one(text, i)
+            if answer is None:
+                return None
+            answers.append(answer)
+        return "\n\n".join(answers)
+
+    def _answer_one(self, text: str, i: int) -> Optional[str]:
+        graph = self.graph
+        name = graph.names[i]
+        before_name = text[:text.find(name.lower())] if name.lower() in text else ""
+        asks_reports = bool(self.REPORTS_TO_NAME.search(before_name)) or (
+            bool(self.REPORTS.search(text)) and not self.MANAGER.search(text))
+
+        if self.SKIP_LEVEL.search(text):
+            if asks_reports:
+                return self._listing(f"Skip-level reports of {self._label(i)}",
+                                     graph.skip_level_reports(i), f"{name} has no skip-level reports.")
+            chain = graph.chain(i)
+            if len(chain) < 2:
+                return f"{self._label(i)} has no skip-level manager."
+            return f"The skip-level manager of {self._label(i)} is {self._label(chain[1])}."
+        if self.CHAIN.search(text):
+            chain = graph.chain(i)
+            if not chain:
+                return f"{self._label(i)} is at the top of the organization."
+            steps = "\n".join(f"{level}. {self._label(m)}"
+                              for level, m in enumerate(chain[:self.MAX_LISTED], 1))
+            if len(chain) > self.MAX_LISTED:
+                steps += f"\n...and {len(chain) - self.MAX_LISTED} more levels"
+            return f"Reporting line of {self._label(i)}, from the direct manager up:\n{steps}"
+        if asks_reports:
+            if self.ALL_REPORTS.search(text):
+                return self._listing(f"Everyone in the reporting line under {self._label(i)}",
+                                     graph.all_reports(i), f"{name} has no reports.")
+            return self._listing(f"Direct reports of {self._label(i)}", graph.direct_reports(i),
+                                 f"{name} has no direct reports.")
+        if self.MANAGER.search(text):
+            manager = graph.manager(i)
+            if manager is None:
+                return f"{self._label(i)} is at the top of the organization and has no manager."
+            return f"{name}'s manager is {self._label(manager)}."
+        if self.PROFILE.search(text):
+            return self._profile(i)
+        return None
+
+    def _answer_designation(self, text: str, designation: str, departments: List[int]) -> Optional[str]:
+        if not self.WHO.search(text):
+            return None
+        holders = self.graph.with_designation(designation)
+        if departments:
+            in_department = [i for i in holders if self.graph.department_codes[i] in departments]
+            holders = in_department or holders
+        if len(holders) == 1:
+            return self._profile(holders[0])
+        return self._listing(f"Employees with the designation {self.graph.designations[holders[0]]}",
+                             holders, "")
+
+    def _answer_department(self, text: str, code: int) -> Optional[str]:
+        graph = self.graph
+        department = graph.department_names[code]
+        # A department's "manager" is its head, not its roster
+        if self.HEAD.search(text) or self.MANAGER.search(text):
+            heads = graph.department_heads(code)
+            if not heads:
+                return f"{department} has no employees in the org chart."
+            return "\n".join(f"{department} is headed by {self._label(i)}." for i in heads)
+        if self.ROSTER.search(text):
+            return self._listing(f"Members of {department}, most senior first",
+                                 graph.department_members(code),
+                                 f"{department} has no employees in the org chart.")
+        return None
+
+    def _label(self, i: int) -> str:
+        """Name with designation and department, e.g. "Chen Li (Engineering Manager, Engineering)" """
+        graph = self.graph
+        details = ", ".join(part for part in (graph.designations[i], graph.department(i)) if part)
+        return f"{graph.names[i]} ({details})" if details else graph.names[i]
+
+    def _profile(self, i: int) -> str:
+        graph = self.graph
+        manager = graph.manager(i)
+        lines = [f"{graph.names[i]}"]
+        if graph.designations[i]:
+            lines.append(f"- Designation: {graph.designations[i]}")
+        if graph.department(i):
+            lines.append(f"- Department: {graph.department(i)}")
+        if graph.employee_ids[i]:
+            lines.append(f"- Employee ID: {graph.employee_ids[i]}")
+        lines.append(f"- Manager: {self._label(manager) if manager is not None else 'none (top of the organization)'}")
+        lines.append(f"- Direct reports: {len(graph.direct_reports(i))}, "
+                     f"total reporting line: {graph.report_count(i)}")
+        return "\n".join(lines)
+
+    def _listing(self, title: str, employees: List[int], empty: str) -> str:
+        if not employees:
+            return empty
+        lines = [f"- {self._label(i)}" for i in employees[:self.MAX_LISTED]]
+        if len(employees) > self.MAX_LISTED:
+            lines.append(f"...and {len(employees) - self.MAX_LISTED} more")
+        return f"{title} ({len(employees)}):\n" + "\n".join(lines)
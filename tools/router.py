@@ -0,0 +1,88 @@
+import copy
+import os
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from utils import metrics
+
+
+def default_min_score() -> float:
+    """Router threshold (HR_ROUTER_MIN_SCORE, default 0.55); calibrate with benchmarks/routing.py"""
+    return float(os.getenv("HR_ROUTER_MIN_SCORE", "0.55"))
+
+
+class ToolRouter:
+    """Routes a query to a tool with one matrix product over exemplar embeddings.
+
+    Every tool's ``exemplars`` (typical questions it should answer) are
+    embedded once at startup into a single normalised matrix. A query vector
+    is scored against all exemplars at once and each tool takes the score of
+    its closest exemplar; the best tool wins if it clears ``min_score``.
+    Exemplars are embedded as queries, not documents, so they live in the
+    same space as the query vectors they are compared with.
+    """
+
+    def __init__(self, tools: Sequence[Any], exemplar_vectors: np.ndarray,
+                 exemplar_owner: np.ndarray, min_score: Optional[float] = None):
+        self.tools = list(tools)
+        self.min_score = default_min_score() if min_score is None else min_score
+        norms = np.linalg.norm(exemplar_vectors, axis=1, keepdims=True)
+        self._matrix = (exemplar_vectors / np.where(norms == 0, 1, norms)).astype(np.float32)
+        # Exemplars are stored grouped by tool, so a per-tool max is one reduceat
+        order = np.argsort(exemplar_owner, kind="stable")
+        self._matrix = self._matrix[order]
+        owners = exemplar_owner[order]
+        self._group_starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+        self._group_tools = owners[self._group_starts]
+
+    @classmethod
+    def from_tools(cls, tools: Dict[str, Any], embeddings: Any,
+                   min_score: Optional[float] = None) -> Optional["ToolRouter"]:
+        """Embed every tool's exemplars in one call; None if that fails"""
+        tool_list = [tool for tool in tools.values() if getattr(tool, "exemplars", None)]
+        texts: List[str] = []
+        owner: List[int] = []
+        for index, tool in enumerate(tool_list):
+            for text in tool.exemplars:
+                texts.append(text)
+                owner.append(index)
+        if not texts or embeddings is None:
+            return None
+        try:
+            # Query task type (retrieval_query for Gemini), like the vectors route() receives
+            if hasattr(embeddings, "embed_queries"):
+                vectors = embeddings.embed_queries(texts)
+            else:
+                vectors = [embeddings.embed_query(text) for text in texts]
+            vectors = np.asarray(vectors, dtype=np.float32)
+        except Exception as e:
+            print(f"Error embedding router exemplars, using keyword routing: {str(e)}")
+            return None
+        return cls(tool_list, vectors, np.asarray(owner), min_score)
+
+    def with_tools(self, tools: Dict[str, Any]) -> "ToolRouter":
+        """Copy of this router (same exemplar matrix) routing to new tool objects"""
+        by_name = {tool.tool_name: tool for tool in tools.values()}
+        router = copy.copy(self)
+        router.tools = [by_name[tool.tool_name] for tool in self.tools]
+        return router
+
+    def scores(self, query_vector: Sequence[float]) -> Dict[str, float]:
+        """Best exemplar similarity for each tool"""
+        per_tool = self._score(query_vector)
+        return {self.tools[t].tool_name: float(s) for t, s in zip(self._group_tools, per_tool)}
+
+    def route(self, query_vector: Sequence[float]) -> Optional[Any]:
+        """Return the best tool for the query vector, or None below ``min_score``"""
+        with metrics.span("route"):
+            per_tool = self._score(query_vector)
+            best = int(np.argmax(per_tool))
+            if per_tool[best] < self.min_score:
+                return None
+            return self.tools[self._group_tools[best]]
+
+    def _score(self, query_vector: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(query_vector, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        if norm:
+            vector = vector / norm
+        return np.maximum.reduceat(self._matrix @ vector, self._group_starts)
@@ -0,0 +1,206 @@
+import json
+import math
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+import faiss
+import numpy as np
+
+INDEX_KINDS = ("flat", "ivf-flat", "ivf-pq", "hnsw")
+NPROBE_CHOICES = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+EF_SEARCH_CHOICES = (16, 32, 64, 128, 256, 512, 1024)
+
+
+class IndexSpec:
+    """How to build the FAISS index: kind, structure and search parameters.
+
+    ``nprobe``/``ef_search`` left as None are tuned at build time: the
+    smallest value whose recall@k against the exact flat search reaches
+    ``target_recall`` is saved with the index.
+    """
+
+    def __init__(self, kind: str = "flat", nlist: Optional[int] = None,
+                 pq_m: Optional[int] = None, hnsw_m: int = 32,
+                 nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                 train_sample: int = 100000, target_recall: float = 0.95,
+                 eval_queries: int = 200, k: int = 10, min_size: int = 10000,
+                 seed: int = 0):
+        if kind not in INDEX_KINDS:
+            raise ValueError(f"Unknown index kind '{kind}', expected one of {', '.join(INDEX_KINDS)}")
+        self.kind = kind
+        self.nlist = nlist
+        self.pq_m = pq_m
+        self.hnsw_m = hnsw_m
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.train_sample = train_sample
+        self.target_recall = target_recall
+        self.eval_queries = eval_queries
+        self.k = k
+        self.min_size = min_size  # below this many vectors an exact scan is used
+        self.seed = seed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IndexSpec":
+        known = cls().to_dict()
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+    def factory_string(self, n: int, d: int) -> str:
+        """faiss.index_factory description for ``n`` vectors of dimension ``d``"""
+        if self.kind == "hnsw":
+            return f"HNSW{self.hnsw_m},Flat"
+        nlist = self.nlist or max(1, min(int(4 * math.sqrt(n)), n // 39))
+        if self.kind == "ivf-flat":
+            return f"IVF{nlist},Flat"
+        if self.kind == "ivf-pq":
+            return f"IVF{nlist},PQ{self.pq_m or _pq_subquantizers(d)}"
+        return "Flat"
+
+
+def _pq_subquantizers(d: int) -> int:
+    # Largest divisor of d with at least 4 dims per sub-quantizer, at most 64 bytes per vector
+    return max(m for m in range(1, min(d // 4, 64) + 1) if d % m == 0) if d >= 4 else 1
+
+
+def _sample(vectors: np.ndarray, size: int, seed: int) -> np.ndarray:
+    if len(vectors) <= size:
+        return vectors
+    rng = np.random.default_rng(seed)
+    return vectors[np.sort(rng.choice(len(vectors), size, replace=False))]
+
+
+def apply_search_params(index: Any, params: Dict[str, Any]) -> None:
+    """Set nprobe / efSearch on an index that supports them"""
+    if params.get("nprobe"):
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            ivf.nprobe = int(params["nprobe"])
+    if params.get("ef_search") and hasattr(index, "hnsw"):
+        index.hnsw.efSearch = int(params["ef_search"])
+
+
+def to_flat(index: Any) -> Any:
+    """Exact flat copy of any index (IVF-PQ vectors come back PQ-decoded)"""
+    if isinstance(index, faiss.IndexFlat):
+        return index
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.make_direct_map()
+    flat = faiss.IndexFlat(index.d, index.metric_type)
+    if index.ntotal:
+        flat.add(index.reconstruct_n(0, index.ntotal))
+    return flat
+
+
+def _timed_search(index: Any, queries: np.ndarray, k: int) -> Tuple[np.ndarray, Dict[str, float]]:
+    """Search one query at a time (as the app does) and report per-query latency"""
+    results = np.empty((len(queries), k), dtype=np.int64)
+    samples = []
+    for i, query in enumerate(queries):
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        samples.append(time.perf_counter() - start)
+        results[i] = ids[0]
+    samples.sort()
+    return results, {
+        "mean_ms": sum(samples) / len(samples) * 1000,
+        "p95_ms": samples[min(len(samples) - 1, int(0.95 * len(samples)))] * 1000,
+    }
+
+
+def _recall(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f[f >= 0]) & set(t[t >= 0])) for f, t in zip(found, truth))
+    return hits / max(1, int((truth >= 0).sum()))
+
+
+def build_ann_index(flat: Any, spec: IndexSpec) -> Tuple[Any, Dict[str, Any]]:
+    """Build ``spec`` from the vectors of an exact flat index.
+
+    Trains on a random sample, adds every vector in the original order (so
+    FAISS positions and docstore ids still line up), tunes nprobe/efSearch
+    unless given, and measures recall@k and per-query latency against the
+    flat baseline using indexed vectors as queries. Returns the index and
+    its saved parameters, report included.
+    """
+    n, d = flat.ntotal, flat.d
+    if spec.kind == "flat" or n < spec.min_size:
+        return flat, {"kind": "flat", "factory": "Flat", "spec": spec.to_dict()}
+
+    vectors = flat.reconstruct_n(0, n)
+    factory = spec.factory_string(n, d)
+    index = faiss.index_factory(d, factory, flat.metric_type)
+    start = time.perf_counter()
+    if not index.is_trained:
+        ivf = faiss.try_extract_index_ivf(index)
+        # k-means wants ~39 points per centroid
+        sample_size = max(spec.train_sample, 39 * ivf.nlist if ivf is not None else 0)
+        index.train(_sample(vectors, sample_size, spec.seed))
+    index.add(vectors)
+    build_seconds = time.perf_counter() - start
+
+    k = min(spec.k, n)
+    queries = _sample(vectors, spec.eval_queries, spec.seed + 1)
+    truth, flat_latency = _timed_search(flat, queries, k)
+
+    params: Dict[str, Any] = {"kind": spec.kind, "factory": factory, "spec": spec.to_dict()}
+    if spec.kind == "hnsw":
+        name, given, choices = "ef_search", spec.ef_search, EF_SEARCH_CHOICES
+    else:
+        nlist = faiss.extract_index_ivf(index).nlist
+        name, given = "nprobe", spec.nprobe
+        choices = tuple(c for c in NPROBE_CHOICES if c < nlist) + (nlist,)
+    best = None
+    for value in ([given] if given else choices):
+        params[name] = value
+        apply_search_params(index, params)
+        found, ann_latency = _timed_search(index, queries, k)
+        recall = _recall(found, truth)
+        if recall >= spec.target_recall:
+            break
+        # PQ caps recall below the target; stop once widening the search stops helping
+        if best is not None and recall < best[1] + 0.005:
+            params[name], recall, ann_latency = best
+            apply_search_params(index, params)
+            break
+        best = (value, recall, ann_latency)
+
+    params["report"] = {
+        "vectors": n,
+        "k": k,
+        "queries": len(queries),
+        f"recall_at_{k}": recall,
+        "flat": flat_latency,
+        "ann": ann_latency,
+        "speedup": flat_latency["mean_ms"] / ann_latency["mean_ms"] if ann_latency["mean_ms"] else None,
+        "train_and_add_seconds": build_seconds,
+        "bytes_flat": int(n * d * 4),
+        "bytes_ann": int(faiss.serialize_index(index).nbytes),
+    }
+    return index, params
+
+
+def print_report(params: Dict[str, Any], label: str = "index") -> None:
+    report = params.get("report")
+    if not report:
+        return
+    recall_key = next(key for key in report if key.startswith("recall_at_"))
+    tuning = ", ".join(f"{key}={params[key]}" for key in ("nprobe", "ef_search") if key in params)
+    print(f"✓ {label}: {params['factory']} ({tuning}) "
+          f"{recall_key.replace('_at_', '@')}={report[recall_key]:.3f}, "
+          f"{report['ann']['mean_ms']:.2f} ms/query vs {report['flat']['mean_ms']:.2f} ms flat, "
+          f"{report['bytes_ann'] / 1e6:.1f} MB vs {report['bytes_flat'] / 1e6:.1f} MB")
+
+
+def save_params(path: str, params: Dict[str, Any]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(params, f, indent=1)
+
+
+def load_params(path: str) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
@@ -0,0 +1,214 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import numpy as np
+
+
+class AnswerCache:
+    """Two-tier (exact + semantic) LRU/TTL cache for chatbot answers.
+
+    Tier one matches the normalized query text exactly. Tier two embeds the
+    query and returns the answer of the closest cached question when the
+    cosine similarity clears ``similarity_threshold``. Entries are tied to an
+    index version and dropped whenever that version changes.
+    """
+
+    _WHITESPACE = re.compile(r"\s+")
+    _PUNCTUATION = re.compile(r"[^\w\s-]")
+
+    def __init__(self, embeddings: Optional[Any] = None, max_entries: int = 512,
+                 ttl_seconds: float = 3600.0, similarity_threshold: float = 0.92,
+                 index_version: Optional[str] = None):
+        self.embeddings = embeddings
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.index_version = index_version
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._pending_vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._matrix: Optional[np.ndarray] = None
+        self._slot_keys: List[Optional[str]] = []
+        self._free_slots: List[int] = []
+
+    @classmethod
+    def normalize(cls, query: str) -> str:
+        """Lower-case, strip punctuation and collapse whitespace"""
+        text = cls._PUNCTUATION.sub(" ", query.lower())
+        return cls._WHITESPACE.sub(" ", text).strip()
+
+    def get(self, query: str, vector: Optional[np.ndarray] = None) -> Optional[str]:
+        """Return a cached answer for the query, or None on a miss"""
+        answer = self.lookup_exact(query)
+        if answer is not None:
+            return answer
+        if vector is None and (self.embeddings is None or not self._entries):
+            with self._lock:
+                self.misses += 1
+            return None
+        if vector is None:
+            vector = self._embed(query)
+        return self.lookup_similar(query, vector)
+
+    def lookup_exact(self, query: str) -> Optional[str]:
+        """Tier one: normalized-text match only (never embeds; misses are not counted)"""
+        key = self.normalize(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry):
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry["answer"]
+            if entry is not None:
+                self._evict(key)
+        return None
+
+    def lookup_similar(self, query: str, vector: np.ndarray) -> Optional[str]:
+        """Tier two: nearest cached question embedding above the threshold"""
+        key = self.normalize(query)
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            self._remember_vector(key, vector)
+            match = self._nearest(vector)
+            if match is not None:
+                self._entries.move_to_end(match)
+                self.semantic_hits += 1
+                return self._entries[match]["answer"]
+            self.misses += 1
+        return None
+
+    def record_skip(self) -> None:
+        """Count a request that missed the exact tier but never reached the semantic one"""
+        with self._lock:
+            self.skipped += 1
+
+    def lookup_fallback(self, query: str, threshold: float = 0.8) -> Optional[str]:
+        """Closest cached answer at a looser threshold, for when the LLM is unavailable.
+
+        Uses the vector remembered from this query's missed semantic lookup,
+        so it never embeds. Hit counters are not touched.
+        """
+        key = self.normalize(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry):
+                return entry["answer"]
+            vector = self._pending_vectors.get(key)
+            match = self._nearest(vector, threshold) if vector is not None else None
+            return self._entries[match]["answer"] if match is not None else None
+
+    def put(self, query: str, answer: str, vector: Optional[np.ndarray] = None,
+            embed: bool = True, index_version: Optional[str] = None) -> None:
+        """Store an answer under the query (and its embedding, if enabled).
+
+        With ``embed=False`` and no ``vector`` the entry is exact-match only.
+        An ``index_version`` that is no longer current means the answer was
+        built from a replaced index, so it is not stored.
+        """
+        if index_version is not None and index_version != self.index_version:
+            return
+        key = self.normalize(query)
+        if vector is None and embed and self.embeddings is not None:
+            with self._lock:
+                vector = self._pending_vectors.pop(key, None)
+            if vector is None:
+                vector = self._embed(query)
+        if vector is not None:
+            vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            if index_version is not None and index_version != self.index_version:
+                return
+            if key in self._entries:
+                self._evict(key)
+            while len(self._entries) >= self.max_entries:
+                self._evict(next(iter(self._entries)))
+            slot = self._store_vector(key, vector) if vector is not None else None
+            self._entries[key] = {"answer": answer, "created": time.monotonic(), "slot": slot}
+
+    def set_index_version(self, index_version: Optional[str]) -> None:
+        """Invalidate everything if the FAISS index version has changed"""
+        with self._lock:
+            if index_version != self.index_version:
+                self.index_version = index_version
+                self.clear()
+
+    def clear(self) -> None:
+        """Drop every cached answer (counters are kept)"""
+        with self._lock:
+            self._entries.clear()
+            self._pending_vectors.clear()
+            self._matrix = None
+            self._slot_keys = []
+            self._free_slots = []
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.exact_hits + self.semantic_hits + self.misses + self.skipped
+            hits = self.exact_hits + self.semantic_hits
+            return {
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "skipped": self.skipped,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "index_version": self.index_version,
+            }
+
+    def _embed(self, query: str) -> np.ndarray:
+        return np.asarray(self.embeddings.embed_query(query), dtype=np.float32)
+
+    def _expired(self, entry: Dict[str, Any]) -> bool:
+        return self.ttl_seconds is not None and time.monotonic() - entry["created"] > self.ttl_seconds
+
+    def _evict(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        slot = entry["slot"]
+        if slot is not None:
+            self._matrix[slot] = 0.0
+            self._slot_keys[slot] = None
+            self._free_slots.append(slot)
+
+    def _remember_vector(self, key: str, vector: np.ndarray) -> None:
+        # Keep the vector of a missed lookup so put() does not embed it again
+        self._pending_vectors[key] = vector
+        while len(self._pending_vectors) > 64:
+            self._pending_vectors.popitem(last=False)
+
+    def _store_vector(self, key: str, vector: np.ndarray) -> int:
+        norm = float(np.linalg.norm(vector))
+        unit = vector / norm if norm else vector
+        if self._matrix is None:
+            self._matrix = np.zeros((self.max_entries, unit.shape[0]), dtype=np.float32)
+            self._slot_keys = [None] * self.max_entries
+            self._free_slots = list(range(self.max_entries - 1, -1, -1))
+        slot = self._free_slots.pop()
+        self._matrix[slot] = unit
+        self._slot_keys[slot] = key
+        return slot
+
+    def _nearest(self, vector: np.ndarray, threshold: Optional[float] = None) -> Optional[str]:
+        threshold = self.similarity_threshold if threshold is None else threshold
+        if self._matrix is None:
+            return None
+        norm = float(np.linalg.norm(vector))
+        if not norm:
+            return None
+        scores = self._matrix @ (vector / norm)
+        # Expired entries may still be the best match; drop them and retry
+        while True:
+            slot = int(np.argmax(scores))
+            if scores[slot] < threshold:
+                return None
+            key = self._slot_keys[slot]
+            if not self._expired(self._entries[key]):
+                return key
+            self._evict(key)
+            scores[slot] = -1.0
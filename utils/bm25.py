@@ -0,0 +1,181 @@
+import re
+from array import array
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from utils.partitions import category_for_source
+
+_TOKEN = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me my of on or "
+    "the to was what when where which who whom why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens without stopwords"""
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    """Compact in-memory BM25 inverted index over the indexed chunks.
+
+    Postings are stored as flat numpy arrays (one slice per term), so the
+    whole index is a handful of arrays that save to a single ``.npz`` file
+    and load without pickle. Scoring only touches the postings of the
+    query's terms.
+    """
+
+    def __init__(self, terms: Sequence[str], offsets: np.ndarray, postings: np.ndarray,
+                 frequencies: np.ndarray, doc_lengths: np.ndarray,
+                 doc_ids: Sequence[str], categories: Sequence[str],
+                 k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_index: Dict[str, int] = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets
+        self.postings = postings
+        self.frequencies = frequencies
+        self.doc_lengths = doc_lengths
+        self.doc_ids = list(doc_ids)
+        self.categories = np.asarray(categories)
+        doc_count = len(self.doc_ids)
+        doc_freq = np.diff(offsets).astype(np.float32)
+        self.idf = np.log1p((doc_count - doc_freq + 0.5) / (doc_freq + 0.5)).astype(np.float32)
+        average = float(doc_lengths.mean()) if doc_count else 1.0
+        # Per-document BM25 length normalisation, precomputed once
+        self._norm = (k1 * (1 - b + b * doc_lengths / (average or 1.0))).astype(np.float32)
+
+    @classmethod
+    def build(cls, documents: Iterable[Tuple[str, str, Optional[str]]]) -> "BM25Index":
+        """Build from (doc_id, text, category) triples"""
+        doc_ids: List[str] = []
+        categories: List[str] = []
+        lengths: List[int] = []
+        # One (term, document, count) triple per posting in flat C int arrays;
+        # tuples in per-term lists cost several times the memory on large corpora
+        vocabulary: Dict[str, int] = {}
+        term_column, doc_column, count_column = array("i"), array("i"), array("i")
+        for position, (doc_id, text, category) in enumerate(documents):
+            tokens = tokenize(text)
+            doc_ids.append(doc_id)
+            categories.append(category or "")
+            lengths.append(len(tokens))
+            for term, count in Counter(tokens).items():
+                term_column.append(vocabulary.setdefault(term, len(vocabulary)))
+                doc_column.append(position)
+                count_column.append(count)
+
+        terms = sorted(vocabulary)
+        rank = np.empty(len(terms), dtype=np.int64)
+        rank[[vocabulary[term] for term in terms]] = np.arange(len(terms))
+        term_ranks = rank[np.frombuffer(term_column, dtype=np.int32)]
+        order = np.argsort(term_ranks, kind="stable")  # keeps each term's postings in document order
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ranks, minlength=len(terms)), out=offsets[1:])
+        docs = np.frombuffer(doc_column, dtype=np.int32)[order]
+        freqs = np.frombuffer(count_column, dtype=np.int32)[order].astype(np.float32)
+        return cls(terms, offsets, docs, freqs, np.asarray(lengths, dtype=np.float32),
+                   doc_ids, categories)
+
+    @classmethod
+    def from_vector_store(cls, db) -> "BM25Index":
+        """Build from every chunk in a LangChain FAISS store"""
+        return cls.from_documents((doc_id, db.docstore.search(doc_id))
+                                  for _, doc_id in sorted(db.index_to_docstore_id.items()))
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Tuple[str, Any]]) -> "BM25Index":
+        """Build from (doc_id, Document) pairs in FAISS position order"""
+        def rows():
+            for doc_id, doc in documents:
+                metadata = doc.metadata or {}
+                category = metadata.get("category") or category_for_source(metadata.get("source", ""))
+                yield doc_id, doc.page_content, category
+
+        return cls.build(rows())
+
+    def save(self, path: str) -> None:
+        """Write the index as one uncompressed .npz file"""
+        terms = sorted(self.term_index, key=self.term_index.get)
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                terms=np.asarray(terms, dtype=str),
+                offsets=self.offsets,
+                postings=self.postings,
+                frequencies=self.frequencies,
+                doc_lengths=self.doc_lengths,
+                doc_ids=np.asarray(self.doc_ids, dtype=str),
+                categories=np.asarray(self.categories, dtype=str),
+                params=np.asarray([self.k1, self.b], dtype=np.float32),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        """Load an index written by save()"""
+        with np.load(path, allow_pickle=False) as data:
+            k1, b = (float(x) for x in data["params"])
+            return cls(data["terms"].tolist(), data["offsets"], data["postings"],
+                       data["frequencies"], data["doc_lengths"], data["doc_ids"].tolist(),
+                       data["categories"].tolist(), k1=k1, b=b)
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def search(self, query: str, k: int = 10,
+               category: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Top-k (doc_id, score) pairs, optionally within one category"""
+        positions, scores = self._top(query, k, category)
+        return [(self.doc_ids[i], float(s)) for i, s in zip(positions, scores)]
+
+    def decisive_category(self, query: str) -> Optional[str]:
+        """Category of the best hit when lexical evidence alone is decisive"""
+        positions, scores = self._top(query, 2)
+        hits = [(self.doc_ids[i], float(s)) for i, s in zip(positions, scores)]
+        if not self.is_decisive(hits):
+            return None
+        return str(self.categories[positions[0]]) or None
+
+    def _top(self, query: str, k: int,
+             category: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        empty = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        scores: Optional[np.ndarray] = None
+        for term in set(tokenize(query)):
+            i = self.term_index.get(term)
+            if i is None:
+                continue
+            start, end = self.offsets[i], self.offsets[i + 1]
+            docs = self.postings[start:end]
+            tf = self.frequencies[start:end]
+            if scores is None:
+                scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+            scores[docs] += self.idf[i] * tf * (self.k1 + 1) / (tf + self._norm[docs])
+        if scores is None:
+            return empty
+        candidates = np.flatnonzero(scores)
+        if category is not None:
+            candidates = candidates[self.categories[candidates] == category]
+        if not len(candidates):
+            return empty
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return candidates, scores[candidates]
+
+    @staticmethod
+    def is_decisive(hits: Sequence[Tuple[str, float]], min_score: float = 4.0,
+                    margin: float = 2.0) -> bool:
+        """True when the best lexical hit clearly beats the runner-up"""
+        if not hits or hits[0][1] < min_score:
+            return False
+        return len(hits) == 1 or hits[0][1] >= margin * hits[1][1]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Sequence[str]], k: int = 60) -> List[str]:
+    """Merge ranked id lists; each id scores sum(1 / (k + rank))"""
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused, key=fused.get, reverse=True)
@@ -0,0 +1,209 @@
+import asyncio
+import os
+import threading
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional
+from langchain_core.embeddings import Embeddings
+from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+from utils.resilient_llm import Attempt, AttemptAbandoned, CircuitBreaker, ResilientLLM
+
+LLM_MODEL = "gemini-1.5-flash"
+EMBEDDING_MODEL = "models/embedding-001"
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read a positive integer setting from the environment"""
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a non-negative number setting from the environment"""
+    try:
+        return max(0.0, float(os.getenv(name, default)))
+    except ValueError:
+        return default
+
+
+class PooledLLM:
+    """Thread-safe handle on one shared chat model with a concurrency cap"""
+
+    takes_attempt = True  # ResilientLLM passes its Attempt so abandoned calls free their slot
+
+    def __init__(self, llm: Any, max_concurrency: int):
+        self.llm = llm
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def _reserve(self, attempt: Optional[Attempt]) -> Callable[[], None]:
+        """Take a slot and return its release, which frees it only once.
+
+        With an ``attempt``, waiting stops if the attempt is abandoned, and
+        the slot is freed as soon as it is abandoned even though the
+        upstream call it was taken for may still be running.
+        """
+        if attempt is None:
+            self._slots.acquire()
+        else:
+            while not self._slots.acquire(timeout=0.05):
+                if attempt.abandoned:
+                    raise AttemptAbandoned("LLM attempt abandoned while waiting for a slot")
+        lock = threading.Lock()
+        held = True
+
+        def release() -> None:
+            nonlocal held
+            with lock:
+                if not held:
+                    return
+                held = False
+            self._slots.release()
+
+        if attempt is not None:
+            attempt.on_abandon(release)
+            if attempt.abandoned:
+                raise AttemptAbandoned("LLM attempt abandoned while waiting for a slot")
+        return release
+
+    def invoke(self, prompt: Any, attempt: Optional[Attempt] = None, **kwargs) -> Any:
+        """Run one generation, waiting for a free slot first"""
+        release = self._reserve(attempt)
+        try:
+            return self.llm.invoke(prompt, **kwargs)
+        finally:
+            release()
+
+    def stream(self, prompt: Any, attempt: Optional[Attempt] = None, **kwargs) -> Iterator[Any]:
+        """Stream one generation, holding a slot until the stream ends"""
+        release = self._reserve(attempt)
+        try:
+            for chunk in self.llm.stream(prompt, **kwargs):
+                yield chunk
+        finally:
+            release()
+
+    async def _acquire_slot(self) -> None:
+        """Wait for a slot in a worker thread so the event loop is not blocked"""
+        acquiring = asyncio.ensure_future(asyncio.to_thread(self._slots.acquire))
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # The thread will still get the slot; hand it straight back
+            acquiring.add_done_callback(lambda _: self._slots.release())
+            raise
+
+    async def ainvoke(self, prompt: Any, **kwargs) -> Any:
+        """Async invoke; waits for a slot without blocking the event loop"""
+        await self._acquire_slot()
+        try:
+            return await self.llm.ainvoke(prompt, **kwargs)
+        finally:
+            self._slots.release()
+
+    async def astream(self, prompt: Any, **kwargs) -> AsyncIterator[Any]:
+        """Async stream; holds a slot until the stream ends"""
+        await self._acquire_slot()
+        try:
+            async for chunk in self.llm.astream(prompt, **kwargs):
+                yield chunk
+        finally:
+            self._slots.release()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
+
+
+class PooledEmbeddings(Embeddings):
+    """Thread-safe handle on one shared embedding model with a concurrency cap"""
+
+    def __init__(self, embeddings: Embeddings, max_concurrency: int, model: str = EMBEDDING_MODEL):
+        self.embeddings = embeddings
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._slots:
+            return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        with self._slots:
+            return self.embeddings.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Query (not document) embeddings for many texts in one batched request"""
+        with self._slots:
+            if isinstance(self.embeddings, GoogleGenerativeAIEmbeddings):
+                return self.embeddings.embed_documents(texts, task_type="retrieval_query")
+            return [self.embeddings.embed_query(text) for text in texts]
+
+
+class ClientRegistry:
+    """Process-wide registry that hands out one LLM and one embedding client.
+
+    Every tool, the vector store and the scripts share the same underlying
+    Google clients, so their transport channel is opened once and kept alive
+    for the life of the process instead of once per tool. Concurrency limits
+    come from HR_LLM_MAX_CONCURRENCY and HR_EMBED_MAX_CONCURRENCY; the LLM's
+    deadline, retries, hedging and circuit breaker from HR_LLM_TIMEOUT,
+    HR_LLM_RETRIES, HR_LLM_HEDGE, HR_LLM_BREAKER_FAILURES and
+    HR_LLM_BREAKER_RESET; the size of the thread pool for blocking LLM calls
+    from HR_LLM_THREADS.
+    """
+
+    _lock = threading.Lock()
+    _llm: Optional[ResilientLLM] = None
+    _embeddings: Optional[PooledEmbeddings] = None
+
+    @classmethod
+    def get_llm(cls) -> ResilientLLM:
+        """Return the shared chat model, creating it on first use"""
+        if cls._llm is None:
+            with cls._lock:
+                if cls._llm is None:
+                    llm = ChatGoogleGenerativeAI(
+                        model=LLM_MODEL,
+                        temperature=0.3,
+                        top_p=0.85
+                    )
+                    cls._llm = ResilientLLM(
+                        PooledLLM(llm, _env_int("HR_LLM_MAX_CONCURRENCY", 8)),
+                        timeout=_env_float("HR_LLM_TIMEOUT", 30.0),
+                        max_retries=int(_env_float("HR_LLM_RETRIES", 2)),
+                        hedge=os.getenv("HR_LLM_HEDGE", "0") == "1",
+                        breaker=CircuitBreaker(
+                            failure_threshold=_env_int("HR_LLM_BREAKER_FAILURES", 5),
+                            reset_timeout=_env_float("HR_LLM_BREAKER_RESET", 30.0)
+                        )
+                    )
+        return cls._llm
+
+    @classmethod
+    def get_embeddings(cls) -> PooledEmbeddings:
+        """Return the shared embedding model, creating it on first use"""
+        if cls._embeddings is None:
+            with cls._lock:
+                if cls._embeddings is None:
+                    embeddings = GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL)
+                    cls._embeddings = PooledEmbeddings(
+                        embeddings, _env_int("HR_EMBED_MAX_CONCURRENCY", 8)
+                    )
+        return cls._embeddings
+
+    @classmethod
+    def reset(cls) -> None:
+        """Drop the shared clients (e.g. after the API key changes)"""
+        with cls._lock:
+            cls._llm = None
+            cls._embeddings = None
+
+
+def get_llm() -> ResilientLLM:
+    """Shortcut for ClientRegistry.get_llm()"""
+    return ClientRegistry.get_llm()
+
+
+def get_embeddings() -> PooledEmbeddings:
+    """Shortcut for ClientRegistry.get_embeddings()"""
+    return ClientRegistry.get_embeddings()
@@ -0,0 +1,161 @@
+import os
+import re
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Set, Tuple
+
+if TYPE_CHECKING:  # keeps langchain out of the login page's imports (utils.conversation)
+    from langchain_core.documents import Document
+
+_BRACKETS = re.compile(r"\[(.*?)\]")  # [Section titles]
+_PARENS = re.compile(r"\((.*?)\)")    # (section refs)
+_SENTENCE = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD = re.compile(r"\w+")
+_CHUNK_NUMBER = re.compile(r"#(\d+)$")
+
+
+def estimate_tokens(text: str, chars_per_token: float = 4.0) -> int:
+    """Rough token count (Gemini averages ~4 characters per token for English)"""
+    return int(len(text) / chars_per_token) + 1
+
+
+def default_token_budget() -> int:
+    """Prompt context budget in tokens (HR_CONTEXT_TOKENS, default 1500)"""
+    return int(os.getenv("HR_CONTEXT_TOKENS", "1500"))
+
+
+def clip_to_tokens(text: str, max_tokens: int, chars_per_token: float = 4.0,
+                   keep_end: bool = False) -> str:
+    """Cut text to roughly ``max_tokens``, at a sentence boundary where possible.
+
+    ``keep_end`` keeps the last part instead (e.g. the latest turns of a chat).
+    """
+    limit = int(max_tokens * chars_per_token)
+    if len(text) <= limit:
+        return text
+    if keep_end:
+        cut = text[-limit:]
+        boundary = cut.find("\n")
+        return cut[boundary + 1:].strip() if -1 < boundary < limit // 2 else "…" + cut.lstrip()
+    cut = text[:limit]
+    boundary = max(cut.rfind(". "), cut.rfind("\n"))
+    return cut[:boundary + 1].strip() if boundary > limit // 2 else cut.rstrip() + "…"
+
+
+def merge_overlap(first: str, second: str, min_overlap: int = 20, max_overlap: int = 400) -> Optional[str]:
+    """Join two chunks if the end of ``first`` repeats the start of ``second``.
+
+    Returns the merged text, ``first`` if it already contains ``second``,
+    or None if the chunks do not overlap.
+    """
+    if second in first:
+        return first
+    if len(second) < min_overlap:
+        return None
+    head = second[:min_overlap]
+    tail_start = max(0, len(first) - max_overlap)
+    at = first.find(head, tail_start)
+    while at != -1:
+        if second.startswith(first[at:]):
+            return first + second[len(first) - at:]
+        at = first.find(head, at + 1)
+    return None
+
+
+class ContextBuilder:
+    """Turns retrieved chunks into a compact, token-budgeted prompt context.
+
+    Chunks of the same source are put back in document order and merged
+    where the splitter's overlap repeats text, sentences already used are
+    dropped, passages that are near-duplicates of a kept one are skipped,
+    and the rest are packed best-first until ``max_tokens`` is reached.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, chars_per_token: float = 4.0,
+                 duplicate_threshold: float = 0.8, shingle_size: int = 5,
+                 min_passage_tokens: int = 40):
+        self.max_tokens = max_tokens or default_token_budget()
+        self.chars_per_token = chars_per_token
+        self.duplicate_threshold = duplicate_threshold
+        self.shingle_size = shingle_size
+        self.min_passage_tokens = min_passage_tokens
+
+    def build(self, documents: Sequence["Document"]) -> str:
+        """Context string for the documents, best-ranked first"""
+        passages = []
+        seen_sentences: Set[str] = set()
+        kept_shingles: List[Set[Tuple[str, ...]]] = []
+        budget = self.max_tokens
+        for text in self._merge(documents):
+            text = self._drop_seen_sentences(self.clean(text), seen_sentences)
+            if not text:
+                continue
+            shingles = self._shingles(text)
+            if any(self._similarity(shingles, kept) >= self.duplicate_threshold for kept in kept_shingles):
+                continue
+            tokens = estimate_tokens(text, self.chars_per_token)
+            if tokens > budget:
+                if budget < self.min_passage_tokens:
+                    break
+                text = clip_to_tokens(text, budget, self.chars_per_token)
+                tokens = estimate_tokens(text, self.chars_per_token)
+            passages.append(text)
+            kept_shingles.append(shingles)
+            budget -= tokens
+            if budget <= 0:
+                break
+        return "\n".join(passages)
+
+    @staticmethod
+    def clean(text: str) -> str:
+        """Remove bracketed or parenthetical section references"""
+        return _PARENS.sub("", _BRACKETS.sub("", text)).strip()
+
+    def _merge(self, documents: Sequence["Document"]) -> List[str]:
+        """One passage per run of overlapping/adjacent chunks, ordered by best rank"""
+        groups: Dict[str, List[Tuple[int, int, str]]] = {}
+        for rank, doc in enumerate(documents):
+            source = doc.metadata.get("source", "") if doc.metadata else ""
+            match = _CHUNK_NUMBER.search(doc.id or "")
+            number = int(match.group(1)) if match else rank
+            groups.setdefault(source or f"#{rank}", []).append((number, rank, doc.page_content))
+
+        passages: List[Tuple[int, str]] = []
+        for chunks in groups.values():
+            chunks.sort()
+            number, best_rank, text = chunks[0]
+            for next_number, rank, next_text in chunks[1:]:
+                merged = merge_overlap(text, next_text)
+                if merged is None and next_number == number + 1:
+                    merged = text + "\n" + next_text
+                if merged is None:
+                    passages.append((best_rank, text))
+                    best_rank, text = rank, next_text
+                else:
+                    best_rank, text = min(best_rank, rank), merged
+                number = next_number
+            passages.append((best_rank, text))
+        return [text for _, text in sorted(passages, key=lambda p: p[0])]
+
+    @staticmethod
+    def _drop_seen_sentences(text: str, seen: Set[str]) -> str:
+        kept = []
+        for sentence in _SENTENCE.split(text):
+            key = " ".join(_WORD.findall(sentence.lower()))
+            if not key:
+                continue
+            if key in seen:
+                continue
+            seen.add(key)
+            kept.append(sentence.strip())
+        return "\n".join(kept) if "\n" in text else " ".join(kept)
+
+    def _shingles(self, text: str) -> Set[Tuple[str, ...]]:
+        words = _WORD.findall(text.lower())
+        n = min(self.shingle_size, len(words)) or 1
+        return {tuple(words[i:i + n]) for i in range(max(1, len(words) - n + 1))}
+
+    @staticmethod
+    def _similarity(a: Set[Tuple[str, ...]], b: Set[Tuple[str, ...]]) -> float:
+        # Containment rather than Jaccard, so a passage inside a longer one counts as a duplicate
+        if not a or not b:
+            return 0.0
+        return len(a & b) / min(len(a), len(b))
@@ -0,0 +1,176 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from utils.context_builder import clip_to_tokens, estimate_tokens
+
+# A short question that leans on an earlier turn ("and for contractors?", "who approves it?").
+# "that", "there" and a leading "why" are left out: "What is that policy on WFH?",
+# "Is there a form for travel claims?" and "Why do I need ...?" usually stand alone
+_CONTINUATION = re.compile(r"^(?:and|also|so|then|but|what about|how about|what if|same for)\b")
+_ANAPHOR = re.compile(r"\b(?:it|its|those|these|they|them|their|he|she|him|her|his|same|"
+                      r"above|previous|earlier|mentioned)\b")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+_HEADER = re.compile(r"^Detected Use Case:.*\n?", re.MULTILINE)
+
+
+def default_history_tokens() -> int:
+    """Prompt history budget in tokens (HR_HISTORY_TOKENS, default 400)"""
+    return int(os.getenv("HR_HISTORY_TOKENS", "400"))
+
+
+class Conversation:
+    """Bounded memory of one chat session.
+
+    Only the last ``window`` messages are kept verbatim; each message that
+    falls out of the window is compacted into one short line of a rolling
+    summary, which itself drops its oldest lines past ``summary_tokens``.
+    The last ``recent_size`` distinct questions are kept in an LRU index
+    updated on every add. Memory, rerender cost and prompt size therefore
+    stay constant however long the session runs.
+    """
+
+    def __init__(self, window: int = 10, summary_tokens: int = 200, recent_size: int = 5,
+                 line_tokens: int = 30, follow_up_words: int = 12):
+        self.window = window
+        self.summary_tokens = summary_tokens
+        self.recent_size = recent_size
+        self.line_tokens = line_tokens
+        self.follow_up_words = follow_up_words
+        self.messages: Deque[Dict[str, str]] = deque(maxlen=window)
+        self.summarized = 0  # messages compacted into the summary so far
+        self.last_active = time.monotonic()
+        self._summary: Deque[Tuple[str, int]] = deque()  # (line, tokens)
+        self._summary_size = 0
+        self._recent: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, role: str, content: str) -> None:
+        """Append a "user" or "assistant" message"""
+        with self._lock:
+            if len(self.messages) == self.window:
+                self._compact(self.messages[0])
+            self.messages.append({"role": role, "content": content})
+            if role == "user":
+                key = " ".join(content.lower().split())
+                self._recent.pop(key, None)
+                self._recent[key] = content
+                if len(self._recent) > self.recent_size:
+                    self._recent.popitem(last=False)
+            self.last_active = time.monotonic()
+
+    def clear(self) -> None:
+        with self._lock:
+            self.messages.clear()
+            self._summary.clear()
+            self._summary_size = 0
+            self._recent.clear()
+            self.summarized = 0
+
+    def recent_questions(self) -> List[str]:
+        """The last distinct questions asked, oldest first"""
+        with self._lock:
+            return list(self._recent.values())
+
+    @property
+    def summary(self) -> str:
+        with self._lock:
+            return "\n".join(line for line, _ in self._summary)
+
+    def previous_question(self, query: str) -> Optional[str]:
+        """The latest question before ``query`` (which may already have been added)"""
+        with self._lock:
+            for message in reversed(self._before(query)):
+                if message["role"] == "user":
+                    return message["content"]
+            return None
+
+    def is_follow_up(self, query: str, has_topic: Optional[Callable[[str], bool]] = None) -> bool:
+        """True if ``query`` probably cannot be answered without the earlier turns.
+
+        ``has_topic`` tells whether a query names a topic of its own (e.g.
+        one of the tools' keywords); such a query is taken as standalone.
+        """
+        text = " ".join(query.lower().split())
+        if self.previous_question(query) is None:
+            return False
+        if has_topic is not None and has_topic(query):
+            return False
+        if _CONTINUATION.search(text):
+            return True
+        return len(text.split()) <= self.follow_up_words and bool(_ANAPHOR.search(text))
+
+    def retrieval_query(self, query: str) -> str:
+        """Search text for a follow-up: the previous question plus this one"""
+        previous = self.previous_question(query)
+        return f"{previous} {query}" if previous else query
+
+    def history(self, query: str, max_tokens: Optional[int] = None) -> str:
+        """Summary plus recent turns before ``query``, newest kept first, within ``max_tokens``"""
+        budget = max_tokens or default_history_tokens()
+        with self._lock:
+            turns = []
+            for message in reversed(self._before(query)):
+                line = self._line(message, self.line_tokens * 2)
+                tokens = estimate_tokens(line)
+                if tokens > budget:
+                    break
+                turns.append(line)
+                budget -= tokens
+            summary = [line for line, _ in self._summary]
+        parts = []
+        if summary and budget > self.line_tokens:
+            parts.append("Earlier: " + clip_to_tokens("\n".join(summary), budget, keep_end=True))
+        parts.extend(reversed(turns))
+        return "\n".join(parts)
+
+    def _before(self, query: str) -> List[Dict[str, str]]:
+        messages = list(self.messages)
+        if messages and messages[-1]["role"] == "user" and messages[-1]["content"] == query:
+            messages.pop()
+        return messages
+
+    def _compact(self, message: Dict[str, str]) -> None:
+        line = self._line(message, self.line_tokens)
+        tokens = estimate_tokens(line)
+        self._summary.append((line, tokens))
+        self._summary_size += tokens
+        while self._summary_size > self.summary_tokens and len(self._summary) > 1:
+            self._summary_size -= self._summary.popleft()[1]
+        self.summarized += 1
+
+    @staticmethod
+    def _line(message: Dict[str, str], max_tokens: int) -> str:
+        """One-line form of a message: the question, or the first sentence of the answer"""
+        text = message["content"]
+        if message["role"] == "user":
+            return "User: " + clip_to_tokens(" ".join(text.split()), max_tokens)
+        text = " ".join(_HEADER.sub("", text).split())
+        first = _SENTENCE_END.split(text, 1)[0]
+        return "Assistant: " + clip_to_tokens(first, max_tokens)
+
+
+class ConversationStore:
+    """Conversations by session id, least recently used evicted past ``max_sessions``"""
+
+    def __init__(self, max_sessions: int = 10000, idle_seconds: float = 3600.0, **conversation_args):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.conversation_args = conversation_args
+        self._sessions: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> Conversation:
+        with self._lock:
+            conversation = self._sessions.pop(session_id, None)
+            if conversation is None or time.monotonic() - conversation.last_active > self.idle_seconds:
+                conversation = Conversation(**self.conversation_args)
+            self._sessions[session_id] = conversation
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return conversation
+
+    def __len__(self) -> int:
+        return len(self._sessions)
@@ -0,0 +1,114 @@
+import asyncio
+import random
+import threading
+import time
+from typing import List, Optional, Tuple, Type
+from langchain_core.embeddings import Embeddings
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, bursts up to ``capacity``"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float) -> float:
+        """Take tokens now (possibly going negative) and return the wait needed"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Block until ``tokens`` are available"""
+        delay = self._reserve(tokens)
+        if delay:
+            time.sleep(delay)
+
+    async def acquire_async(self, tokens: float = 1.0) -> None:
+        """Wait (without blocking the event loop) until ``tokens`` are available"""
+        delay = self._reserve(tokens)
+        if delay:
+            await asyncio.sleep(delay)
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Full-jitter exponential backoff for the given retry attempt (0-based)"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+class EmbeddingScheduler(Embeddings):
+    """Batches, rate-limits, parallelises and retries calls to an embedding model.
+
+    Texts are cut into ``batch_size`` requests, at most ``concurrency`` of
+    which run at once; each request first takes a token from a bucket
+    refilled at ``requests_per_minute``. Failed requests are retried up to
+    ``max_retries`` times with jittered exponential backoff.
+    """
+
+    def __init__(self, embeddings: Embeddings, batch_size: int = 100, concurrency: int = 4,
+                 requests_per_minute: Optional[float] = None, max_retries: int = 5,
+                 base_delay: float = 1.0, max_delay: float = 30.0,
+                 retry_on: Tuple[Type[BaseException], ...] = (Exception,)):
+        self.embeddings = embeddings
+        self.model = getattr(embeddings, "model", type(embeddings).__name__)
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.bucket = TokenBucket(requests_per_minute / 60.0) if requests_per_minute else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on
+        self.requests = 0
+        self.retries = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.aembed_documents(texts))
+        # Called from inside an event loop: run the schedule on a private one
+        result = []
+        worker = threading.Thread(
+            target=lambda: result.append(asyncio.run(self.aembed_documents(texts)))
+        )
+        worker.start()
+        worker.join()
+        return result[0]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        slots = asyncio.Semaphore(self.concurrency)
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+
+        async def run(batch: List[str]) -> List[List[float]]:
+            async with slots:
+                return await self._embed_batch(batch)
+
+        results = await asyncio.gather(*(run(batch) for batch in batches))
+        return [vector for batch_vectors in results for vector in batch_vectors]
+
+    async def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            if self.bucket is not None:
+                await self.bucket.acquire_async()
+            self.requests += 1
+            try:
+                return await asyncio.to_thread(self.embeddings.embed_documents, batch)
+            except self.retry_on as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+                print(f"! Embedding batch failed ({e}); retry {attempt + 1} in {delay:.1f}s")
+                self.retries += 1
+                attempt += 1
+                await asyncio.sleep(delay)
@@ -1,17 +1,34 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-import os
+import time
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+from utils.clients import get_llm
+from utils.context_builder import clip_to_tokens, default_token_budget
+from utils.conversation import default_history_tokens
+from utils.keyword_matcher import KeywordMatcher
+from utils.resilient_llm import CircuitOpenError
+from utils import metrics
 
 class GeminiClient:
     """Wrapper for Gemini API with HR-specific prompting"""
 
-    def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash",
-            temperature=0.3,
-            top_p=0.85
-        )
-
-    def generate_hr_response(self, context: str, query: str, use_case: str) -> str:
+    FALLBACK_MARKER = "I encountered a technical difficulty"
+    CACHED_MARKER = "Live answers are temporarily unavailable"
+    GREETING_PHRASES = [
+        "hello", "hi", "hey", "who are you", "can you tell about yourself",
+        "introduce yourself", "tell about you", "about yourself", "what you do for me"
+    ]
+
+    def __init__(self, llm: Optional[Any] = None, keyword_matcher: Optional[KeywordMatcher] = None,
+                 max_context_tokens: Optional[int] = None, max_history_tokens: Optional[int] = None):
+        self.llm = llm if llm is not None else get_llm()
+        self.max_context_tokens = max_context_tokens or default_token_budget()
+        self.max_history_tokens = max_history_tokens or default_history_tokens()
+        # HRToolManager swaps in the matcher shared with the tools, so a query
+        # is scanned once for both routing and greeting detection
+        self.keyword_matcher = keyword_matcher or KeywordMatcher({"greeting": self.GREETING_PHRASES})
+        # Set by HRToolManager: a cached answer to a similar question, served when the LLM fails
+        self.cached_answer: Optional[Callable[[str], Optional[str]]] = None
+
+    def generate_hr_response(self, context: str, query: str, use_case: str, history: str = "") -> str:
         """
         Generate a structured HR response using Gemini.
         If query is general/greeting-like, return static intro.
@@ -20,19 +37,122 @@ class GeminiClient:
             return self._greeting_response()
 
         try:
-            prompt = self._build_hr_prompt(context, query, use_case)
-            response = self.llm.invoke(prompt)
+            with metrics.span("build_prompt"):
+                prompt = self._build_hr_prompt(context, query, use_case, history)
+            with metrics.span("llm_invoke"):
+                response = self.llm.invoke(prompt)
+            self._record_usage(getattr(response, "usage_metadata", None))
             return response.content
+        except CircuitOpenError:
+            # Upstream known to be down: answer right away, without logging every request
+            return self._fallback_response(query, use_case)
         except Exception as e:
             print(f"Error generating Gemini response: {str(e)}")
             return self._fallback_response(query, use_case)
 
-    def _build_hr_prompt(self, context: str, query: str, use_case: str) -> str:
+    def stream_hr_response(self, context: str, query: str, use_case: str,
+                           history: str = "") -> Iterator[str]:
+        """
+        Same as generate_hr_response, but yields the answer in chunks
+        as Gemini produces them.
+        """
+        if self._is_greeting(query):
+            yield self._greeting_response()
+            return
+
+        try:
+            with metrics.span("build_prompt"):
+                prompt = self._build_hr_prompt(context, query, use_case, history)
+            usage = {}
+            started = time.perf_counter()
+            first_token = True
+            with metrics.span("llm_invoke"):
+                for chunk in self.llm.stream(prompt):
+                    self._add_usage(usage, getattr(chunk, "usage_metadata", None))
+                    if chunk.content:
+                        if first_token:
+                            metrics.observe_stage("llm_first_token", time.perf_counter() - started)
+                            first_token = False
+                        yield chunk.content
+            self._record_usage(usage)
+        except CircuitOpenError:
+            yield self._fallback_response(query, use_case)
+        except Exception as e:
+            print(f"Error streaming Gemini response: {str(e)}")
+            yield self._fallback_response(query, use_case)
+
+    async def agenerate_hr_response(self, context: str, query: str, use_case: str,
+                                   history: str = "") -> str:
+        """Async version of generate_hr_response"""
+        if self._is_greeting(query):
+            return self._greeting_response()
+
+        try:
+            with metrics.span("build_prompt"):
+                prompt = self._build_hr_prompt(context, query, use_case, history)
+            with metrics.span("llm_invoke"):
+                response = await self.llm.ainvoke(prompt)
+            self._record_usage(getattr(response, "usage_metadata", None))
+            return response.content
+        except CircuitOpenError:
+            return self._fallback_response(query, use_case)
+        except Exception as e:
+            print(f"Error generating Gemini response: {str(e)}")
+            return self._fallback_response(query, use_case)
+
+    async def astream_hr_response(self, context: str, query: str, use_case: str,
+                                  history: str = "") -> AsyncIterator[str]:
+        """Async version of stream_hr_response"""
+        if self._is_greeting(query):
+            yield self._greeting_response()
+            return
+
+        try:
+            with metrics.span("build_prompt"):
+                prompt = self._build_hr_prompt(context, query, use_case, history)
+            usage = {}
+            started = time.perf_counter()
+            first_token = True
+            with metrics.span("llm_invoke"):
+                async for chunk in self.llm.astream(prompt):
+                    self._add_usage(usage, getattr(chunk, "usage_metadata", None))
+                    if chunk.content:
+                        if first_token:
+                            metrics.observe_stage("llm_first_token", time.perf_counter() - started)
+                            first_token = False
+                        yield chunk.content
+            self._record_usage(usage)
+        except CircuitOpenError:
+            yield self._fallback_response(query, use_case)
+        except Exception as e:
+            print(f"Error streaming Gemini response: {str(e)}")
+            yield self._fallback_response(query, use_case)
+
+    @staticmethod
+    def _add_usage(total: dict, usage: Optional[dict]) -> None:
+        """Accumulate per-chunk token usage from a streamed response"""
+        for key in ("input_tokens", "output_tokens"):
+            if usage and usage.get(key):
+                total[key] = total.get(key, 0) + usage[key]
+
+    @staticmethod
+    def _record_usage(usage: Optional[dict]) -> None:
+        """Report Gemini's prompt/completion token counts, when it returns them"""
+        if usage:
+            metrics.record_tokens(usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+
+    def _build_hr_prompt(self, context: str, query: str, use_case: str, history: str = "") -> str:
         """Constructs the HR-specific prompt for Gemini."""
+        # Tools already pack their context to the budget; this caps anything else passed in
+        context = clip_to_tokens(context, self.max_context_tokens)
+        if history:
+            # Latest turns matter most for resolving a follow-up
+            history = clip_to_tokens(history, self.max_history_tokens, keep_end=True)
+            history = f"\nCONVERSATION SO FAR (use it only to resolve what the question refers to):\n{history}\n"
         return f"""
 ROLE: You are an expert HR assistant for a large company.
 TASK: Answer the employee's question based on company documents.
-
+{history}
 USE CASE: {use_case}
 USER QUESTION: "{query}"
 
@@ -58,9 +178,12 @@ YOUR RESPONSE:
 """
 
     def _fallback_response(self, query: str, use_case: str) -> str:
-        """Fallback when Gemini fails"""
+        """Fallback when Gemini fails: a cached answer if there is one, else an apology"""
+        cached = self.cached_answer(query) if self.cached_answer is not None else None
+        if cached is not None:
+            return f"_{self.CACHED_MARKER}; this is the answer to a similar earlier question._\n\n{cached}"
         return f"""
-I apologize, but I encountered a technical difficulty processing your query.
+I apologize, but {self.FALLBACK_MARKER} processing your query.
 
 Detected Use Case: {use_case}
 Question: {query}
@@ -68,13 +191,14 @@ Question: {query}
 Please try rephrasing your question or contact HR directly for assistance.
 """
 
+    @classmethod
+    def is_fallback_response(cls, response: str) -> bool:
+        """True if the response is the canned failure message or a cached stand-in"""
+        return cls.FALLBACK_MARKER in response or cls.CACHED_MARKER in response
+
     def _is_greeting(self, query: str) -> bool:
         """Check if the query is a greeting or casual question"""
-        greetings = [
-            "hello", "hi", "hey", "who are you", "can you tell about yourself",
-              "introduce yourself","tell about you", "about yourself","what you do for me "
-                ]
-        return any(greet in query.lower() for greet in greetings)
+        return self.keyword_matcher.contains(query, "greeting")
 
     def _greeting_response(self) -> str:
         """Static response for greeting-like prompts"""
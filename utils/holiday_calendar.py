@@ -0,0 +1,119 @@
+import datetime as dt
+import os
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from utils.keyword_matcher import KeywordMatcher
+
+
+class Holiday:
+    """One calendar row"""
+
+    __slots__ = ("date", "name", "details", "source")
+
+    def __init__(self, date: dt.date, name: str, details: Dict[str, str], source: str):
+        self.date = date
+        self.name = name
+        self.details = details
+        self.source = source
+
+
+class HolidayCalendar:
+    """Typed, date-sorted columnar store of the holiday calendar rows.
+
+    Dates are kept as a sorted int64 array of proleptic ordinals next to
+    parallel name/detail/source columns, so "on this date", "in this month"
+    and "after today" are binary searches over one array. Saved as a single
+    ``.npz`` file that loads without pickle.
+    """
+
+    def __init__(self, ordinals: np.ndarray, names: Sequence[str], sources: Sequence[str],
+                 detail_columns: Sequence[str], details: Sequence[Sequence[str]]):
+        order = np.argsort(ordinals, kind="stable")
+        self.ordinals = np.asarray(ordinals, dtype=np.int64)[order]
+        self.names = [names[i] for i in order]
+        self.sources = [sources[i] for i in order]
+        self.detail_columns = list(detail_columns)
+        # One list per detail column, aligned with ordinals ("" when empty)
+        self.details = [[column[i] for i in order] for column in details]
+        self.years = sorted({dt.date.fromordinal(int(o)).year for o in self.ordinals})
+        self._name_matcher: Optional[KeywordMatcher] = None
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[dt.date, str, Dict[str, str], str]]) -> "HolidayCalendar":
+        """Build from (date, name, {column: value}, source) rows"""
+        rows = list(rows)
+        columns = sorted({column for _, _, details, _ in rows for column in details})
+        return cls(
+            np.asarray([day.toordinal() for day, _, _, _ in rows], dtype=np.int64),
+            [name for _, name, _, _ in rows],
+            [source for _, _, _, source in rows],
+            columns,
+            [[details.get(column, "") for _, _, details, _ in rows] for column in columns]
+        )
+
+    def save(self, path: str) -> None:
+        """Write the calendar as one uncompressed .npz file"""
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                ordinals=self.ordinals,
+                names=np.asarray(self.names, dtype=str),
+                sources=np.asarray(self.sources, dtype=str),
+                detail_columns=np.asarray(self.detail_columns, dtype=str),
+                details=np.asarray(self.details, dtype=str).reshape(len(self.detail_columns), len(self)),
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "HolidayCalendar":
+        """Load a calendar written by save()"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["ordinals"], data["names"].tolist(), data["sources"].tolist(),
+                       data["detail_columns"].tolist(), data["details"].tolist())
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    def holiday(self, i: int) -> Holiday:
+        details = {column: values[i] for column, values in zip(self.detail_columns, self.details)
+                   if values[i]}
+        return Holiday(dt.date.fromordinal(int(self.ordinals[i])), self.names[i], details,
+                       self.sources[i])
+
+    def between(self, start: dt.date, end: dt.date) -> List[Holiday]:
+        """Holidays from ``start`` to ``end``, both inclusive"""
+        lo = int(np.searchsorted(self.ordinals, start.toordinal(), side="left"))
+        hi = int(np.searchsorted(self.ordinals, end.toordinal(), side="right"))
+        return [self.holiday(i) for i in range(lo, hi)]
+
+    def on(self, day: dt.date) -> List[Holiday]:
+        return self.between(day, day)
+
+    def upcoming(self, today: dt.date, count: int = 1) -> List[Holiday]:
+        """The next ``count`` holidays on or after ``today``"""
+        lo = int(np.searchsorted(self.ordinals, today.toordinal(), side="left"))
+        return [self.holiday(i) for i in range(lo, min(lo + count, len(self)))]
+
+    def in_month(self, year: int, month: int) -> List[Holiday]:
+        first = dt.date(year, month, 1)
+        last = dt.date(year + month // 12, month % 12 + 1, 1) - dt.timedelta(days=1)
+        return self.between(first, last)
+
+    def in_year(self, year: int) -> List[Holiday]:
+        return self.between(dt.date(year, 1, 1), dt.date(year, 12, 31))
+
+    def default_year(self, today: dt.date) -> int:
+        """This year if the calendar covers it, else the closest year it does cover"""
+        if not self.years or today.year in self.years:
+            return today.year
+        return min(self.years, key=lambda year: abs(year - today.year))
+
+    def named_in(self, text: str) -> List[Holiday]:
+        """Holidays whose name occurs in the text, e.g. "When is Diwali?" """
+        if self._name_matcher is None:
+            self._name_matcher = KeywordMatcher({name.lower(): [name] for name in self.names})
+        names = self._name_matcher.labels(text)
+        return [self.holiday(i) for i, name in enumerate(self.names) if name.lower() in names]
+
+    @staticmethod
+    def source_names(holidays: Iterable[Holiday]) -> str:
+        return ", ".join(sorted({os.path.basename(h.source) for h in holidays if h.source}))
@@ -0,0 +1,357 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+import faiss
+import numpy as np
+from langchain_community.docstore.base import Docstore
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from utils.ann import (
+    IndexSpec, apply_search_params, build_ann_index, load_params, print_report, save_params, to_flat
+)
+from utils.partitions import category_for_source
+
+
+def _mmap_flags(params: Dict[str, Any]) -> int:
+    # IVF maps its inverted lists; flat and HNSW storage use the zero-copy
+    # mapping where this faiss build has it (the two flags cannot be combined)
+    if params.get("kind", "flat").startswith("ivf"):
+        return faiss.IO_FLAG_MMAP
+    return getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+
+
+def _chunks_file(folder: str, index_name: str) -> str:
+    return os.path.join(folder, f"{index_name}.chunks.db")
+
+
+def _partition_file(folder: str, index_name: str, category: str) -> str:
+    return os.path.join(folder, f"{index_name}.{category}.faiss")
+
+
+def _vectors_file(folder: str, index_name: str) -> str:
+    return os.path.join(folder, f"{index_name}.vectors.npy")
+
+
+def _params_file(index_file: str) -> str:
+    return index_file[:-len(".faiss")] + ".ann.json"
+
+
+def _write_index(index: Any, path: str, spec: Optional[IndexSpec], label: str) -> None:
+    """Write an exact index, or the ANN index ``spec`` asks for plus its tuning parameters"""
+    if spec is not None:
+        index, params = build_ann_index(index, spec)
+        save_params(_params_file(path), params)
+        print_report(params, label)
+    faiss.write_index(index, path)
+
+
+def _read_index(path: str, mmap: bool = True) -> Any:
+    params = load_params(_params_file(path))
+    index = faiss.read_index(path, _mmap_flags(params)) if mmap else faiss.read_index(path)
+    apply_search_params(index, params)
+    return index
+
+
+def load_index_spec(folder: str, index_name: str) -> Optional[IndexSpec]:
+    """The IndexSpec a store was built with (None for exact indexes saved without one)"""
+    params = load_params(_params_file(os.path.join(folder, f"{index_name}.faiss")))
+    return IndexSpec.from_dict(params["spec"]) if "spec" in params else None
+
+
+class ChunkStore(Docstore):
+    """Read-only SQLite docstore: chunk text and metadata are read per hit.
+
+    Rows are keyed by FAISS position, so nothing is loaded up front and a
+    search touches only the k rows it returns.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+
+    def search(self, search: str) -> Union[str, Document]:
+        """Document stored under a docstore id"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT doc_id, page_content, metadata FROM chunks WHERE doc_id = ?", (search,)
+            ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return self._document(row)
+
+    def categories(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT category FROM chunks WHERE category IS NOT NULL"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def position_map(self, category: Optional[str] = None) -> "PositionMap":
+        """Lazy FAISS position -> docstore id mapping (global or one partition)"""
+        return PositionMap(self, category)
+
+    def iter_documents(self, batch_size: int = 1000) -> Iterator[Document]:
+        """Every chunk in FAISS position order, read ``batch_size`` rows at a time"""
+        last = -1
+        while True:
+            rows = self._query(
+                "SELECT position, doc_id, page_content, metadata FROM chunks "
+                "WHERE position > ? ORDER BY position LIMIT ?", (last, batch_size)
+            )
+            if not rows:
+                return
+            last = rows[-1][0]
+            for row in rows:
+                yield self._document(row[1:])
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    @staticmethod
+    def _document(row: Tuple) -> Document:
+        doc_id, page_content, metadata = row
+        return Document(id=doc_id, page_content=page_content, metadata=json.loads(metadata))
+
+
+class PositionMap(Mapping[int, str]):
+    """Read-only dict-like view of a chunk table, used as index_to_docstore_id"""
+
+    def __init__(self, store: ChunkStore, category: Optional[str] = None):
+        self.store = store
+        self.category = category
+        if category is None:
+            self._where, self._column, self._params = "", "position", ()
+        else:
+            self._where, self._column, self._params = "WHERE category = ?", "category_position", (category,)
+
+    def __getitem__(self, position: int) -> str:
+        where = f"{self._where} AND" if self._where else "WHERE"
+        rows = self.store._query(
+            f"SELECT doc_id FROM chunks {where} {self._column} = ?", self._params + (int(position),)
+        )
+        if not rows:
+            raise KeyError(position)
+        return rows[0][0]
+
+    def __len__(self) -> int:
+        return self.store._query(f"SELECT COUNT(*) FROM chunks {self._where}", self._params)[0][0]
+
+    def __iter__(self) -> Iterator[int]:
+        rows = self.store._query(
+            f"SELECT {self._column} FROM chunks {self._where} ORDER BY {self._column}", self._params
+        )
+        return (row[0] for row in rows)
+
+    def items(self):
+        return self.store._query(
+            f"SELECT {self._column}, doc_id FROM chunks {self._where} ORDER BY {self._column}",
+            self._params
+        )
+
+
+def has_store(folder: str, index_name: str) -> bool:
+    """True if ``index_name`` was saved by write_store() (not a pickled index)"""
+    return os.path.exists(_chunks_file(folder, index_name))
+
+
+def store_files(folder: str, index_name: str) -> List[str]:
+    """Index, partition and chunk files of a store written by write_store()"""
+    prefix = f"{index_name}."
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder)
+                  if name.startswith(prefix) and name.endswith((".faiss", ".chunks.db")))
+
+
+_CREATE_CHUNKS = ("CREATE TABLE chunks (position INTEGER PRIMARY KEY, doc_id TEXT NOT NULL UNIQUE, "
+                  "category TEXT, category_position INTEGER, page_content TEXT, metadata TEXT)")
+_INSERT_CHUNK = "INSERT INTO chunks VALUES (?, ?, ?, ?, ?, ?)"
+
+
+def _open_chunk_table(path: str) -> sqlite3.Connection:
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.execute(_CREATE_CHUNKS)
+    return conn
+
+
+def _chunk_rows(chunks: Iterable[Tuple[int, str, Document]],
+                members: Dict[str, List[int]]) -> Iterator[Tuple]:
+    """Table rows for (position, doc_id, document) triples; records partition members"""
+    for position, doc_id, doc in chunks:
+        metadata = doc.metadata or {}
+        category = metadata.get("category") or category_for_source(metadata.get("source", ""))
+        category_position = None
+        if category:
+            category_position = len(members.setdefault(category, []))
+            members[category].append(position)
+        yield (position, doc_id, category, category_position, doc.page_content, json.dumps(metadata))
+
+
+def _finish_chunk_table(conn: sqlite3.Connection) -> None:
+    conn.execute("CREATE INDEX chunks_partition ON chunks (category, category_position)")
+    conn.commit()
+
+
+def _write_vectors(folder: str, index_name: str, flat: Any, members: Dict[str, List[int]],
+                   index_spec: Optional[IndexSpec]) -> None:
+    """Write the main index and one flat (or ANN) sub-index per category.
+
+    PQ codes only approximate the vectors, so next to an IVF-PQ main index
+    the exact float32 vectors are saved too; incremental updates rebuild
+    from those instead of from PQ-decoded ones.
+    """
+    index_file = os.path.join(folder, f"{index_name}.faiss")
+    _write_index(flat, index_file, index_spec, "index")
+    if load_params(_params_file(index_file)).get("kind") == "ivf-pq":
+        exact = np.lib.format.open_memmap(_vectors_file(folder, index_name), mode="w+",
+                                          dtype=np.float32, shape=(flat.ntotal, flat.d))
+        for start in range(0, flat.ntotal, 65536):
+            count = min(65536, flat.ntotal - start)
+            exact[start:start + count] = flat.reconstruct_n(start, count)
+        exact.flush()
+        del exact
+    for category, positions in members.items():
+        partition = faiss.IndexFlat(flat.d, flat.metric_type)
+        partition.add(flat.reconstruct_batch(np.asarray(positions, dtype=np.int64)))
+        _write_index(partition, _partition_file(folder, index_name, category),
+                     index_spec, f"{category} partition")
+
+
+def write_store(folder: str, index_name: str, db: FAISS,
+                index_spec: Optional[IndexSpec] = None) -> None:
+    """Save vectors, per-category partitions and a chunk table without pickle.
+
+    Writes ``<index_name>.faiss``, ``<index_name>.chunks.db`` and one
+    ``<index_name>.<category>.faiss`` sub-index per chunk category. With an
+    ``index_spec`` each index (partitions included, if large enough) is
+    rebuilt as that ANN type and its tuning parameters and recall/latency
+    report are saved next to it as ``.ann.json``.
+    """
+    os.makedirs(folder, exist_ok=True)
+    members: Dict[str, List[int]] = {}
+    conn = _open_chunk_table(_chunks_file(folder, index_name))
+    try:
+        chunks = ((position, doc_id, db.docstore.search(doc_id))
+                  for position, doc_id in sorted(db.index_to_docstore_id.items()))
+        conn.executemany(_INSERT_CHUNK, _chunk_rows(chunks, members))
+        _finish_chunk_table(conn)
+    finally:
+        conn.close()
+    _write_vectors(folder, index_name, to_flat(db.index), members, index_spec)
+
+
+class StoreWriter:
+    """Write the same files as write_store(), one batch of chunks at a time.
+
+    Each batch's chunks go straight into the SQLite table and only its
+    vectors are kept (in the flat index being built), so a full build never
+    holds every chunk's text and metadata in memory at once.
+    """
+
+    def __init__(self, folder: str, index_name: str):
+        os.makedirs(folder, exist_ok=True)
+        self.folder = folder
+        self.index_name = index_name
+        self.index: Optional[Any] = None
+        self._members: Dict[str, List[int]] = {}
+        self._conn = _open_chunk_table(_chunks_file(folder, index_name))
+
+    def __len__(self) -> int:
+        return self.index.ntotal if self.index is not None else 0
+
+    def add(self, documents: Sequence[Document], ids: Sequence[str], vectors: Any) -> None:
+        """Append chunks with their ids and embeddings"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.index is None:
+            self.index = faiss.IndexFlatL2(vectors.shape[1])  # what FAISS.from_documents builds
+        start = self.index.ntotal
+        self._conn.executemany(_INSERT_CHUNK, _chunk_rows(
+            zip(range(start, start + len(ids)), ids, documents), self._members))
+        self.index.add(vectors)
+
+    def finish(self, index_spec: Optional[IndexSpec] = None) -> None:
+        """Close the chunk table and write the index and partitions"""
+        try:
+            _finish_chunk_table(self._conn)
+        finally:
+            self._conn.close()
+        _write_vectors(self.folder, self.index_name, self.index, self._members, index_spec)
+
+    def close(self) -> None:
+        """Abandon the store (e.g. after a failed build)"""
+        self._conn.close()
+
+    def iter_documents(self) -> Iterator[Document]:
+        """Every chunk written so far, read back from the table (after finish())"""
+        store = ChunkStore(_chunks_file(self.folder, self.index_name))
+        try:
+            yield from store.iter_documents()
+        finally:
+            store.close()
+
+
+def has_exact_vectors(folder: str, index_name: str) -> bool:
+    """False if the store's main index is lossy (IVF-PQ) and its exact vectors were not saved"""
+    params = load_params(_params_file(os.path.join(folder, f"{index_name}.faiss")))
+    return params.get("kind") != "ivf-pq" or os.path.exists(_vectors_file(folder, index_name))
+
+
+def load_store(folder: str, index_name: str, embeddings: Any,
+               mmap: bool = True) -> Tuple[FAISS, Dict[str, FAISS]]:
+    """Open a store written by write_store().
+
+    With ``mmap`` the vectors are memory-mapped and chunks are read lazily,
+    so load time and resident memory do not grow with the corpus. Without
+    it everything is read into a regular, writable LangChain FAISS store
+    with an exact flat index (used for incremental updates); no partitions
+    are returned then, and an IVF-PQ store's saved exact vectors are used
+    rather than its PQ-decoded ones. Saved nprobe/efSearch settings are
+    applied.
+    """
+    store = ChunkStore(_chunks_file(folder, index_name))
+    index_file = os.path.join(folder, f"{index_name}.faiss")
+    if not mmap:
+        index = _read_index(index_file, mmap=False)
+        vectors_file = _vectors_file(folder, index_name)
+        if os.path.exists(vectors_file):
+            flat = faiss.IndexFlat(index.d, index.metric_type)
+            flat.add(np.load(vectors_file))
+            index = flat
+        else:
+            index = to_flat(index)
+        documents = list(store.iter_documents())
+        store.close()
+        db = FAISS(
+            embedding_function=embeddings,
+            index=index,
+            docstore=InMemoryDocstore({doc.id: doc for doc in documents}),
+            index_to_docstore_id={i: doc.id for i, doc in enumerate(documents)}
+        )
+        return db, {}
+
+    db = FAISS(
+        embedding_function=embeddings,
+        index=_read_index(index_file),
+        docstore=store,
+        index_to_docstore_id=store.position_map()
+    )
+    partitions = {}
+    for category in store.categories():
+        path = _partition_file(folder, index_name, category)
+        if os.path.exists(path):
+            partitions[category] = FAISS(
+                embedding_function=embeddings,
+                index=_read_index(path),
+                docstore=store,
+                index_to_docstore_id=store.position_map(category)
+            )
+    return db, partitions
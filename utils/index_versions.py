@@ -0,0 +1,120 @@
+import json
+import os
+import re
+import shutil
+from typing import Any, Dict, Optional
+from utils.index_store import write_store
+
+VERSION_FILE = "VERSION"
+LEGACY_INDEX_NAME = "index"
+_VERSIONED_FILE = re.compile(r"^[\w]+?-v(\d+)(\.|$)")
+
+
+def index_name_for(version: Optional[str]) -> str:
+    """File stem used by FAISS.save_local/load_local for a given version"""
+    return f"index-v{version}" if version else LEGACY_INDEX_NAME
+
+
+def lexical_index_name_for(version: Optional[str]) -> str:
+    """File name of the BM25 index saved next to a given index version"""
+    return f"bm25-v{version}.npz" if version else "bm25.npz"
+
+
+def holiday_calendar_name_for(version: Optional[str]) -> str:
+    """File name of the structured holiday calendar saved next to a given index version"""
+    return f"holidays-v{version}.npz" if version else "holidays.npz"
+
+
+def org_graph_name_for(version: Optional[str]) -> str:
+    """File name of the org chart graph saved next to a given index version"""
+    return f"org-v{version}.npz" if version else "org.npz"
+
+
+def read_current_version(index_path: str) -> Optional[str]:
+    """Return the published version, or None for a legacy unversioned index"""
+    version_file = os.path.join(index_path, VERSION_FILE)
+    if not os.path.exists(version_file):
+        return None
+    with open(version_file, encoding="utf-8") as f:
+        return f.read().strip() or None
+
+
+def next_version(index_path: str) -> str:
+    """Version number following the currently published one"""
+    current = read_current_version(index_path)
+    return str(int(current) + 1) if current and current.isdigit() else "1"
+
+
+def load_manifest(index_path: str, version: Optional[str] = None) -> Dict[str, Any]:
+    """Load the source-file manifest saved with an index version"""
+    version = version or read_current_version(index_path)
+    if not version:
+        return {}
+    path = os.path.join(index_path, f"manifest-v{version}.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(index_path: str, version: str, manifest: Dict[str, Any]) -> None:
+    """Write the manifest of an index version, replacing any previous copy atomically"""
+    path = os.path.join(index_path, f"manifest-v{version}.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def publish_version(index_path: str, db: Optional[Any], manifest: Dict[str, Any],
+                    version: Optional[str] = None, keep: int = 2,
+                    lexical_index: Optional[Any] = None,
+                    index_spec: Optional[Any] = None,
+                    holiday_calendar: Optional[Any] = None,
+                    org_graph: Optional[Any] = None) -> str:
+    """Save a new index version and atomically make it the current one.
+
+    The index files and manifest are written under version-specific names
+    first; only then is the VERSION pointer swapped with os.replace, so a
+    reader sees either the old or the new version, never a mix. Older
+    versions beyond ``keep`` are deleted afterwards. Pass ``db=None`` when
+    the store of ``version`` was already written with a StoreWriter.
+    """
+    os.makedirs(index_path, exist_ok=True)
+    version = version or next_version(index_path)
+    if db is not None:
+        write_store(index_path, index_name_for(version), db, index_spec)
+    if lexical_index is not None:
+        lexical_index.save(os.path.join(index_path, lexical_index_name_for(version)))
+    if holiday_calendar is not None:
+        holiday_calendar.save(os.path.join(index_path, holiday_calendar_name_for(version)))
+    if org_graph is not None:
+        org_graph.save(os.path.join(index_path, org_graph_name_for(version)))
+    save_manifest(index_path, version, manifest)
+
+    tmp_file = os.path.join(index_path, f"{VERSION_FILE}.tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, os.path.join(index_path, VERSION_FILE))
+
+    prune_versions(index_path, keep)
+    return version
+
+
+def prune_versions(index_path: str, keep: int = 2) -> None:
+    """Delete every ``<name>-v<N>.*`` file of all but the newest ``keep`` versions"""
+    by_version: Dict[int, list] = {}
+    for name in os.listdir(index_path):
+        match = _VERSIONED_FILE.match(name)
+        if match:
+            by_version.setdefault(int(match.group(1)), []).append(name)
+    newest = sorted(by_version)
+    stale = newest[:-keep] if keep else newest
+    for version in stale:
+        for name in by_version[version]:
+            path = os.path.join(index_path, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
@@ -0,0 +1,93 @@
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+
+class KeywordMatcher:
+    """Finds every keyword of every group in one pass over the text.
+
+    All phrases are compiled into a single case-insensitive alternation,
+    longest first, anchored on word boundaries (so "hi" does not match
+    "this"). Keywords of the labels in ``plural`` also match with a plural
+    "s"/"es" ("holidays"); other groups, such as greetings, match only as
+    written, so "hi" does not match "his". A phrase that contains shorter
+    keywords ("leave policy" contains "leave") credits those too, so the
+    result is the same as scanning for each keyword separately.
+    """
+
+    def __init__(self, groups: Dict[str, Iterable[str]], cache_size: int = 256,
+                 plural: Iterable[str] = ()):
+        self.groups: Dict[str, Tuple[str, ...]] = {
+            label: tuple(self._clean(k) for k in keywords if self._clean(k))
+            for label, keywords in groups.items()
+        }
+        self.plural = frozenset(plural)
+        phrases = sorted({k for keywords in self.groups.values() for k in keywords},
+                         key=len, reverse=True)
+        # For every phrase, the (label, keyword) pairs it satisfies
+        self._credits: Dict[str, Tuple[Tuple[str, str], ...]] = {}
+        for phrase in phrases:
+            credits = []
+            for label, keywords in self.groups.items():
+                for keyword in keywords:
+                    if keyword == phrase or re.search(rf"\b{re.escape(keyword)}\b", phrase):
+                        credits.append((label, keyword))
+            self._credits[phrase] = tuple(credits)
+        # A plural form credits only the pairs of labels that allow plurals
+        self._plural_credits: Dict[str, Tuple[Tuple[str, str], ...]] = {
+            phrase: tuple(c for c in credits if c[0] in self.plural)
+            for phrase, credits in self._credits.items()
+            if any(phrase in self.groups[label] for label in self.plural if label in self.groups)
+        }
+        alternation = "|".join(
+            re.escape(p).replace(r"\ ", r"\s+") + ("(?:e?s)?" if p in self._plural_credits else "")
+            for p in phrases
+        )
+        self._pattern = re.compile(rf"\b({alternation})\b", re.IGNORECASE) if phrases else None
+        self._match = lru_cache(maxsize=cache_size)(self._scan)
+
+    @staticmethod
+    def _clean(keyword: str) -> str:
+        return " ".join(keyword.lower().split())
+
+    def _scan(self, text: str) -> FrozenSet[Tuple[str, str]]:
+        if self._pattern is None:
+            return frozenset()
+        hits: Set[Tuple[str, str]] = set()
+        for match in self._pattern.finditer(text):
+            phrase = " ".join(match.group(1).lower().split())
+            credits = self._credits.get(phrase)
+            if credits is None:
+                # Plural of a keyword ("forms", "expenses")
+                credits = (self._plural_credits.get(phrase[:-2], ()) if phrase.endswith("es") else ())
+                credits = credits or self._plural_credits.get(phrase[:-1], ())
+            hits.update(credits)
+        return frozenset(hits)
+
+    def hits(self, text: str) -> FrozenSet[Tuple[str, str]]:
+        """All (label, keyword) pairs found in the text (cached per text)"""
+        return self._match(text)
+
+    def match(self, text: str) -> Dict[str, Set[str]]:
+        """Keywords found in the text, grouped by label"""
+        found: Dict[str, Set[str]] = {}
+        for label, keyword in self.hits(text):
+            found.setdefault(label, set()).add(keyword)
+        return found
+
+    def contains(self, text: str, label: str) -> bool:
+        """True if any keyword of ``label`` occurs in the text"""
+        return any(hit_label == label for hit_label, _ in self.hits(text))
+
+    def labels(self, text: str) -> Set[str]:
+        """Labels with at least one keyword in the text"""
+        return {label for label, _ in self.hits(text)}
+
+    def rank(self, text: str, labels: Iterable[str]) -> List[str]:
+        """Matching labels ordered by number of keyword hits (ties keep input order)"""
+        counts = {label: 0 for label in labels}
+        for label, _ in self.hits(text):
+            if label in counts:
+                counts[label] += 1
+        ranked = [label for label in counts if counts[label]]
+        return sorted(ranked, key=lambda label: counts[label], reverse=True)
@@ -0,0 +1,199 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class RequestTrace:
+    """Timings and token counts collected while answering one query"""
+
+    def __init__(self):
+        self.tool = "none"
+        self.spans: List[Tuple[str, float]] = []
+        self.tokens: Dict[str, int] = {}
+        self.started = time.perf_counter()
+
+    def footer(self) -> str:
+        """One-line human readable summary, e.g. for a debug footer"""
+        total = (time.perf_counter() - self.started) * 1000
+        parts = [f"{stage} {seconds * 1000:.0f}ms" for stage, seconds in self.spans]
+        parts += [f"{name} {count}" for name, count in self.tokens.items()]
+        return f"tool: {self.tool} · total {total:.0f}ms · " + " · ".join(parts)
+
+
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("hr_request_trace", default=None)
+
+
+class MetricsSink:
+    """Interface for metric backends; the default implementation drops everything"""
+
+    def observe(self, stage: str, seconds: float, tool: str) -> None:
+        pass
+
+    def increment(self, name: str, value: float, tool: str) -> None:
+        pass
+
+    def render_prometheus(self) -> str:
+        return ""
+
+
+class InMemoryMetrics(MetricsSink):
+    """Keeps a sliding window of latencies per (stage, tool) plus counters.
+
+    Quantiles are computed over the last ``window`` observations and are
+    exported as Prometheus summaries together with lifetime _sum/_count.
+    """
+
+    def __init__(self, window: int = 2048, namespace: str = "hr_chatbot"):
+        self.window = window
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._samples: Dict[Tuple[str, str], Deque[float]] = {}
+        self._totals: Dict[Tuple[str, str], List[float]] = {}
+        self._counters: Dict[Tuple[str, str], float] = {}
+
+    def observe(self, stage: str, seconds: float, tool: str) -> None:
+        key = (stage, tool)
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+                self._totals[key] = [0.0, 0]
+            samples.append(seconds)
+            self._totals[key][0] += seconds
+            self._totals[key][1] += 1
+
+    def increment(self, name: str, value: float, tool: str) -> None:
+        key = (name, tool)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def percentiles(self, stage: str, tool: str) -> Dict[float, float]:
+        """Return {quantile: seconds} for a stage/tool over the current window"""
+        with self._lock:
+            samples = sorted(self._samples.get((stage, tool), ()))
+        if not samples:
+            return {}
+        return {q: samples[min(len(samples) - 1, int(q * len(samples)))] for q in QUANTILES}
+
+    def render_prometheus(self) -> str:
+        name = f"{self.namespace}_stage_latency_seconds"
+        lines = [
+            f"# HELP {name} Latency of each query-processing stage.",
+            f"# TYPE {name} summary",
+        ]
+        with self._lock:
+            keys = sorted(self._samples)
+            totals = {key: tuple(value) for key, value in self._totals.items()}
+            counters = sorted(self._counters.items())
+        for stage, tool in keys:
+            labels = f'stage="{stage}",tool="{tool}"'
+            for q, value in self.percentiles(stage, tool).items():
+                lines.append(f'{name}{{{labels},quantile="{q}"}} {value:.6f}')
+            total, count = totals[(stage, tool)]
+            lines.append(f"{name}_sum{{{labels}}} {total:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {count}")
+        seen = set()
+        for (counter, tool), value in counters:
+            metric = f"{self.namespace}_{counter}_total"
+            if metric not in seen:
+                lines.append(f"# TYPE {metric} counter")
+                seen.add(metric)
+            lines.append(f'{metric}{{tool="{tool}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+
+_sink: MetricsSink = InMemoryMetrics()
+
+
+def get_metrics() -> MetricsSink:
+    """Return the process-wide metrics sink"""
+    return _sink
+
+
+def set_metrics(sink: MetricsSink) -> None:
+    """Replace the process-wide metrics sink (e.g. with a StatsD/OTel adapter)"""
+    global _sink
+    _sink = sink
+
+
+@contextmanager
+def request_trace() -> Iterator[RequestTrace]:
+    """Collect the spans of one query into a RequestTrace"""
+    trace = RequestTrace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        _sink.observe("total", time.perf_counter() - trace.started, trace.tool)
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """The trace of the query being processed, if any"""
+    return _current_trace.get()
+
+
+def set_tool(tool_name: str) -> None:
+    """Label the current trace (and its later spans) with the chosen tool"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.tool = tool_name
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """Report an already measured duration under ``stage`` for the current tool"""
+    trace = _current_trace.get()
+    tool = trace.tool if trace is not None else "none"
+    if trace is not None:
+        trace.spans.append((stage, seconds))
+    _sink.observe(stage, seconds, tool)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a block and report it under ``stage`` for the current tool"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def record_tokens(prompt_tokens: int, completion_tokens: int) -> None:
+    """Count prompt/completion tokens for the current tool"""
+    trace = _current_trace.get()
+    tool = trace.tool if trace is not None else "none"
+    _sink.increment("prompt_tokens", prompt_tokens, tool)
+    _sink.increment("completion_tokens", completion_tokens, tool)
+    if trace is not None:
+        trace.tokens["prompt_tokens"] = trace.tokens.get("prompt_tokens", 0) + prompt_tokens
+        trace.tokens["completion_tokens"] = trace.tokens.get("completion_tokens", 0) + completion_tokens
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve GET /metrics in Prometheus text format from a daemon thread"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = get_metrics().render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="metrics-http").start()
+    return server
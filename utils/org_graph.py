@@ -0,0 +1,290 @@
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+
+_TOKEN = re.compile(r"[\w.&'-]+")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_TOKEN.findall(text.lower().replace("’", "'")))
+
+
+class OrgGraph:
+    """Reporting-line graph of the org chart, stored as flat integer arrays.
+
+    Employees are numbered 0..n-1. ``parents`` holds each manager (-1 for
+    the top of a tree), children are kept in CSR form (``child_offsets`` /
+    ``child_index``), and a pre-order Euler tour gives every employee an
+    interval ``[tin, tout)`` of ``order`` that holds exactly their reports,
+    direct and indirect. So "X's manager" is O(1), "chain of command" is
+    O(depth), "direct reports", "everyone under X" and department rosters
+    are O(result), and "does X report to Y" is two comparisons. Saved as one
+    ``.npz`` file that loads without pickle; only the name lookups are rebuilt.
+    """
+
+    def __init__(self, employee_ids: Sequence[str], names: Sequence[str],
+                 designations: Sequence[str], department_names: Sequence[str],
+                 department_codes: np.ndarray, parents: np.ndarray,
+                 child_offsets: np.ndarray, child_index: np.ndarray,
+                 order: np.ndarray, tin: np.ndarray, tout: np.ndarray, depth: np.ndarray,
+                 department_offsets: np.ndarray, department_index: np.ndarray):
+        self.employee_ids = list(employee_ids)
+        self.names = list(names)
+        self.designations = list(designations)
+        self.department_names = list(department_names)
+        self.department_codes = department_codes
+        self.parents = parents
+        self.child_offsets = child_offsets
+        self.child_index = child_index
+        self.order = order
+        self.tin = tin
+        self.tout = tout
+        self.depth = depth
+        self.department_offsets = department_offsets
+        self.department_index = department_index
+        # Name/designation/department hash maps, built here rather than on the first query
+        self._lookups = self._build_lookups()
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, str, str, str, str]]) -> "OrgGraph":
+        """Build from (employee id, name, designation, department, manager) rows.
+
+        The manager may be given by employee id or by name. Unknown managers
+        and reporting cycles are cut so the employee becomes a root.
+        """
+        rows = list(rows)
+        n = len(rows)
+        employee_ids = [str(row[0]) for row in rows]
+        names = [row[1] for row in rows]
+        by_id = {employee_id: i for i, employee_id in enumerate(employee_ids) if employee_id}
+        by_name: Dict[str, int] = {}
+        for i, name in enumerate(names):
+            by_name.setdefault(_normalize(name), i)
+
+        parents = np.full(n, -1, dtype=np.int32)
+        unknown = 0
+        for i, row in enumerate(rows):
+            manager = str(row[4]).strip()
+            if not manager:
+                continue
+            parent = by_id.get(manager, by_name.get(_normalize(manager), -1))
+            if parent == -1:
+                unknown += 1
+            elif parent != i:
+                parents[i] = parent
+        if unknown:
+            print(f"⚠️ {unknown} employees have a manager that is not in the org chart")
+        cycles = cls._break_cycles(parents)
+        if cycles:
+            print(f"⚠️ Cut {cycles} reporting cycles in the org chart")
+
+        department_names = sorted({row[3] for row in rows if row[3]})
+        code_of = {name: code for code, name in enumerate(department_names)}
+        department_codes = np.asarray([code_of.get(row[3], -1) for row in rows], dtype=np.int32)
+
+        child_offsets, child_index = cls._csr(parents, n)
+        order, tin, tout, depth = cls._euler_tour(parents, child_offsets, child_index)
+        department_offsets, department_index = cls._csr(department_codes, len(department_names))
+        return cls(employee_ids, names, [row[2] for row in rows], department_names,
+                   department_codes, parents, child_offsets, child_index,
+                   order, tin, tout, depth, department_offsets, department_index)
+
+    @staticmethod
+    def _break_cycles(parents: np.ndarray) -> int:
+        """Make one member of every reporting cycle a root; returns the number cut"""
+        state = np.zeros(len(parents), dtype=np.int8)  # 0 unseen, 1 on current path, 2 done
+        cut = 0
+        for start in range(len(parents)):
+            path = []
+            node = start
+            while node != -1 and state[node] == 0:
+                state[node] = 1
+                path.append(node)
+                node = parents[node]
+            if node != -1 and state[node] == 1:
+                parents[node] = -1
+                cut += 1
+            state[path] = 2
+        return cut
+
+    @staticmethod
+    def _csr(groups: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Members of each group 0..size-1 as (offsets, index); -1 entries are left out"""
+        members = np.flatnonzero(groups >= 0).astype(np.int32)
+        members = members[np.argsort(groups[members], kind="stable")]
+        counts = np.bincount(groups[members], minlength=size)
+        offsets = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return offsets, members
+
+    @staticmethod
+    def _euler_tour(parents: np.ndarray, child_offsets: np.ndarray,
+                    child_index: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        n = len(parents)
+        order = np.empty(n, dtype=np.int32)
+        tin = np.empty(n, dtype=np.int32)
+        tout = np.empty(n, dtype=np.int32)
+        depth = np.zeros(n, dtype=np.int32)
+        position = 0
+        # Iterative pre-order walk; a node is closed once all of its children are
+        for root in np.flatnonzero(parents == -1):
+            stack = [(int(root), int(child_offsets[root]))]
+            order[position] = root
+            tin[root] = position
+            position += 1
+            while stack:
+                node, next_child = stack[-1]
+                if next_child == child_offsets[node + 1]:
+                    tout[node] = position
+                    stack.pop()
+                    continue
+                stack[-1] = (node, next_child + 1)
+                child = int(child_index[next_child])
+                depth[child] = depth[node] + 1
+                order[position] = child
+                tin[child] = position
+                position += 1
+                stack.append((child, int(child_offsets[child])))
+        return order, tin, tout, depth
+
+    def save(self, path: str) -> None:
+        """Write the graph as one uncompressed .npz file"""
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                employee_ids=np.asarray(self.employee_ids, dtype=str),
+                names=np.asarray(self.names, dtype=str),
+                designations=np.asarray(self.designations, dtype=str),
+                department_names=np.asarray(self.department_names, dtype=str),
+                department_codes=self.department_codes,
+                parents=self.parents,
+                child_offsets=self.child_offsets,
+                child_index=self.child_index,
+                order=self.order,
+                tin=self.tin,
+                tout=self.tout,
+                depth=self.depth,
+                department_offsets=self.department_offsets,
+                department_index=self.department_index,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "OrgGraph":
+        """Load a graph written by save()"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data["employee_ids"].tolist(), data["names"].tolist(),
+                data["designations"].tolist(), data["department_names"].tolist(),
+                data["department_codes"], data["parents"], data["child_offsets"],
+                data["child_index"], data["order"], data["tin"], data["tout"], data["depth"],
+                data["department_offsets"], data["department_index"]
+            )
+
+    def __len__(self) -> int:
+        return len(self.parents)
+
+    def manager(self, i: int) -> Optional[int]:
+        parent = int(self.parents[i])
+        return None if parent == -1 else parent
+
+    def chain(self, i: int) -> List[int]:
+        """Managers of ``i`` from the direct manager up to the top, O(depth)"""
+        managers = []
+        parent = self.parents[i]
+        while parent != -1:
+            managers.append(int(parent))
+            parent = self.parents[parent]
+        return managers
+
+    def direct_reports(self, i: int) -> List[int]:
+        return self.child_index[self.child_offsets[i]:self.child_offsets[i + 1]].tolist()
+
+    def all_reports(self, i: int) -> List[int]:
+        """Everyone below ``i``, direct and indirect, in pre-order"""
+        return self.order[self.tin[i] + 1:self.tout[i]].tolist()
+
+    def report_count(self, i: int) -> int:
+        return int(self.tout[i] - self.tin[i] - 1)
+
+    def skip_level_reports(self, i: int) -> List[int]:
+        return [report for child in self.direct_reports(i) for report in self.direct_reports(child)]
+
+    def reports_to(self, i: int, manager: int) -> bool:
+        """True if ``manager`` is anywhere above ``i`` in the reporting line"""
+        return i != manager and self.tin[manager] <= self.tin[i] < self.tout[manager]
+
+    def department(self, i: int) -> str:
+        code = self.department_codes[i]
+        return self.department_names[code] if code >= 0 else ""
+
+    def department_members(self, code: int) -> List[int]:
+        """Members of a department, most senior (shallowest) first"""
+        members = self.department_index[self.department_offsets[code]:self.department_offsets[code + 1]]
+        return members[np.argsort(self.depth[members], kind="stable")].tolist()
+
+    def department_heads(self, code: int) -> List[int]:
+        """The most senior members of a department"""
+        members = self.department_index[self.department_offsets[code]:self.department_offsets[code + 1]]
+        if not len(members):
+            return []
+        depths = self.depth[members]
+        return members[depths == depths.min()].tolist()
+
+    def with_designation(self, designation: str) -> List[int]:
+        return list(self._lookups[1].get(_normalize(designation), []))
+
+    def find(self, text: str, max_words: int = 5) -> Tuple[List[List[int]], List[str], List[int]]:
+        """Employees, designations and departments named in ``text``.
+
+        Every word n-gram of the text is looked up in hash maps of the
+        normalized names, so the cost depends on the length of the question
+        and not on the size of the org. Longest matches win and matches do
+        not overlap. Returns (groups of employees sharing the matched name,
+        matched designations, matched department codes), in text order.
+        """
+        by_name, by_designation, by_department = self._lookups
+        words = _normalize(text).split()
+        people: List[List[int]] = []
+        designations: List[str] = []
+        departments: List[int] = []
+        start = 0
+        while start < len(words):
+            for size in range(min(max_words, len(words) - start), 0, -1):
+                phrase = " ".join(words[start:start + size])
+                phrase = phrase[:-2] if phrase.endswith("'s") else phrase
+                if phrase in by_name:
+                    people.append(by_name[phrase])
+                elif phrase in by_designation:
+                    designations.append(phrase)
+                elif phrase in by_department:
+                    departments.append(by_department[phrase])
+                else:
+                    continue
+                start += size
+                break
+            else:
+                start += 1
+        return people, designations, departments
+
+    def _build_lookups(self) -> Tuple[Dict[str, List[int]], Dict[str, List[int]], Dict[str, int]]:
+        by_name: Dict[str, List[int]] = {}
+        for i, name in enumerate(self.names):
+            by_name.setdefault(_normalize(name), []).append(i)
+        # Designations repeat a lot; normalize each distinct one once
+        by_designation: Dict[str, List[int]] = {}
+        keys: Dict[str, str] = {}
+        for i, designation in enumerate(self.designations):
+            if designation:
+                key = keys.get(designation)
+                if key is None:
+                    key = keys[designation] = _normalize(designation)
+                by_designation.setdefault(key, []).append(i)
+        by_department: Dict[str, int] = {}
+        for code, name in enumerate(self.department_names):
+            key = _normalize(name)
+            by_department[key] = code
+            # "Engineering Department" is also found as "engineering"
+            for suffix in (" department", " dept", " team"):
+                if key.endswith(suffix):
+                    by_department.setdefault(key[:-len(suffix)], code)
+        return by_name, by_designation, by_department
@@ -0,0 +1,71 @@
+import os
+from typing import Dict, List, Optional
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+# Substring of the source folder name -> chunk category (first match wins)
+CATEGORY_HINTS = (
+    ("holiday", "holiday"),
+    ("reimburse", "reimbursement"),
+    ("chart", "org_chart"),
+    ("organization", "org_chart"),
+    ("form", "forms"),
+    ("policy", "policy"),
+)
+
+
+def category_for_folder(folder_name: str) -> Optional[str]:
+    """Category of the chunks loaded from a docs/ sub-folder"""
+    name = folder_name.lower()
+    for hint, category in CATEGORY_HINTS:
+        if hint in name:
+            return category
+    return None
+
+
+def category_for_source(source: str) -> Optional[str]:
+    """Category of a chunk, judged by the folder its source file sits in"""
+    return category_for_folder(os.path.basename(os.path.dirname(source)))
+
+
+def build_partitions(db: FAISS) -> Dict[str, FAISS]:
+    """Split a FAISS store into one flat sub-index per chunk category.
+
+    Each partition shares the docstore of ``db`` and holds only the vectors
+    of its own category, so a search costs O(partition) instead of
+    O(corpus). Chunks indexed before categories were tagged fall back to
+    the category of their source folder; uncategorised chunks stay in the
+    global index only. Returns {} if the vectors cannot be read back.
+    """
+    positions: Dict[str, List[int]] = {}
+    for position, doc_id in db.index_to_docstore_id.items():
+        doc = db.docstore.search(doc_id)
+        metadata = getattr(doc, "metadata", None) or {}
+        category = metadata.get("category") or category_for_source(metadata.get("source", ""))
+        if category:
+            positions.setdefault(category, []).append(position)
+    if not positions:
+        return {}
+
+    try:
+        vectors = db.index.reconstruct_n(0, db.index.ntotal)
+    except Exception as e:
+        print(f"Error reading vectors for partitioning, using the global index: {str(e)}")
+        return {}
+
+    partitions = {}
+    for category, members in positions.items():
+        members = np.asarray(sorted(members), dtype=np.int64)
+        index = faiss.IndexFlat(db.index.d, db.index.metric_type)
+        index.add(np.ascontiguousarray(vectors[members]))
+        partitions[category] = FAISS(
+            embedding_function=db.embedding_function,
+            index=index,
+            docstore=db.docstore,
+            index_to_docstore_id={i: db.index_to_docstore_id[int(p)] for i, p in enumerate(members)},
+            relevance_score_fn=db.override_relevance_score_fn,
+            normalize_L2=db._normalize_L2,
+            distance_strategy=db.distance_strategy
+        )
+    return partitions
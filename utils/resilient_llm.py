@@ -0,0 +1,445 @@
+import asyncio
+import contextvars
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterator, List, Optional, Tuple, Type
+from utils.embedding_scheduler import backoff_delay
+from utils import metrics
+
+_END = object()
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the upstream while the circuit breaker is open"""
+
+
+class DeadlineExceeded(TimeoutError):
+    """The LLM call did not finish within its deadline"""
+
+
+class CircuitBreaker:
+    """Stops calling an unhealthy upstream for a while.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls fail fast. Once ``reset_timeout`` seconds have passed a single
+    probe call is let through; its success closes the circuit, its failure
+    opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if self._probe_started is not None else "open"
+
+    def allow(self) -> bool:
+        """True if a call may go to the upstream now"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            now = time.monotonic()
+            if now - self._opened_at < self.reset_timeout:
+                return False
+            # One probe at a time; a probe that never reported back is replaced
+            if self._probe_started is not None and now - self._probe_started < self.reset_timeout:
+                return False
+            self._probe_started = now
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                print("✓ LLM circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._probe_started = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probe_started is not None or (
+                    self._opened_at is None and self._failures >= self.failure_threshold):
+                if self._opened_at is None:
+                    print(f"⚠️ LLM circuit opened after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
+                self._probe_started = None
+
+
+class LatencyWindow:
+    """Recent successful call latencies, used to pick the hedging delay"""
+
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def quantile(self, q: float, min_samples: int = 20) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class AttemptAbandoned(Exception):
+    """The attempt's answer was no longer wanted before it reached the upstream"""
+
+
+class Attempt:
+    """Cancellation handle for one upstream call.
+
+    ResilientLLM abandons an attempt once its answer is no longer wanted:
+    the deadline passed, or a hedged twin answered first. A wrapped client
+    that holds a resource for the call (PooledLLM's concurrency slot)
+    registers its release with on_abandon(), so the resource is freed at
+    that moment rather than whenever the abandoned upstream call returns.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._abandoned = False
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def abandoned(self) -> bool:
+        return self._abandoned
+
+    def on_abandon(self, callback: Callable[[], None]) -> None:
+        """Run ``callback`` when the attempt is abandoned (at once if it already was)"""
+        with self._lock:
+            if not self._abandoned:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def abandon(self) -> None:
+        with self._lock:
+            if self._abandoned:
+                return
+            self._abandoned = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def shared_executor() -> ThreadPoolExecutor:
+    """The bounded pool every ResilientLLM runs its blocking attempts on.
+
+    HR_LLM_THREADS (default 32) caps the threads, including ones still
+    stuck in an abandoned upstream call; attempts beyond it queue and are
+    cancelled if the caller gives up before they start.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                try:
+                    workers = max(1, int(os.getenv("HR_LLM_THREADS", 32)))
+                except ValueError:
+                    workers = 32
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hr-llm-call")
+    return _executor
+
+
+class ResilientLLM:
+    """Deadlines, retries, hedging and a circuit breaker around a chat model.
+
+    Every call gets ``timeout`` seconds overall. Failed attempts are retried
+    up to ``max_retries`` times with jittered exponential backoff while time
+    remains. With ``hedge`` enabled, an invoke that has not answered by the
+    p95 of recent latencies gets a second, identical request and the first
+    answer wins. Streams are retried only before their first chunk and must
+    then keep producing within ``chunk_timeout``. While the breaker is open
+    calls raise CircuitOpenError immediately, so callers can fall back.
+    Blocking attempts run on ``executor`` (shared_executor() by default);
+    an attempt that is given up on is abandoned, which frees its slot in
+    a PooledLLM straight away.
+    """
+
+    def __init__(self, llm: Any, timeout: float = 30.0, max_retries: int = 2,
+                 base_delay: float = 0.5, max_delay: float = 4.0, hedge: bool = False,
+                 hedge_quantile: float = 0.95, hedge_min_samples: int = 20,
+                 chunk_timeout: float = 10.0, breaker: Optional[CircuitBreaker] = None,
+                 retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+                 executor: Optional[ThreadPoolExecutor] = None):
+        self.llm = llm
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.chunk_timeout = chunk_timeout
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.retry_on = retry_on
+        self.executor = executor if executor is not None else shared_executor()
+        self.latencies = LatencyWindow()
+        self.retries = 0
+        self.hedges = 0
+        self.rejected = 0
+
+    def invoke(self, prompt: Any, **kwargs) -> Any:
+        """Blocking invoke that returns or raises within ``timeout``"""
+        deadline = time.monotonic() + self.timeout
+        attempt = 0
+        while True:
+            self._admit()
+            try:
+                result = self._invoke_once(prompt, kwargs, deadline)
+            except self.retry_on as e:
+                self.breaker.record_failure()
+                delay = self._retry_delay(e, attempt, deadline)
+                attempt += 1
+                time.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    def stream(self, prompt: Any, **kwargs) -> Iterator[Any]:
+        """Blocking stream; the upstream is read on the executor so waits can time out"""
+        deadline = time.monotonic() + self.timeout
+        attempt = 0
+        while True:
+            self._admit()
+            chunks: "queue.Queue[Tuple[Any, Optional[BaseException]]]" = queue.Queue()
+            handle = Attempt()
+            pump = self._submit(self._pump, handle, prompt, kwargs, chunks)
+            try:
+                first = self._next_chunk(chunks, handle, deadline - time.monotonic())
+            except self.retry_on as e:
+                pump.cancel()
+                handle.abandon()
+                self.breaker.record_failure()
+                delay = self._retry_delay(e, attempt, deadline)
+                attempt += 1
+                time.sleep(delay)
+                continue
+            self.breaker.record_success()
+            break
+
+        try:
+            chunk = first
+            while chunk is not _END:
+                yield chunk
+                chunk = self._next_chunk(chunks, handle, self.chunk_timeout)
+        except self.retry_on:
+            self.breaker.record_failure()
+            raise
+        finally:
+            pump.cancel()
+            handle.abandon()
+
+    async def ainvoke(self, prompt: Any, **kwargs) -> Any:
+        """Async version of invoke()"""
+        deadline = time.monotonic() + self.timeout
+        attempt = 0
+        while True:
+            self._admit()
+            try:
+                result = await self._ainvoke_once(lambda: self.llm.ainvoke(prompt, **kwargs), deadline)
+            except self.retry_on as e:
+                self.breaker.record_failure()
+                delay = self._retry_delay(e, attempt, deadline)
+                attempt += 1
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+
+    async def astream(self, prompt: Any, **kwargs) -> AsyncIterator[Any]:
+        """Async version of stream()"""
+        deadline = time.monotonic() + self.timeout
+        attempt = 0
+        while True:
+            self._admit()
+            upstream = self.llm.astream(prompt, **kwargs)
+            try:
+                first = await self._anext(upstream, deadline - time.monotonic())
+            except self.retry_on as e:
+                await self._aclose(upstream)
+                self.breaker.record_failure()
+                delay = self._retry_delay(e, attempt, deadline)
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            break
+
+        try:
+            chunk = first
+            while chunk is not _END:
+                yield chunk
+                chunk = await self._anext(upstream, self.chunk_timeout)
+        except self.retry_on:
+            self.breaker.record_failure()
+            raise
+        finally:
+            await self._aclose(upstream)
+
+    def _admit(self) -> None:
+        if not self.breaker.allow():
+            self.rejected += 1
+            metrics.get_metrics().increment("llm_rejected", 1, "llm")
+            raise CircuitOpenError("LLM circuit breaker is open; not calling the upstream")
+
+    def _retry_delay(self, error: BaseException, attempt: int, deadline: float) -> float:
+        """Backoff before the next attempt, or re-raise if there is no next attempt"""
+        remaining = deadline - time.monotonic()
+        if isinstance(error, DeadlineExceeded) or attempt >= self.max_retries or remaining <= 0:
+            raise error
+        if self.breaker.state != "closed":
+            raise CircuitOpenError("LLM circuit breaker opened while retrying") from error
+        delay = min(backoff_delay(attempt, self.base_delay, self.max_delay), remaining)
+        print(f"! LLM call failed ({error}); retry {attempt + 1} in {delay:.1f}s")
+        self.retries += 1
+        metrics.get_metrics().increment("llm_retries", 1, "llm")
+        return delay
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge:
+            return None
+        return self.latencies.quantile(self.hedge_quantile, self.hedge_min_samples)
+
+    def _submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """Run ``fn(*args)`` on the executor in a copy of the caller's context"""
+        return self.executor.submit(contextvars.copy_context().run, fn, *args)
+
+    def _call(self, method: str, attempt: Attempt, prompt: Any, kwargs: Dict[str, Any]) -> Any:
+        """One upstream call; a client that can free resources early is handed the attempt"""
+        if attempt.abandoned:
+            raise AttemptAbandoned("LLM attempt abandoned before it started")
+        if getattr(self.llm, "takes_attempt", False):
+            kwargs = dict(kwargs, attempt=attempt)
+        return getattr(self.llm, method)(prompt, **kwargs)
+
+    def _invoke_once(self, prompt: Any, kwargs: Dict[str, Any], deadline: float) -> Any:
+        started = time.monotonic()
+        attempts: Dict[Future, Attempt] = {}
+
+        def start() -> Future:
+            attempt = Attempt()
+            future = self._submit(self._call, "invoke", attempt, prompt, kwargs)
+            attempts[future] = attempt
+            return future
+
+        pending = {start()}
+        try:
+            hedge_after = self._hedge_delay()
+            if hedge_after is not None:
+                done, _ = wait(pending, timeout=min(hedge_after, max(0.0, deadline - started)))
+                if not done and time.monotonic() < deadline:
+                    self._count_hedge()
+                    pending.add(start())
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                     return_when=FIRST_COMPLETED)
+                if not done:
+                    raise DeadlineExceeded(f"LLM call exceeded its {self.timeout:g}s deadline")
+                for future in done:
+                    if future.exception() is None:
+                        self.latencies.add(time.monotonic() - started)
+                        return future.result()
+                    error = future.exception()
+            raise error
+        finally:
+            # Losing hedges and timed-out attempts: never start them, or free their slot
+            for future in pending:
+                future.cancel()
+                attempts[future].abandon()
+
+    async def _ainvoke_once(self, call: Callable[[], Any], deadline: float) -> Any:
+        started = time.monotonic()
+        pending = {asyncio.ensure_future(call())}
+        try:
+            hedge_after = self._hedge_delay()
+            if hedge_after is not None:
+                done, _ = await asyncio.wait(pending, timeout=min(hedge_after, max(0.0, deadline - started)))
+                if not done and time.monotonic() < deadline:
+                    self._count_hedge()
+                    pending.add(asyncio.ensure_future(call()))
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, deadline - time.monotonic()),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    raise DeadlineExceeded(f"LLM call exceeded its {self.timeout:g}s deadline")
+                for task in done:
+                    if task.exception() is None:
+                        self.latencies.add(time.monotonic() - started)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _count_hedge(self) -> None:
+        self.hedges += 1
+        metrics.get_metrics().increment("llm_hedges", 1, "llm")
+
+    def _pump(self, attempt: Attempt, prompt: Any, kwargs: Dict[str, Any],
+              chunks: queue.Queue) -> None:
+        upstream = None
+        try:
+            upstream = self._call("stream", attempt, prompt, kwargs)
+            for chunk in upstream:
+                if attempt.abandoned:
+                    break
+                chunks.put((chunk, None))
+            chunks.put((_END, None))
+        except BaseException as e:
+            chunks.put((_END, e))
+        finally:
+            if upstream is not None and hasattr(upstream, "close"):
+                upstream.close()
+
+    def _next_chunk(self, chunks: queue.Queue, attempt: Attempt, timeout: float) -> Any:
+        try:
+            chunk, error = chunks.get(timeout=max(0.0, timeout))
+        except queue.Empty:
+            attempt.abandon()
+            raise DeadlineExceeded(f"LLM stream stalled for {timeout:.1f}s")
+        if error is not None:
+            raise error
+        return chunk
+
+    @staticmethod
+    async def _anext(upstream: AsyncIterator[Any], timeout: float) -> Any:
+        try:
+            return await asyncio.wait_for(upstream.__anext__(), max(0.0, timeout))
+        except StopAsyncIteration:
+            return _END
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"LLM stream stalled for {timeout:.1f}s")
+
+    @staticmethod
+    async def _aclose(upstream: AsyncIterator[Any]) -> None:
+        if hasattr(upstream, "aclose"):
+            await upstream.aclose()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.llm, name)
@@ -0,0 +1,176 @@
+import asyncio
+import threading
+from typing import AsyncIterator, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+from utils import metrics
+
+
+class Flight:
+    """One in-flight answer that any number of callers can read as it streams.
+
+    The producer publishes chunks; thread callers wait on a condition and
+    asyncio callers are woken through their own loop, so the same flight
+    can be shared by the Streamlit threads and the async server.
+    """
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+        self.task: Optional[asyncio.Future] = None  # async producer, kept referenced while it runs
+        self._cond = threading.Condition()
+        self._async_waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Event]] = []
+
+    def publish(self, chunk: str) -> None:
+        with self._cond:
+            self.chunks.append(chunk)
+            self._notify()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        with self._cond:
+            self.done = True
+            self.error = error
+            self._notify()
+
+    def follow(self) -> Iterator[str]:
+        """Chunks as they are published; re-raises the producer's error"""
+        seen = 0
+        while True:
+            with self._cond:
+                while seen == len(self.chunks) and not self.done:
+                    self._cond.wait()
+                batch, done, error = self.chunks[seen:], self.done, self.error
+            seen += len(batch)
+            yield from batch
+            if done and seen == len(self.chunks):
+                if error is not None:
+                    raise error
+                return
+
+    async def afollow(self) -> AsyncIterator[str]:
+        """Async version of follow()"""
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._cond:
+            self._async_waiters.append(waiter)
+        try:
+            seen = 0
+            while True:
+                waiter[1].clear()  # before reading, so a publish after the read still wakes us
+                with self._cond:
+                    batch, done, error = self.chunks[seen:], self.done, self.error
+                seen += len(batch)
+                for chunk in batch:
+                    yield chunk
+                if done:
+                    if error is not None:
+                        raise error
+                    return
+                if not batch:
+                    await waiter[1].wait()
+        finally:
+            with self._cond:
+                self._async_waiters.remove(waiter)
+
+    def _notify(self) -> None:
+        self._cond.notify_all()
+        for loop, event in self._async_waiters:
+            loop.call_soon_threadsafe(event.set)
+
+
+class SingleFlight:
+    """Coalesces concurrent identical requests into one computation.
+
+    The first caller for a key runs the producer; callers arriving while it
+    is in flight stream the same chunks (or get the same error) instead of
+    starting their own. Keys are forgotten once the answer is complete, so
+    later repeats go to the answer cache as usual.
+    """
+
+    def __init__(self):
+        self.coalesced = 0  # calls that joined an in-flight request
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, Flight] = {}
+
+    def stream(self, key: Hashable, produce: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """Run ``produce`` once per key among concurrent thread callers"""
+        flight, leader = self._join(key)
+        if not leader:
+            yield from flight.follow()
+            return
+
+        chunks = None
+        try:
+            chunks = produce()
+            for chunk in chunks:
+                flight.publish(chunk)
+                yield chunk
+        except GeneratorExit:
+            # Our caller stopped reading; finish the answer for anyone waiting on it
+            if not self._release(key, flight, only_if_alone=True):
+                self._drain(key, flight, chunks)
+            raise
+        except BaseException as e:
+            flight.finish(e)
+            self._release(key, flight)
+            raise
+        else:
+            flight.finish()
+            self._release(key, flight)
+
+    async def astream(self, key: Hashable,
+                      produce: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Async version of stream().
+
+        The producer runs as its own task, so a caller that times out or
+        disconnects does not cancel the answer the others are waiting for.
+        """
+        flight, leader = self._join(key)
+        if leader:
+            flight.task = asyncio.ensure_future(self._pump(key, flight, produce))
+        async for chunk in flight.afollow():
+            yield chunk
+
+    def _join(self, key: Hashable) -> Tuple[Flight, bool]:
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = Flight()
+                return flight, True
+            flight.followers += 1
+            self.coalesced += 1
+        metrics.set_tool("coalesced")
+        metrics.get_metrics().increment("coalesced_requests", 1, "coalesced")
+        return flight, False
+
+    def _release(self, key: Hashable, flight: Flight, only_if_alone: bool = False) -> bool:
+        with self._lock:
+            if only_if_alone and flight.followers:
+                return False
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        return True
+
+    def _drain(self, key: Hashable, flight: Flight, chunks: Optional[Iterator[str]]) -> None:
+        try:
+            for chunk in chunks or ():
+                flight.publish(chunk)
+        except Exception as e:
+            flight.finish(e)
+        else:
+            flight.finish()
+        finally:
+            self._release(key, flight)
+
+    async def _pump(self, key: Hashable, flight: Flight,
+                    produce: Callable[[], AsyncIterator[str]]) -> None:
+        try:
+            async for chunk in produce():
+                flight.publish(chunk)
+        except BaseException as e:
+            flight.finish(e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        else:
+            flight.finish()
+        finally:
+            self._release(key, flight)
@@ -0,0 +1,69 @@
+class SourceRefFilter:
+    """Streaming-safe equivalent of ``re.sub(r"\\(Source:.*?\\)", "", text).strip()``.
+
+    Chunks are fed in as they arrive from the model. Text that might still
+    turn out to be part of a ``(Source: ...)`` reference is held back until
+    it is resolved, and leading/trailing whitespace of the whole response is
+    dropped, so the concatenated output matches the non-streaming cleanup.
+    """
+
+    MARKER = "(Source:"
+
+    def __init__(self):
+        self._buffer = ""
+        self._started = False
+        self._pending_space = ""
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk and return whatever text is now safe to emit"""
+        self._buffer += chunk
+        out = []
+        while self._buffer:
+            start = self._buffer.find(self.MARKER)
+            if start == -1:
+                # Hold back a tail that could be the start of the marker
+                keep = self._partial_marker_len(self._buffer)
+                out.append(self._buffer[:len(self._buffer) - keep])
+                self._buffer = self._buffer[len(self._buffer) - keep:]
+                break
+            out.append(self._buffer[:start])
+            rest = self._buffer[start + len(self.MARKER):]
+            close = rest.find(")")
+            newline = rest.find("\n")
+            if newline != -1 and (close == -1 or newline < close):
+                # ".*?" does not cross newlines, so this is not a reference
+                out.append(self.MARKER)
+                self._buffer = rest
+                continue
+            if close == -1:
+                self._buffer = self._buffer[start:]
+                break
+            self._buffer = rest[close + 1:]
+        return self._emit("".join(out))
+
+    def flush(self) -> str:
+        """Return the remaining held-back text at the end of the stream"""
+        text, self._buffer = self._buffer, ""
+        result = self._emit(text)
+        self._pending_space = ""  # trailing whitespace is stripped
+        return result
+
+    def _emit(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+        body = text.rstrip()
+        if not body:
+            self._pending_space += text
+            return ""
+        result = self._pending_space + body
+        self._pending_space = text[len(body):]
+        return result
+
+    def _partial_marker_len(self, text: str) -> int:
+        for size in range(min(len(self.MARKER) - 1, len(text)), 0, -1):
+            if self.MARKER.startswith(text[-size:]):
+                return size
+        return 0
@@ -1,28 +1,177 @@
 import os
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
 from langchain_community.vectorstores import FAISS
+from utils.bm25 import BM25Index
+from utils.holiday_calendar import HolidayCalendar
+from utils.org_graph import OrgGraph
+from utils.clients import get_embeddings
+from utils.index_store import has_store, load_store, store_files
+from utils.index_versions import (
+    holiday_calendar_name_for, index_name_for, lexical_index_name_for, org_graph_name_for,
+    read_current_version
+)
 
 class VectorStoreManager:
     """Manages loading and accessing the FAISS vector store"""
     
-    def __init__(self, index_path: str = "faiss_index"):
+    def __init__(self, index_path: str = "faiss_index", embeddings: Optional[Embeddings] = None):
         self.index_path = index_path
-        self.embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+        self.embeddings = embeddings if embeddings is not None else get_embeddings()
         self.vector_db = None
+        self.partitions: Optional[Dict[str, FAISS]] = None
+        self.lexical_index = None
+        self.holiday_calendar: Optional[HolidayCalendar] = None
+        self.org_graph: Optional[OrgGraph] = None
+        self.index_version = None
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[..., None]] = []
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
     
     def load_vector_store(self) -> bool:
         """Load the FAISS index"""
         try:
-            self.vector_db = FAISS.load_local(
+            self._swap(*self._load(read_current_version(self.index_path)))
+            return True
+        except Exception as e:
+            print(f"Error loading index: {str(e)}")
+            return False
+
+    def _load(self, version: Optional[str]) -> Tuple[FAISS, Optional[Dict[str, FAISS]], BM25Index,
+                                                     Optional[HolidayCalendar], Optional[OrgGraph], str]:
+        index_name = index_name_for(version)
+        if has_store(self.index_path, index_name):
+            # Memory-mapped vectors, chunks read from SQLite per hit, no pickle
+            vector_db, partitions = load_store(self.index_path, index_name, self.embeddings)
+        else:
+            print("Loading a legacy pickled index; rebuild it with create_index.py "
+                  "to switch to the memory-mapped format.")
+            vector_db = FAISS.load_local(
                 self.index_path,
                 self.embeddings,
+                index_name=index_name,
                 allow_dangerous_deserialization=True
             )
-            return True
+            partitions = None
+        lexical_index = self._load_lexical_index(version, vector_db)
+        holiday_calendar = self._load_structured(holiday_calendar_name_for(version), HolidayCalendar,
+                                                 "holiday calendar")
+        org_graph = self._load_structured(org_graph_name_for(version), OrgGraph, "org chart graph")
+        return (vector_db, partitions, lexical_index, holiday_calendar, org_graph,
+                version or self.read_index_version())
+
+    def _swap(self, vector_db: FAISS, partitions: Optional[Dict[str, FAISS]],
+              lexical_index: BM25Index, holiday_calendar: Optional[HolidayCalendar],
+              org_graph: Optional[OrgGraph], index_version: str) -> None:
+        with self._lock:
+            self.vector_db = vector_db
+            self.partitions = partitions
+            self.lexical_index = lexical_index
+            self.holiday_calendar = holiday_calendar
+            self.org_graph = org_graph
+            self.index_version = index_version
+
+    def check_for_update(self) -> bool:
+        """Load and swap in a newly published version; True if one was swapped in.
+
+        The new index is fully loaded before anything is replaced, so callers
+        keep using the old one until the swap and a failed load changes
+        nothing. Every ``watch()`` listener is then called with the new
+        index as keyword arguments.
+        """
+        version = read_current_version(self.index_path)
+        if (version or self.read_index_version()) == self.index_version:
+            return False
+        try:
+            loaded = self._load(version)
         except Exception as e:
-            print(f"Error loading index: {str(e)}")
+            # e.g. the version was pruned while we read it; retry on the next check
+            print(f"Error loading index version {version}: {str(e)}")
             return False
+        self._swap(*loaded)
+        print(f"✓ Switched to index version {self.index_version}")
+        for listener in list(self._listeners):
+            try:
+                listener(vector_db=self.vector_db, partitions=self.partitions,
+                         lexical_index=self.lexical_index, index_version=self.index_version,
+                         holiday_calendar=self.holiday_calendar, org_graph=self.org_graph)
+            except Exception as e:
+                print(f"Error applying index version {self.index_version}: {str(e)}")
+        return True
+
+    def watch(self, on_reload: Callable[..., None], interval: float = 30.0) -> None:
+        """Poll the VERSION file in a background thread and hot-swap new versions"""
+        self._listeners.append(on_reload)
+        if self._watcher is not None or interval <= 0:
+            return
+        self._stop.clear()
+
+        def poll():
+            while not self._stop.wait(interval):
+                self.check_for_update()
+
+        self._watcher = threading.Thread(target=poll, name="index-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        """Stop the background watcher started by watch()"""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
     
+    def warm_up(self, block_size: int = 1 << 20) -> int:
+        """Read the current index files once so their pages are in the OS cache.
+
+        The vectors are memory-mapped and chunks come from SQLite, so without
+        this the first queries after a cold start fault pages in from disk.
+        Returns the number of bytes read.
+        """
+        index_name = index_name_for(read_current_version(self.index_path))
+        buffer = bytearray(block_size)
+        total = 0
+        for path in store_files(self.index_path, index_name):
+            with open(path, "rb", buffering=0) as f:
+                while True:
+                    read = f.readinto(buffer)
+                    if not read:
+                        break
+                    total += read
+        return total
+
     def get_vector_db(self) -> FAISS:
         """Get the loaded vector database"""
-        return self.vector_db
\ No newline at end of file
+        return self.vector_db
+
+    def _load_lexical_index(self, version: Optional[str], vector_db: FAISS) -> BM25Index:
+        """Load the saved BM25 index, or rebuild it for indexes that predate it"""
+        path = os.path.join(self.index_path, lexical_index_name_for(version))
+        if os.path.exists(path):
+            try:
+                return BM25Index.load(path)
+            except Exception as e:
+                print(f"Error loading BM25 index, rebuilding it: {str(e)}")
+        return BM25Index.from_vector_store(vector_db)
+
+    def _load_structured(self, file_name: str, kind: type, label: str) -> Optional[Any]:
+        """Load a structured store saved with the index (None for indexes built without one)"""
+        path = os.path.join(self.index_path, file_name)
+        if not os.path.exists(path):
+            return None
+        try:
+            return kind.load(path)
+        except Exception as e:
+            print(f"Error loading {label}: {str(e)}")
+            return None
+
+    def read_index_version(self) -> str:
+        """Return the on-disk index version (VERSION file, else index mtime)"""
+        version = read_current_version(self.index_path)
+        if version:
+            return version
+        index_file = os.path.join(self.index_path, "index.faiss")
+        if os.path.exists(index_file):
+            return str(os.path.getmtime(index_file))
+        return ""
@@ -0,0 +1,37 @@
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Optional
+
+
+class Warmup:
+    """Runs ``loader`` once on a daemon thread so it overlaps with other work.
+
+    The app starts one while the login page is shown; the chat page then
+    calls result(), which returns at once if loading already finished and
+    otherwise waits for it. The loader's exception, if any, is re-raised
+    there rather than lost on the background thread.
+    """
+
+    def __init__(self, loader: Callable[[], Any], name: str = "warmup"):
+        self.seconds: Optional[float] = None  # how long the loader took, once done
+        self._future: Future = Future()
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, args=(loader,), name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self, loader: Callable[[], Any]) -> None:
+        self._future.set_running_or_notify_cancel()
+        try:
+            self._future.set_result(loader())
+        except BaseException as e:
+            self._future.set_exception(e)
+        finally:
+            self.seconds = time.perf_counter() - self._started
+
+    def done(self) -> bool:
+        return self._future.done()
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        """The loader's return value, waiting up to ``timeout`` seconds for it"""
+        return self._future.result(timeout)